@@ -0,0 +1,74 @@
+# benchmarks/bench_inference.py
+"""
+Micro-benchmark: transformer inference on CPU.
+
+Compares eager `PriceTransformer` inference with the exported TorchScript
+artifact, its int8 dynamically quantized variant and, when onnxruntime is
+installed, the ONNX artifacts. Reports latency per call and throughput in
+windows per second for each batch size.
+
+Usage:
+    python benchmarks/bench_inference.py [batch_sizes] [repeats]
+
+    batch_sizes is comma separated, e.g. 1,64,1024
+"""
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from src.config import model_config
+from src.model_export import eager_predictor, export_model, load_predictor, onnxruntime
+from src.model_transformer import build_model
+
+
+def best_of(predict, x, repeats):
+    predict(x)  # warm-up
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        predict(x)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    warnings.simplefilter("ignore")  # torch deprecation / tracer notices
+    batch_sizes = [int(b) for b in (sys.argv[1] if len(sys.argv) > 1 else "1,64,1024").split(",")]
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    seq_len = model_config.transformer_seq_len
+    model = build_model(model_config).eval()
+
+    variants = [("torchscript", False), ("torchscript", True)]
+    if onnxruntime is not None:
+        variants += [("onnx", False), ("onnx", True)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        predictors = {"eager": eager_predictor(model)}
+        for fmt, quantize in variants:
+            name = fmt + (" int8" if quantize else "")
+            path = os.path.join(tmp, name.replace(" ", "_"))
+            predictors[name] = load_predictor(export_model(model, path, seq_len, fmt, quantize))
+
+        rng = np.random.default_rng(0)
+        for batch in batch_sizes:
+            x = rng.normal(0, 0.01, (batch, seq_len, 1)).astype(np.float32)
+            expected = predictors["eager"](x)
+            print(f"batch {batch:,}:")
+            t_eager = None
+            for name, predict in predictors.items():
+                err = np.abs(predict(x) - expected).max()
+                t = best_of(predict, x, repeats)
+                t_eager = t_eager or t
+                print(f"  {name:18s} {t * 1000:8.2f} ms  {batch / t:12,.0f} windows/s  "
+                      f"({t_eager / t:.1f}x, max abs diff {err:.2e})")
+
+
+if __name__ == "__main__":
+    main()
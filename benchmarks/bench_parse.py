@@ -0,0 +1,90 @@
+# benchmarks/bench_parse.py
+"""
+Micro-benchmark: chart response parsing.
+
+Compares the previous `resp.json()` + DataFrame-from-lists + dropna/sort/reset
+path against `chart_parser.parse_chart` on the chart fixture, tiled up to the
+requested number of bars.
+
+Usage:
+    python benchmarks/bench_parse.py [n_bars] [repeats]
+"""
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from src.chart_parser import decode_json, parse_chart
+
+FIXTURE = os.path.join(ROOT, "tests", "fixtures", "chart_daily.json")
+
+
+def tiled_payload(n_bars):
+    """Repeat the fixture's bars (with shifted timestamps) up to `n_bars`."""
+    with open(FIXTURE) as fh:
+        data = json.load(fh)
+    res = data["chart"]["result"][0]
+    ts = res["timestamp"]
+    quote = res["indicators"]["quote"][0]
+    span = ts[-1] - ts[0] + 86_400
+
+    reps = -(-n_bars // len(ts))
+    res["timestamp"] = [t + k * span for k in range(reps) for t in ts][:n_bars]
+    res["indicators"]["quote"][0] = {f: (v * reps)[:n_bars] for f, v in quote.items()}
+    res["indicators"].pop("adjclose", None)
+    return json.dumps(data).encode()
+
+
+def legacy_parse(raw):
+    res = json.loads(raw)["chart"]["result"][0]
+    prices = res["indicators"]["quote"][0]
+    df = pd.DataFrame({
+        "date": pd.to_datetime(res["timestamp"], unit="s"),
+        "open": prices.get("open", []),
+        "high": prices.get("high", []),
+        "low": prices.get("low", []),
+        "close": prices.get("close", []),
+        "volume": prices.get("volume", []),
+    })
+    df.dropna(inplace=True)
+    df.sort_values("date", inplace=True)
+    df.reset_index(drop=True, inplace=True)
+    return df
+
+
+def fast_parse(raw):
+    return parse_chart(decode_json(raw))
+
+
+def best_of(fn, raw, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(raw)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    n_bars = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    raw = tiled_payload(n_bars)
+
+    legacy, fast = legacy_parse(raw), fast_parse(raw)
+    assert len(legacy) == len(fast)
+    assert (legacy["close"].to_numpy() == fast["close"].to_numpy()).all()
+
+    t_legacy = best_of(legacy_parse, raw, repeats)
+    t_fast = best_of(fast_parse, raw, repeats)
+    print(f"payload: {n_bars:,} bars, {len(raw) / 1e6:.1f} MB")
+    print(f"legacy parse: {t_legacy * 1000:8.1f} ms")
+    print(f"fast parse:   {t_fast * 1000:8.1f} ms  ({t_legacy / t_fast:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
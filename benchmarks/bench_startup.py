@@ -0,0 +1,100 @@
+# benchmarks/bench_startup.py
+"""
+Startup benchmark: cold import time per module.
+
+Each module is imported in a fresh interpreter with `python -X importtime`
+and its cumulative import time is recorded (best of `repeats`). Also lists
+heavy packages (torch, matplotlib) that importing the Streamlit app pulls
+in at startup. With `--baseline` the results are compared against a saved
+JSON file and the script exits non-zero when a module got slower than the
+baseline plus `--tolerance`, so it can run in CI; `--update` rewrites the
+baseline instead.
+
+Usage:
+    python benchmarks/bench_startup.py [--repeats N] [--baseline FILE] [--update] [--tolerance 0.5]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = [
+    "pandas",
+    "streamlit",
+    "src.signals",
+    "src.strategy",
+    "src.data_provider",
+    "src.ai_models",
+    "matplotlib.pyplot",
+    "src.model_transformer",
+    "src.trader_app",
+]
+
+# Packages the app must not import until a feature needs them
+LAZY_PACKAGES = ["torch", "matplotlib"]
+
+
+def import_time_ms(module: str) -> float:
+    """Cumulative cold import time of `module` in a fresh interpreter."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    for line in reversed(proc.stderr.splitlines()):
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == module and parts[2].startswith(" " + module):
+            return int(parts[1]) / 1000
+    raise RuntimeError(f"No import time recorded for {module}")
+
+
+def eager_heavy_imports() -> list:
+    code = (
+        "import sys, src.trader_app; "
+        f"print(','.join(p for p in {LAZY_PACKAGES!r} if p in sys.modules))"
+    )
+    proc = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    out = proc.stdout.strip().splitlines()
+    return [p for p in out[-1].split(",") if p] if out else []
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--baseline", help="JSON file of module -> ms to compare against")
+    parser.add_argument("--update", action="store_true", help="write the results to --baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed relative slowdown")
+    args = parser.parse_args()
+
+    results = {m: min(import_time_ms(m) for _ in range(args.repeats)) for m in MODULES}
+    baseline = {}
+    if args.baseline and os.path.exists(args.baseline) and not args.update:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+
+    regressions = []
+    for module, ms in results.items():
+        line = f"{module:24s} {ms:8.1f} ms"
+        if module in baseline:
+            line += f"   (baseline {baseline[module]:.1f} ms)"
+            if ms > baseline[module] * (1 + args.tolerance):
+                regressions.append(module)
+                line += "  <-- slower"
+        print(line)
+
+    heavy = eager_heavy_imports()
+    print(f"heavy packages imported by the app at startup: {', '.join(heavy) or 'none'}")
+
+    if args.baseline and args.update:
+        with open(args.baseline, "w") as fh:
+            json.dump(results, fh, indent=2)
+        print(f"baseline written to {args.baseline}")
+
+    if regressions or heavy:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
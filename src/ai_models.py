@@ -2,6 +2,8 @@
 import pandas as pd
 import numpy as np
 
+from src.signals import Signal, SIGNAL_DTYPE
+
 def add_direction_prediction(df: pd.DataFrame, price_col: str) -> pd.DataFrame:
     """
     Stub for AI model.
@@ -21,6 +23,6 @@ def add_direction_prediction(df: pd.DataFrame, price_col: str) -> pd.DataFrame:
     df.loc[bullish, "pred_up_prob"] = 0.7
     df.loc[~bullish, "pred_up_prob"] = 0.3
 
-    df["pred_signal"] = np.where(df["pred_up_prob"] >= 0.55, "BUY", "SELL")
+    df["pred_signal"] = np.where(df["pred_up_prob"] >= 0.55, Signal.BUY, Signal.SELL).astype(SIGNAL_DTYPE)
 
     return df
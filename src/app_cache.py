@@ -0,0 +1,82 @@
+# app_cache.py
+"""
+Streamlit result caching for the app's pipeline stages.
+
+`cached_stage(name, ttl=...)` wraps a function in `st.cache_data`, keyed on
+its arguments (DataFrames are hashed by content), and counts calls and
+misses per stage. The counters live in an `st.cache_resource`, so they are
+shared by all sessions on the server and survive script reruns; the app
+shows them in its debug panel.
+"""
+import functools
+import threading
+
+import streamlit as st
+
+
+class StageStats:
+    """Thread-safe call / miss counters per cached stage."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}  # stage -> [calls, misses]
+
+    def record(self, stage: str, miss: bool = False):
+        with self._lock:
+            counts = self._counts.setdefault(stage, [0, 0])
+            counts[1 if miss else 0] += 1
+
+    def snapshot(self) -> list:
+        """One row per stage: calls, hits, misses and hit rate."""
+        with self._lock:
+            items = [(stage, calls, misses) for stage, (calls, misses) in self._counts.items()]
+        return [
+            {
+                "stage": stage,
+                "calls": calls,
+                "hits": calls - misses,
+                "misses": misses,
+                "hit_rate": (calls - misses) / calls if calls else 0.0,
+            }
+            for stage, calls, misses in items
+        ]
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+@st.cache_resource
+def stage_stats() -> StageStats:
+    return StageStats()
+
+
+def cached_stage(name: str, ttl: float | None = None, max_entries: int | None = None):
+    """Decorator: cache a pipeline stage with `st.cache_data` and count hits / misses.
+
+    Arguments whose names start with an underscore are not hashed, as with
+    `st.cache_data` itself.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def compute(*args, **kwargs):
+            # Only runs when st.cache_data has no entry for these arguments
+            stage_stats().record(name, miss=True)
+            return fn(*args, **kwargs)
+
+        cached = st.cache_data(ttl=ttl, max_entries=max_entries, show_spinner=False)(compute)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            stage_stats().record(name)
+            return cached(*args, **kwargs)
+
+        wrapper.clear = cached.clear
+        return wrapper
+    return decorator
+
+
+def clear_stages():
+    """Drop every cached stage result and reset the counters."""
+    st.cache_data.clear()
+    stage_stats().reset()
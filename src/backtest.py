@@ -0,0 +1,252 @@
+# backtest.py
+"""
+Array-based backtest engine.
+
+Runs the long/flat stop-loss / take-profit state machine used by
+`strategy.apply_sma_crossover` over plain NumPy arrays, so no pandas
+row access happens inside the per-bar loop, and extracts the round-trip
+trade ledger from the resulting positions.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.signals import Signal, SIGNAL_DTYPE
+
+# Plain ints for the hot loop (IntEnum comparisons are slower)
+HOLD = int(Signal.HOLD)
+BUY = int(Signal.BUY)
+SELL = int(Signal.SELL)
+SL = int(Signal.SL)
+TP = int(Signal.TP)
+
+# Exit reasons (recorded on the bar where a long position is closed)
+EXIT_NONE = 0
+EXIT_SIGNAL = 1
+EXIT_SL = 2
+EXIT_TP = 3
+
+
+@dataclass
+class TradeLedger:
+    """One entry per round trip; every field is an array of the same length."""
+    row: np.ndarray          # strategy row for (strategies x bars) input, else 0
+    entry_index: np.ndarray  # first bar in the position
+    exit_index: np.ndarray   # bar the position was closed on (last bar if still open)
+    entry_price: np.ndarray
+    exit_price: np.ndarray
+    exit_reason: np.ndarray  # EXIT_* code; EXIT_NONE while still open
+    pnl: np.ndarray          # compounded net strategy return over the held bars
+    bars: np.ndarray         # holding period in bars
+
+    def __len__(self) -> int:
+        return len(self.entry_index)
+
+
+@dataclass
+class BacktestResult:
+    """Per-bar output arrays of `run_backtest`."""
+    signal: np.ndarray            # input signals with SL/TP overrides applied
+    position: np.ndarray          # 1 = long, 0 = flat
+    strategy_returns: np.ndarray  # net of trade costs, NaN on the first bar
+    equity_curve: np.ndarray
+    exit_reason: np.ndarray       # EXIT_* code per bar
+    trades: TradeLedger
+
+
+def run_backtest(
+    prices,
+    signals,
+    trade_cost_bps: int = 0,
+    stop_loss_pct: float | None = None,
+    take_profit_pct: float | None = None,
+    use_risk: bool = False,
+) -> BacktestResult:
+    """Backtest encoded `signals` against `prices`.
+
+    Positions are decided on each bar from that bar's signal (the first bar
+    is always flat). With `use_risk`, an open long is force-closed when the
+    move from its entry price reaches -`stop_loss_pct` or +`take_profit_pct`
+    percent; the bar's signal is then rewritten to SL / TP.
+
+    Strategy returns follow the convention of `apply_sma_crossover`: the bar
+    return times the position, scaled by (1 - cost) on bars where the
+    position changes.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    signal = np.array(signals, dtype=SIGNAL_DTYPE)
+
+    check_risk = use_risk and (stop_loss_pct is not None or take_profit_pct is not None)
+    if check_risk:
+        position, exit_reason = _run_risk_loop(prices, signal, stop_loss_pct, take_profit_pct)
+    else:
+        position, exit_reason = signal_positions(signal)
+
+    strategy_returns, equity_curve = strategy_equity(prices, position, trade_cost_bps)
+
+    return BacktestResult(
+        signal=signal,
+        position=position,
+        strategy_returns=strategy_returns,
+        equity_curve=equity_curve,
+        exit_reason=exit_reason,
+        trades=extract_trades(position, strategy_returns, prices, exit_reason),
+    )
+
+
+def strategy_equity(prices, position, trade_cost_bps=0):
+    """Net strategy returns and equity for one or many position rows.
+
+    `position` may be 1-D (bars) or 2-D (strategies x bars) against the same
+    1-D `prices`; `trade_cost_bps` may be a scalar or one value per row.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    n = prices.shape[-1]
+
+    returns = np.full(n, np.nan)
+    if n > 1:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns[1:] = prices[1:] / prices[:-1] - 1.0
+
+    strategy_returns = returns * position
+    changed = np.ones(position.shape, dtype=bool)
+    changed[..., 1:] = position[..., 1:] != position[..., :-1]
+    cost_factor = 1 - np.asarray(trade_cost_bps, dtype=np.float64) / 10000
+    if cost_factor.ndim:
+        cost_factor = np.broadcast_to(cost_factor.reshape(-1, 1), position.shape)[changed]
+    strategy_returns[changed] *= cost_factor
+
+    growth = 1.0 + strategy_returns
+    missing = np.isnan(growth)
+    equity_curve = np.cumprod(np.where(missing, 1.0, growth), axis=-1)
+    equity_curve[missing] = np.nan
+    return strategy_returns, equity_curve
+
+
+def extract_trades(position, strategy_returns, prices=None, exit_reason=None) -> TradeLedger:
+    """Trade ledger of one or many position rows, in one vectorized pass.
+
+    A trade runs from a bar where the position becomes non-zero to the bar
+    where it is flat again; its P&L compounds the net strategy returns of
+    the bars in between, so it agrees with the equity curve (costs
+    included). `exit_reason` (per bar, EXIT_* codes) labels the exits,
+    otherwise closed trades are EXIT_SIGNAL. Arrays are (..., bars);
+    `prices` may be 1-D and shared by every row.
+    """
+    position = np.asarray(position)
+    n = position.shape[-1]
+    held = (position != 0).reshape(-1, n)
+    n_rows = held.shape[0]
+
+    # Pad each row with a flat bar on both sides so trades never span rows
+    # and a trade still open at the end exits on the right-hand pad
+    width = n + 2
+    padded = np.zeros((n_rows, width), dtype=bool)
+    padded[:, 1:-1] = held
+    flat = padded.ravel()
+    change = np.flatnonzero(flat[1:] != flat[:-1]) + 1
+    entries, exits = change[flat[change]], change[~flat[change]]
+
+    growth = np.ones((n_rows, width))
+    returns = np.asarray(strategy_returns, dtype=np.float64).reshape(n_rows, n)
+    np.add(1.0, returns, out=growth[:, 1:-1], where=~np.isnan(returns))
+    if len(entries):
+        bounds = np.column_stack([entries, exits]).ravel()
+        pnl = np.multiply.reduceat(growth.ravel(), bounds)[::2] - 1.0
+    else:
+        pnl = np.zeros(0)
+
+    row = entries // width
+    entry_index = entries % width - 1
+    exit_bar = exits % width - 1
+    is_open = exit_bar == n
+    exit_index = np.where(is_open, n - 1, exit_bar)
+
+    reason = np.full(len(entries), EXIT_SIGNAL, dtype=np.int8)
+    if exit_reason is not None:
+        reason = np.asarray(exit_reason, dtype=np.int8).reshape(n_rows, n)[row, exit_index]
+    reason[is_open] = EXIT_NONE
+
+    entry_price = exit_price = np.full(len(entries), np.nan)
+    if prices is not None:
+        px = np.broadcast_to(np.asarray(prices, dtype=np.float64), position.shape).reshape(n_rows, n)
+        entry_price, exit_price = px[row, entry_index], px[row, exit_index]
+
+    return TradeLedger(
+        row=row,
+        entry_index=entry_index,
+        exit_index=exit_index,
+        entry_price=entry_price,
+        exit_price=exit_price,
+        exit_reason=reason,
+        pnl=pnl,
+        bars=exit_bar - entry_index,
+    )
+
+
+def signal_positions(signal: np.ndarray):
+    """Vectorized path: without SL/TP the position is the last BUY/SELL seen.
+
+    Works along the last axis, so a 2-D (strategies x bars) signal array is
+    processed in one pass. Returns `(position, exit_reason)`.
+    """
+    n = signal.shape[-1]
+    state = np.full(signal.shape, -1, dtype=np.int64)
+    state[signal == BUY] = 1
+    state[signal == SELL] = 0
+    if n:
+        state[..., 0] = 0
+    last = np.maximum.accumulate(np.where(state >= 0, np.arange(n), 0), axis=-1)
+    position = np.take_along_axis(state, last, axis=-1)
+
+    exit_reason = np.zeros(signal.shape, dtype=np.int8)
+    if n > 1:
+        exits = (position[..., :-1] == 1) & (position[..., 1:] == 0)
+        exit_reason[..., 1:][exits] = EXIT_SIGNAL
+    return position, exit_reason
+
+
+def _run_risk_loop(prices: np.ndarray, signal: np.ndarray, stop_loss_pct, take_profit_pct):
+    """Stateful path: iterate over Python lists, which is much cheaper than
+    indexing NumPy scalars one at a time."""
+    n = len(prices)
+    px = prices.tolist()
+    sig = signal.tolist()
+    sl_level = -stop_loss_pct / 100.0 if stop_loss_pct is not None else None
+    tp_level = take_profit_pct / 100.0 if take_profit_pct is not None else None
+
+    positions = [0] * n
+    exits = [EXIT_NONE] * n
+    position = 0
+    entry_price = None
+
+    for i in range(1, n):
+        price_now = px[i]
+        s = sig[i]
+        new_position = position
+
+        if s == BUY and position == 0:
+            new_position = 1
+            entry_price = price_now
+        elif s == SELL and position == 1:
+            new_position = 0
+            entry_price = None
+            exits[i] = EXIT_SIGNAL
+
+        if position == 1 and entry_price is not None:
+            move_from_entry = (price_now / entry_price) - 1.0
+            if sl_level is not None and move_from_entry <= sl_level:
+                new_position = 0
+                entry_price = None
+                exits[i] = EXIT_SL
+                signal[i] = SL
+            elif tp_level is not None and move_from_entry >= tp_level:
+                new_position = 0
+                entry_price = None
+                exits[i] = EXIT_TP
+                signal[i] = TP
+
+        positions[i] = new_position
+        position = new_position
+
+    return np.array(positions, dtype=np.int64), np.array(exits, dtype=np.int8)
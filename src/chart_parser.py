@@ -0,0 +1,80 @@
+# chart_parser.py
+"""
+Fast decoding of chart endpoint responses into OHLCV frames.
+
+The `timestamp` and `indicators.quote` arrays are converted straight into
+typed NumPy buffers (int64 timestamps and volume, float64 prices), filtered
+and sorted once, and wrapped in a DataFrame without further copies.
+"""
+import json
+
+import numpy as np
+import pandas as pd
+
+try:  # optional, roughly 2-3x faster than the stdlib decoder
+    import orjson
+except ImportError:
+    orjson = None
+
+PRICE_FIELDS = ("open", "high", "low", "close")
+
+
+def decode_json(raw: bytes):
+    """Decode a response body with orjson when installed, else the stdlib."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def parse_chart(data: dict) -> pd.DataFrame | None:
+    """Build a `date/open/high/low/close/volume` frame from a decoded chart payload.
+
+    Returns None when the payload has no result or no timestamps. Rows with
+    any missing field are dropped, and rows are sorted by date only if the
+    timestamps are not already increasing.
+    """
+    result = (data.get("chart") or {}).get("result")
+    if not result:
+        return None
+    res = result[0]
+    timestamps = res.get("timestamp")
+    if not timestamps:
+        return None
+
+    n = len(timestamps)
+    ts = np.array(timestamps, dtype=np.int64)
+    quote = res["indicators"]["quote"][0]
+
+    # None -> NaN happens in the float conversion itself
+    columns = {field: _float_array(quote.get(field), n) for field in PRICE_FIELDS}
+    volume = _float_array(quote.get("volume"), n)
+
+    valid = ~np.isnan(volume)
+    for values in columns.values():
+        valid &= ~np.isnan(values)
+
+    order = None
+    if not valid.all():
+        order = np.flatnonzero(valid)
+    if n > 1 and np.any(ts[1:] < ts[:-1]):
+        sorted_idx = np.argsort(ts, kind="stable")
+        order = sorted_idx[valid[sorted_idx]]
+
+    if order is not None:
+        ts = ts[order]
+        volume = volume[order]
+        columns = {field: values[order] for field, values in columns.items()}
+
+    frame = {"date": ts.astype("datetime64[s]")}
+    frame.update(columns)
+    frame["volume"] = volume.astype(np.int64)
+    return pd.DataFrame(frame, copy=False)
+
+
+def _float_array(values, n):
+    if values is None:
+        return np.full(n, np.nan)
+    arr = np.array(values, dtype=np.float64)
+    if len(arr) != n:
+        raise ValueError(f"Quote array has {len(arr)} values for {n} timestamps")
+    return arr
@@ -14,12 +14,30 @@ class TradingConfig:
     default_stop_loss: float = 0.05  # 5%
     default_take_profit: float = 0.10  # 10%
     trade_cost_bps: int = 10  # 10 basis points per trade
+    risk_window: int = 63  # bars in rolling risk metrics (~3 months of daily bars)
 
 @dataclass 
 class APIConfig:
     """Configuration for API keys and endpoints."""
     pass  # No external API keys required (uses yfinance)
 
+@dataclass
+class DataConfig:
+    """Configuration for market data fetching and caching."""
+    cache_enabled: bool = os.getenv("PRICE_CACHE_ENABLED", "1") != "0"
+    cache_dir: str = os.getenv(
+        "PRICE_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "auto-trader-ai", "prices")
+    )
+    cache_ttl_seconds: int = int(os.getenv("PRICE_CACHE_TTL", "900"))  # refresh latest bar after 15 min
+    max_workers: int = 8  # threads for batch fetches
+    analysis_workers: int = int(os.getenv("ANALYSIS_WORKERS", "0"))  # app analysis processes (0 = CPU count)
+    max_connections_per_host: int = 4
+    requests_per_second: float = 5.0  # token-bucket rate shared by all fetches
+    request_burst: int = 10
+    breaker_failure_threshold: int = 3  # consecutive failures before failing fast
+    breaker_reset_seconds: float = 60.0
+    indicator_cache_mb: int = int(os.getenv("INDICATOR_CACHE_MB", "256"))  # memory cap for cached indicators
+
 @dataclass
 class ModelConfig:
     """Configuration for AI models."""
@@ -29,8 +47,21 @@ class ModelConfig:
     transformer_layers: int = 2
     training_epochs: int = 40
     learning_rate: float = 0.005
+    batch_size: int = 64
+    validation_split: float = 0.2  # most recent share of windows held out for early stopping
+    early_stopping_patience: int = 5
+    finetune_epochs: int = 10  # epochs when warm-starting a walk-forward fold
+    inference_batch_size: int = 4096  # windows per forward pass in batched inference (0 = all at once)
+    torch_threads: int = int(os.getenv("TORCH_NUM_THREADS", "0"))  # 0 = torch default
+    registry_dir: str = os.getenv(
+        "MODEL_REGISTRY_DIR", os.path.join(os.path.expanduser("~"), ".cache", "auto-trader-ai", "models")
+    )
+    model_max_age_hours: float = float(os.getenv("MODEL_MAX_AGE_HOURS", "24"))  # retrain after this
+    export_format: str = os.getenv("MODEL_EXPORT_FORMAT", "torchscript")  # "torchscript", "onnx" or "" (eager)
+    export_quantize: bool = os.getenv("MODEL_EXPORT_QUANTIZE", "false").lower() == "true"  # int8 dynamic
 
 # Global configuration instances
 trading_config = TradingConfig()
 api_config = APIConfig()
+data_config = DataConfig()
 model_config = ModelConfig()
\ No newline at end of file
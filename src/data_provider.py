@@ -1,8 +1,21 @@
 # data_provider.py
 
+import re
 import requests
 import pandas as pd
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import replace
+from urllib.parse import urlparse
+
+from requests.adapters import HTTPAdapter
+
+from src.chart_parser import decode_json, parse_chart
+from src.config import data_config
+from src.price_cache import PriceCache, merge_bars
+from src.resilience import RetryPolicy, TokenBucket, CircuitBreaker
 
 BASE_URL = "https://query1.finance.yahoo.com/v8/finance/chart/{}"
 
@@ -12,61 +25,286 @@ HEADERS = {
     "Accept": "application/json"
 }
 
-def get_price_history(ticker, period="3mo", retries=3):
-    params = {}
+DAY = 86_400
 
-    if period.endswith("mo"):
-        params["range"] = period
-    else:
-        params["period1"] = "0"
-        params["period2"] = str(int(time.time()))
+# interval -> (longest span in days one request may cover, how far back the
+# endpoint serves that interval in days); None = unlimited
+INTERVALS = {
+    "1m": (7, 30),
+    "2m": (60, 60),
+    "5m": (60, 60),
+    "15m": (60, 60),
+    "30m": (60, 60),
+    "60m": (730, 730),
+    "1h": (730, 730),
+    "1d": (None, None),
+    "1wk": (None, None),
+    "1mo": (None, None),
+}
 
-    params["interval"] = "1d"
+price_cache = PriceCache(data_config.cache_dir, data_config.cache_ttl_seconds)
 
-    for attempt in range(1, retries + 1):
-        try:
-            resp = requests.get(BASE_URL.format(ticker), params=params, headers=HEADERS, timeout=10)
+# Shared by every fetch in the process
+retry_policy = RetryPolicy(retries=3)
+rate_limiter = TokenBucket(data_config.requests_per_second, data_config.request_burst)
+circuit_breaker = CircuitBreaker(data_config.breaker_failure_threshold, data_config.breaker_reset_seconds)
 
-            if resp.status_code != 200:
-                print(f"HTTP {resp.status_code} for {ticker} (attempt {attempt}/{retries})")
-                time.sleep(attempt)
-                continue
 
-            data = resp.json()
-            result = data.get("chart", {}).get("result", None)
+def _make_session():
+    """Shared session so keep-alive connections (and TLS handshakes) are reused."""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=max(data_config.max_workers, data_config.max_connections_per_host),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(HEADERS)
+    return session
+
+
+session = _make_session()
+
+_host_slots = {}
+_host_slots_lock = threading.Lock()
+
+
+@contextmanager
+def _host_slot(url):
+    """Limit in-flight requests per host to `max_connections_per_host`."""
+    host = urlparse(url).netloc
+    with _host_slots_lock:
+        slot = _host_slots.get(host)
+        if slot is None:
+            slot = _host_slots[host] = threading.BoundedSemaphore(data_config.max_connections_per_host)
+    with slot:
+        yield
 
-            if not result:
-                print(f"⚠️ No chart result for {ticker} (attempt {attempt}/{retries})")
-                time.sleep(attempt)
-                continue
 
-            res = result[0]
-            timestamps = res.get("timestamp", [])
-            if not timestamps:
-                print(f"⚠️ No timestamps for {ticker} (attempt {attempt}/{retries})")
-                time.sleep(attempt)
+def get_price_histories(tickers, period="3mo", retries=None, use_cache=None, max_workers=None,
+                        interval="1d", start=None, end=None):
+    """Fetch several tickers concurrently over the shared connection pool.
+
+    Returns `(frames, errors)`: a dict of non-empty DataFrames and a dict of
+    error messages, both keyed by ticker.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    frames, errors = {}, {}
+    if not tickers:
+        return frames, errors
+
+    workers = min(max_workers or data_config.max_workers, len(tickers))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fetch") as pool:
+        futures = {
+            t: pool.submit(get_price_history, t, period, retries, use_cache, interval, start, end)
+            for t in tickers
+        }
+        for ticker, future in futures.items():
+            try:
+                df = future.result()
+            except Exception as e:
+                errors[ticker] = str(e)
                 continue
+            if df is None or df.empty:
+                errors[ticker] = "No data returned"
+            else:
+                frames[ticker] = df
+
+    return frames, errors
+
+
+def get_price_history(ticker, period="3mo", retries=None, use_cache=None, interval="1d",
+                      start=None, end=None):
+    """Fetch OHLCV bars for `ticker`.
+
+    The range is `period` back from now (e.g. "5d", "2wk", "6mo", "1y",
+    "ytd", "max") unless an explicit `start` (and optionally `end`) is
+    given. Ranges longer than the endpoint allows for `interval` are split
+    into chunks fetched in parallel and stitched back together.
+    """
+    if interval not in INTERVALS:
+        raise ValueError(f"Unsupported interval '{interval}'. Choose from {list(INTERVALS)}")
+    if use_cache is None:
+        use_cache = data_config.cache_enabled
+
+    now = int(time.time())
+    start_ts = _to_epoch(start) if start is not None else _period_start(period, now)
+    end_ts = min(_to_epoch(end), now) if end is not None else now
+
+    _, max_lookback = INTERVALS[interval]
+    if max_lookback is not None and start_ts < now - max_lookback * DAY:
+        print(f"⚠️ {interval} bars only go back {max_lookback} days; truncating {ticker} range")
+        start_ts = now - max_lookback * DAY
+    if start_ts >= end_ts:
+        return pd.DataFrame()
+
+    if not use_cache:
+        df, _ = _download_range(ticker, interval, start_ts, end_ts, retries)
+        return df
+    return _get_cached(ticker, interval, start_ts, end_ts, retries)
+
+
+def _to_epoch(value):
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert("UTC").tz_localize(None)
+    return int((ts - pd.Timestamp(0)).total_seconds())
+
 
-            prices = res["indicators"]["quote"][0]
+def _period_start(period, now):
+    """Epoch seconds from which `period` needs bars (0 = full history)."""
+    if period == "max":
+        return 0
+    current = pd.Timestamp(now, unit="s")
+    if period == "ytd":
+        return int(pd.Timestamp(year=current.year, month=1, day=1).timestamp())
 
-            df = pd.DataFrame({
-                "date": pd.to_datetime(timestamps, unit="s"),
-                "open": prices.get("open", []),
-                "high": prices.get("high", []),
-                "low": prices.get("low", []),
-                "close": prices.get("close", []),
-                "volume": prices.get("volume", []),
-            })
+    match = re.fullmatch(r"(\d+)(d|wk|mo|y)", period)
+    if not match:
+        raise ValueError(f"Unsupported period '{period}'")
+    n, unit = int(match.group(1)), match.group(2)
+    offset = {
+        "d": pd.DateOffset(days=n),
+        "wk": pd.DateOffset(weeks=n),
+        "mo": pd.DateOffset(months=n),
+        "y": pd.DateOffset(years=n),
+    }[unit]
+    return max(int((current - offset).timestamp()), 0)
 
-            df.dropna(inplace=True)
-            df.sort_values("date", inplace=True)
-            df.reset_index(drop=True, inplace=True)
 
-            return df
+def _get_cached(ticker, interval, start, end, retries):
+    cached, meta = price_cache.load(ticker, interval)
 
-        except Exception as e:
-            print(f"❌ Error fetching {ticker}: {e} (attempt {attempt}/{retries})")
-            time.sleep(attempt)
+    if cached is not None and not cached.empty and meta.get("covered_from", end) <= start:
+        if price_cache.needs_refresh(meta, end):
+            # Only fetch bars from the last cached one on (it may have been partial)
+            last_ts = int(cached["date"].iloc[-1].timestamp())
+            new, complete = _download_range(ticker, interval, min(last_ts, end), end, retries)
+            if complete:
+                cached = price_cache.store(ticker, interval, merge_bars(cached, new),
+                                           meta["covered_from"], max(end, meta.get("fetched_to", 0)))
+            else:
+                # Serve what arrived, but leave the coverage alone so the gap is retried
+                print(f"⚠️ Refresh failed for {ticker}, serving cached bars")
+                cached = merge_bars(cached, new)
+        return _slice_range(cached, start, end)
 
+    df, complete = _download_range(ticker, interval, start, end, retries)
+    if df.empty or not complete:
+        return df
+
+    if cached is None or cached.empty or end >= meta.get("covered_from", end):
+        # The new range joins the cached one, so the stored history stays contiguous
+        fetched_to = max(end, meta.get("fetched_to", 0)) if meta else end
+        price_cache.store(ticker, interval, merge_bars(cached, df), start, fetched_to)
+    return df
+
+
+def _slice_range(df, start, end):
+    dates = df["date"]
+    mask = (dates >= pd.Timestamp(start, unit="s")) & (dates <= pd.Timestamp(end, unit="s"))
+    return df[mask].reset_index(drop=True)
+
+
+def _chunk_ranges(start, end, span):
+    """Split [start, end] into consecutive windows of at most `span` seconds."""
+    if span is None or end - start <= span:
+        return [(start, end)]
+    edges = list(range(start, end, span)) + [end]
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def _download_range(ticker, interval, start, end, retries=None):
+    """Download [start, end] in endpoint-sized chunks and stitch the results.
+
+    Returns `(bars, complete)`; `complete` is False when any chunk failed
+    (as opposed to legitimately holding no bars), in which case `bars` only
+    has the chunks that arrived and must not be cached as covering the range.
+    """
+    max_span, _ = INTERVALS[interval]
+    chunks = _chunk_ranges(start, end, max_span * DAY if max_span else None)
+
+    def fetch(bounds):
+        params = {"period1": str(bounds[0]), "period2": str(bounds[1]), "interval": interval}
+        return _download(ticker, params, retries)
+
+    if len(chunks) == 1:
+        df = fetch(chunks[0])
+        return (pd.DataFrame(), False) if df is None else (df, True)
+
+    with ThreadPoolExecutor(max_workers=min(len(chunks), data_config.max_workers),
+                            thread_name_prefix=f"chunk-{ticker}") as pool:
+        results = list(pool.map(fetch, chunks))
+    failed = sum(df is None for df in results)
+    if failed:
+        print(f"⚠️ {failed} of {len(chunks)} chunks failed for {ticker}")
+    parts = [df for df in results if df is not None and not df.empty]
+    if not parts:
+        return pd.DataFrame(), not failed
+
+    df = pd.concat(parts, ignore_index=True)
+    df = df.drop_duplicates("date", keep="last").sort_values("date")
+    return df.reset_index(drop=True), not failed
+
+
+def _download(ticker, params, retries=None):
+    """Fetch one request's bars.
+
+    Returns None when the fetch failed (circuit open, HTTP or transport
+    errors, malformed payloads) and an empty DataFrame when the endpoint
+    has no bars for the range, e.g. a weekend or holiday chunk.
+    """
+    policy = retry_policy if retries is None else replace(retry_policy, retries=retries)
+    url = BASE_URL.format(ticker)
+    host = urlparse(url).netloc
+
+    for key in (host, ticker):
+        if not circuit_breaker.allow(key):
+            print(f"⛔ Circuit open for {key}, skipping {ticker}")
+            return None
+
+    host_failure = False
+    for attempt in range(1, policy.retries + 1):
+        retryable = True
+        try:
+            rate_limiter.acquire()
+            with _host_slot(url):
+                resp = session.get(url, params=params, timeout=10)
+
+            if resp.status_code != 200:
+                print(f"HTTP {resp.status_code} for {ticker} (attempt {attempt}/{policy.retries})")
+                retryable = policy.is_retryable(resp.status_code)
+                host_failure = retryable
+            else:
+                host_failure = False
+                df = parse_chart(decode_json(resp.content))
+                if df is not None and not df.empty:
+                    circuit_breaker.record_success(host)
+                    circuit_breaker.record_success(ticker)
+                    return df
+                # Empty chart: no bars in this range (not a failure), retrying won't help
+                print(f"⚠️ No chart data for {ticker}")
+                circuit_breaker.record_success(host)
+                circuit_breaker.record_success(ticker)
+                return pd.DataFrame()
+
+        except requests.RequestException as e:
+            print(f"❌ Error fetching {ticker}: {e} (attempt {attempt}/{policy.retries})")
+            host_failure = True
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            print(f"❌ Malformed response for {ticker}: {e} (attempt {attempt}/{policy.retries})")
+            retryable = False
+
+        if not retryable or attempt == policy.retries:
+            break
+        # Blocking is fine here: this thread serves only this ticker (or chunk),
+        # and neither the backoff nor the rate limiter sleeps holding a lock
+        time.sleep(policy.delay(attempt))
+
+    if host_failure:
+        circuit_breaker.record_failure(host)
+    else:
+        circuit_breaker.record_success(host)
+    circuit_breaker.record_failure(ticker)
     print(f"🚫 Final failure fetching {ticker}")
-    return pd.DataFrame()
+    return None
@@ -0,0 +1,320 @@
+# engine.py
+"""
+Headless engine: fetch → preprocess → strategy → AI → metrics → portfolio.
+
+The same stages the Streamlit app runs, as plain functions with no `st.*`
+calls, so batch jobs can import, schedule and profile them. `run` handles
+a whole request; the app calls the stage functions (`analyze_ticker`,
+`ticker_summary`, `run_portfolio`) around its caching and drawing.
+
+Usage:
+    python -m src.engine AAPL MSFT ... [--tickers-file FILE] [--period 6mo] [--interval 1d]
+        [--short 10] [--long 30] [--rsi-macd] [--ai {Heuristic,Transformer}]
+        [--stop-loss PCT] [--take-profit PCT] [--cost-bps N] [--capital USD]
+        [--max-position PCT] [--rebalance MODE] [--processes N]
+        [--out DIR] [--format parquet|csv|json]
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from src.config import data_config, trading_config
+from src.data_provider import get_price_histories
+from src.metrics import compute_performance_stats
+from src.panel import Panel, build_panel, equal_weight_portfolio
+from src.pipeline import AI_COLUMNS, analyze_ticker, trade_ledger
+from src.portfolio import REBALANCE_MODES, PortfolioResult, backtest_portfolio
+
+OUTPUT_FORMATS = ("parquet", "csv", "json")
+
+
+@dataclass
+class PortfolioSummary:
+    """Allocated portfolio next to equal-weight buy & hold, in dollars."""
+    panel: Panel
+    result: PortfolioResult
+    bh_equity: np.ndarray
+    capital: float
+
+    @property
+    def total_return(self) -> float:
+        return self.result.equity[-1] / self.capital - 1
+
+    @property
+    def bh_return(self) -> float:
+        return self.bh_equity[-1] / self.capital - 1
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame({
+            "date": self.panel.dates,
+            "equity": self.result.equity,
+            "cash": self.result.cash,
+            "costs": self.result.costs,
+            "bh_equity": self.bh_equity,
+        })
+
+
+@dataclass
+class EngineResult:
+    """Analyzed frames, per-ticker summary and the optional portfolio."""
+    frames: dict  # ticker -> (df, price_col)
+    summary: pd.DataFrame
+    portfolio: PortfolioSummary | None = None
+    errors: dict = field(default_factory=dict)
+
+    def tables(self) -> dict:
+        """Result tables by name, ready to write."""
+        summary = self.summary.reset_index()
+        if self.errors:
+            failed = pd.DataFrame({"ticker": list(self.errors), "error": list(self.errors.values())})
+            summary = pd.concat([summary, failed], ignore_index=True)
+            if "Trades" in summary:
+                summary["Trades"] = summary["Trades"].astype("Int64")  # stays integer next to failed rows
+        tables = {
+            "summary": summary,
+            "bars": _stack({t: df for t, (df, _) in self.frames.items()}),
+            "trades": _stack({t: trade_ledger(df, price_col) for t, (df, price_col) in self.frames.items()}),
+        }
+        if self.portfolio is not None:
+            tables["portfolio"] = self.portfolio.to_frame()
+        return tables
+
+    def write(self, out_dir: str, fmt: str = "parquet") -> list:
+        """Write every table to `out_dir` as `<name>.<fmt>`; returns the paths."""
+        if fmt not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format '{fmt}'. Choose from {OUTPUT_FORMATS}")
+        os.makedirs(out_dir, exist_ok=True)
+        paths = []
+        for name, table in self.tables().items():
+            path = os.path.join(out_dir, f"{name}.{fmt}")
+            write_table(table, path, fmt)
+            paths.append(path)
+        return paths
+
+
+def _stack(tables: dict) -> pd.DataFrame:
+    """Concatenate per-ticker frames with a leading `ticker` column."""
+    if not tables:
+        return pd.DataFrame({"ticker": []})
+    return pd.concat(
+        [df.assign(ticker=t)[["ticker", *df.columns]] for t, df in tables.items()], ignore_index=True
+    )
+
+
+def write_table(df: pd.DataFrame, path: str, fmt: str):
+    if fmt == "parquet":
+        df.to_parquet(path, index=False)
+    elif fmt == "csv":
+        df.to_csv(path, index=False)
+    else:
+        df.to_json(path, orient="records", date_format="iso")
+
+
+def ticker_summary(df: pd.DataFrame, price_col: str) -> dict:
+    """Performance stats of one analyzed frame, plus its buy & hold return."""
+    stats = compute_performance_stats(df, price_col)
+    stats["bh_return"] = df[price_col].iloc[-1] / df[price_col].iloc[0] - 1
+    return stats
+
+
+def run_portfolio(results: dict, capital: float = trading_config.default_capital,
+                  max_position_size: float = trading_config.max_position_size,
+                  trade_cost_bps: float = trading_config.trade_cost_bps, rebalance: str = "none") -> PortfolioSummary:
+    """Allocated portfolio over analyzed tickers (ticker -> (df, price_col))."""
+    # Align all tickers on one date index, then reduce across tickers
+    panel = build_panel(
+        {t: df for t, (df, _) in results.items()},
+        {
+            "close": {t: price_col for t, (_, price_col) in results.items()},
+            "position": "position",
+            "equity": "equity_curve",
+            "bh_equity": "bh_equity",
+        },
+    )
+    result = backtest_portfolio(
+        panel["close"], panel["position"], capital=capital,
+        max_position_size=max_position_size, trade_cost_bps=trade_cost_bps, rebalance=rebalance,
+    )
+    _, _, bh_equity = equal_weight_portfolio(panel, capital)
+    return PortfolioSummary(panel=panel, result=result, bh_equity=bh_equity, capital=capital)
+
+
+def analysis_workers(processes: int | None = None) -> int:
+    """`processes`, else `DataConfig.analysis_workers` (0 = CPU count)."""
+    return processes or data_config.analysis_workers or os.cpu_count() or 1
+
+
+def new_analysis_pool(workers: int) -> ProcessPoolExecutor | None:
+    """Process pool for `analyze_ticker`; None (run in-process) for one worker."""
+    if workers <= 1:
+        return None
+    # spawn: callers (e.g. the Streamlit server) may be multi-threaded, which fork does not handle safely
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def analyze_in(pool: ProcessPoolExecutor | None, raw_df: pd.DataFrame, strategy_params: dict,
+               ai_model: str | None, ticker: str):
+    """`analyze_ticker` in `pool`, or in-process when `pool` is None."""
+    if pool is None:
+        return analyze_ticker(raw_df, strategy_params, ai_model, ticker)
+    return pool.submit(analyze_ticker, raw_df, strategy_params, ai_model, ticker).result()
+
+
+def analysis_error(e: Exception) -> str:
+    """Per-ticker error message for a failed analysis."""
+    return f"{type(e).__name__}: {e}"
+
+
+def analyze_frames(frames: dict, strategy_params: dict, ai_model: str | None = None,
+                   processes: int | None = None, pool: ProcessPoolExecutor | None = None):
+    """Run `analyze_ticker` over fetched frames, yielding `(ticker, result,
+    error)` as each finishes; `result` is `(df, price_col)` or None.
+
+    Runs on `pool` when given, else on a pool of `analysis_workers(processes)`
+    started for the call (1 runs in-process). Any exception, including a
+    crashed worker, is reported as that ticker's error instead of ending
+    the run.
+    """
+    owned = new_analysis_pool(min(analysis_workers(processes), len(frames))) if pool is None else None
+    pool = pool or owned
+    try:
+        if pool is None:
+            for ticker, raw_df in frames.items():
+                try:
+                    yield ticker, analyze_ticker(raw_df, strategy_params, ai_model, ticker), None
+                except Exception as e:
+                    yield ticker, None, analysis_error(e)
+            return
+
+        futures = {
+            pool.submit(analyze_ticker, raw_df, strategy_params, ai_model, ticker): ticker
+            for ticker, raw_df in frames.items()
+        }
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, analysis_error(e)
+    finally:
+        if owned is not None:
+            owned.shutdown(cancel_futures=True)
+
+
+def run(tickers, strategy_params: dict | None = None, period: str = "6mo", interval: str = "1d",
+        ai_model: str | None = None, capital: float = trading_config.default_capital,
+        max_position_size: float = trading_config.max_position_size, rebalance: str = "none",
+        processes: int | None = None) -> EngineResult:
+    """Fetch, analyze and summarize `tickers`; with 2+ tickers also run the portfolio.
+
+    `strategy_params` are `apply_sma_crossover` keyword arguments; the
+    portfolio is charged the same `trade_cost_bps`.
+    """
+    if ai_model is not None and ai_model not in AI_COLUMNS:
+        raise ValueError(f"Unknown AI model '{ai_model}'. Choose from {list(AI_COLUMNS)}")
+    if rebalance not in REBALANCE_MODES:
+        raise ValueError(f"Unknown rebalance mode '{rebalance}'. Choose from {REBALANCE_MODES}")
+    strategy_params = dict(strategy_params or {})
+    tickers = list(dict.fromkeys(tickers))
+
+    frames, errors = get_price_histories(tickers, period, interval=interval)
+    results = {}
+    for ticker, result, error in analyze_frames(frames, strategy_params, ai_model, processes):
+        if error is None:
+            results[ticker] = result
+        else:
+            errors[ticker] = error
+    results = {t: results[t] for t in tickers if t in results}
+
+    summary = pd.DataFrame.from_dict(
+        {t: ticker_summary(df, price_col) for t, (df, price_col) in results.items()}, orient="index"
+    )
+    summary.index.name = "ticker"
+
+    portfolio = None
+    if len(results) > 1:
+        portfolio = run_portfolio(
+            results, capital, max_position_size, strategy_params.get("trade_cost_bps", 0), rebalance
+        )
+    return EngineResult(frames=results, summary=summary, portfolio=portfolio, errors=errors)
+
+
+def read_tickers(tickers, path: str | None = None) -> list:
+    """Upper-cased, de-duplicated tickers from arguments plus an optional
+    file with one ticker per line (`#` starts a comment line)."""
+    tickers = [t.upper() for t in tickers]
+    if path:
+        with open(path) as f:
+            tickers += [line.strip().upper() for line in f if line.strip() and not line.startswith("#")]
+    return list(dict.fromkeys(tickers))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("tickers", nargs="*", help="ticker symbols")
+    parser.add_argument("--tickers-file", help="file with one ticker per line")
+    parser.add_argument("--period", default="6mo")
+    parser.add_argument("--interval", default="1d")
+    parser.add_argument("--short", type=int, default=10, help="short SMA window")
+    parser.add_argument("--long", type=int, default=30, help="long SMA window")
+    parser.add_argument("--rsi-macd", action="store_true", help="require RSI + MACD confirmation")
+    parser.add_argument("--rsi-window", type=int, default=14)
+    parser.add_argument("--max-vol", type=float, help="volatility filter: max daily volatility percent")
+    parser.add_argument("--vol-window", type=int, default=20)
+    parser.add_argument("--ai", choices=list(AI_COLUMNS), help="add an AI direction prediction")
+    parser.add_argument("--stop-loss", type=float, help="stop-loss percent")
+    parser.add_argument("--take-profit", type=float, help="take-profit percent")
+    parser.add_argument("--cost-bps", type=int, default=trading_config.trade_cost_bps)
+    parser.add_argument("--capital", type=float, default=trading_config.default_capital)
+    parser.add_argument("--max-position", type=float, default=trading_config.max_position_size * 100,
+                        help="max position size, percent of equity")
+    parser.add_argument("--rebalance", choices=REBALANCE_MODES, default="none")
+    parser.add_argument("--processes", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--out", help="directory for the result tables")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="parquet")
+    args = parser.parse_args(argv)
+
+    tickers = read_tickers(args.tickers, args.tickers_file)
+    if not tickers:
+        parser.error("no tickers given")
+
+    strategy_params = {
+        "short_window": args.short,
+        "long_window": args.long,
+        "use_rsi_macd": args.rsi_macd,
+        "rsi_window": args.rsi_window,
+        "use_vol_filter": args.max_vol is not None,
+        "vol_window": args.vol_window,
+        "max_vol_pct": args.max_vol,
+        "trade_cost_bps": args.cost_bps,
+        "stop_loss_pct": args.stop_loss,
+        "take_profit_pct": args.take_profit,
+        "use_risk": args.stop_loss is not None or args.take_profit is not None,
+    }
+    result = run(
+        tickers, strategy_params, period=args.period, interval=args.interval, ai_model=args.ai,
+        capital=args.capital, max_position_size=args.max_position / 100, rebalance=args.rebalance,
+        processes=args.processes,
+    )
+
+    for ticker, error in result.errors.items():
+        print(f"⚠️ {ticker}: {error}", file=sys.stderr)
+    if result.summary.empty:
+        return 1
+    print(result.summary.to_string(float_format=lambda v: f"{v:.4f}"))
+    if result.portfolio is not None:
+        print(f"\nPortfolio return: {result.portfolio.total_return * 100:.2f}% "
+              f"(buy & hold {result.portfolio.bh_return * 100:.2f}%)")
+    if args.out:
+        for path in result.write(args.out, args.format):
+            print(f"wrote {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+# indicators.py
+"""
+Shared indicator cache.
+
+Indicator results are memoized on a fingerprint of the input series values
+plus the indicator name and parameters, with LRU eviction under a memory
+cap. The cache is process-wide, so it survives Streamlit reruns: moving one
+widget only recomputes indicators whose inputs actually changed.
+"""
+import functools
+import hashlib
+import inspect
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from src.config import data_config
+
+
+def fingerprint(series) -> str:
+    """Content hash of a series' values (the index is not part of the key)."""
+    values = np.ascontiguousarray(np.asarray(series))
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str(values.dtype).encode())
+    h.update(str(values.shape).encode())
+    h.update(values.view(np.uint8) if values.dtype != object else repr(values.tolist()).encode())
+    return h.hexdigest()
+
+
+class IndicatorCache:
+    """Thread-safe LRU cache of indicator arrays, bounded by total bytes."""
+
+    def __init__(self, max_bytes: int = 256 * 2**20):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, arrays: tuple, names: tuple):
+        nbytes = sum(a.nbytes for a in arrays)
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = (arrays, names)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                _, (old, _) = self._entries.popitem(last=False)
+                self._bytes -= sum(a.nbytes for a in old)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+indicator_cache = IndicatorCache(max_bytes=data_config.indicator_cache_mb * 2**20)
+
+
+def cached_indicator(name: str):
+    """Memoize an indicator `fn(series, *params)` returning a Series or tuple of Series.
+
+    Cached results are rebuilt as Series on the caller's index. The undecorated
+    function stays available as `fn.uncached`.
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(series, *args, **kwargs):
+            bound = signature.bind(series, *args, **kwargs)
+            bound.apply_defaults()
+            params = tuple(bound.arguments.items())[1:]
+            key = (fingerprint(series), name, params)
+
+            entry = indicator_cache.get(key)
+            if entry is not None:
+                arrays, names = entry
+                out = tuple(pd.Series(a, index=series.index, name=n, copy=False) for a, n in zip(arrays, names))
+                return out if len(out) > 1 else out[0]
+
+            result = fn(series, *args, **kwargs)
+            parts = result if isinstance(result, tuple) else (result,)
+            arrays = []
+            for part in parts:
+                values = part.to_numpy(copy=True)
+                values.flags.writeable = False
+                arrays.append(values)
+            indicator_cache.put(key, tuple(arrays), tuple(p.name for p in parts))
+            return result
+
+        wrapper.uncached = fn
+        return wrapper
+    return decorator
+
+
+@cached_indicator("sma")
+def sma(series: pd.Series, window: int) -> pd.Series:
+    return series.rolling(window=window, min_periods=window).mean()
+
+
+@cached_indicator("volatility")
+def volatility(series: pd.Series, window: int) -> pd.Series:
+    """Rolling standard deviation of simple returns."""
+    return series.pct_change().rolling(window).std()
@@ -2,51 +2,106 @@
 import numpy as np
 import pandas as pd
 
-def compute_performance_stats(df, price_col, risk_free_rate=0.03):
-    df = df.copy()
-    
-    # Validate required columns
-    required_cols = ["equity_curve", "date", "strategy_returns_net", "position"]
-    missing_cols = [col for col in required_cols if col not in df.columns]
-    if missing_cols:
-        raise KeyError(f"Missing required columns: {missing_cols}")
+from src.backtest import TradeLedger, extract_trades
+
+STAT_NAMES = [
+    "total_return", "CAGR", "Sharpe", "MaxDD", "WinRate", "ProfitFactor", "Trades", "AvgHold", "Exposure",
+]
+
 
-    # Strategy equity curve
-    equity = df["equity_curve"]
+def _reduce(ufunc, values, where):
+    """Float64 reduction over the bar axis restricted to `where`, without a masked copy."""
+    return ufunc.reduce(values, axis=-1, dtype=np.float64, where=where, initial=0.0)
 
-    # Total Return
-    total_return = equity.iloc[-1] - 1
 
-    # CAGR (Annualized Return)
-    days = (df["date"].iloc[-1] - df["date"].iloc[0]).days
-    cagr = (equity.iloc[-1]) ** (365 / days) - 1 if days > 0 else np.nan
+def batch_performance_stats(returns, equity, position, dates=None, risk_free_rate=0.03) -> dict:
+    """Performance stats for many strategies at once.
 
-    # Daily returns
-    daily_ret = df["strategy_returns_net"].dropna()
+    `returns` (net strategy returns), `equity` and `position` are arrays of
+    shape (..., n_bars) — e.g. (strategies x bars) — in float32 or float64;
+    they are read in place, never copied into frames. NaN returns are
+    skipped as `dropna` would. `dates` (one per bar) is needed for CAGR.
+    Returns a dict of arrays of shape (...,) with the same keys and
+    definitions as `compute_performance_stats`. Trade stats are per round
+    trip (see `backtest.extract_trades`); a trade wins when its compounded
+    P&L is positive.
+    """
+    returns = np.asarray(returns)
+    equity = np.asarray(equity)
+    position = np.asarray(position)
 
-    # Sharpe Ratio
-    sharpe = (daily_ret.mean() - risk_free_rate / 252) / (daily_ret.std() + 1e-9)
-    sharpe = sharpe * np.sqrt(252)
+    # Total return / CAGR
+    final = equity[..., -1].astype(np.float64)
+    total_return = final - 1
+    days = 0
+    if dates is not None and len(dates) > 1:
+        span = np.asarray(dates, dtype="datetime64[ns]")
+        days = int((span[-1] - span[0]) // np.timedelta64(1, "D"))
+    with np.errstate(invalid="ignore"):
+        cagr = final ** (365 / days) - 1 if days > 0 else np.full(final.shape, np.nan)
 
-    # Max Drawdown
-    roll_max = equity.cummax()
-    dd = equity / roll_max - 1
-    max_dd = dd.min()
+    # Sharpe: mean / sample std of the non-NaN returns
+    valid = ~np.isnan(returns)
+    count = valid.sum(axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = _reduce(np.add, returns, valid) / count
+        dev = returns - mean[..., None].astype(returns.dtype)
+        np.multiply(dev, dev, out=dev)
+        std = np.sqrt(_reduce(np.add, dev, valid) / (count - 1))
+    std = np.where(count > 1, std, np.nan)
+    sharpe = (mean - risk_free_rate / 252) / (std + 1e-9) * np.sqrt(252)
 
-    # Trade stats
-    trades = df[df["position"].diff() != 0]
-    wins = trades[trades["strategy_returns_net"] > 0]
-    losses = trades[trades["strategy_returns_net"] <= 0]
-    win_rate = len(wins) / max(len(trades), 1)
-    losses_sum = abs(losses["strategy_returns_net"].sum())
-    profit_factor = wins["strategy_returns_net"].sum() / max(losses_sum, 1e-9) if losses_sum > 0 else np.inf
+    # Max drawdown from the running peak (NaN bars ignored, as cummax does)
+    peak = np.fmax.accumulate(equity, axis=-1)
+    np.divide(equity, peak, out=peak)
+    max_dd = np.fmin.reduce(peak, axis=-1).astype(np.float64) - 1
+
+    # Trade stats from the round-trip ledger
+    stats = trade_stats(extract_trades(position, returns), final.size, position.shape[-1])
+    trade = {k: v.reshape(final.shape) for k, v in stats.items()}
 
     return {
         "total_return": total_return,
         "CAGR": cagr,
         "Sharpe": sharpe,
         "MaxDD": max_dd,
-        "WinRate": win_rate,
-        "ProfitFactor": profit_factor,
-        "Trades": len(trades),
+        **trade,
     }
+
+
+def trade_stats(ledger: TradeLedger, n_rows: int = 1, n_bars: int | None = None) -> dict:
+    """Per-row WinRate, ProfitFactor, Trades, AvgHold (bars) and Exposure
+    (share of `n_bars` in the market) from a trade ledger."""
+    row = ledger.row
+    trades = np.bincount(row, minlength=n_rows)
+    win = ledger.pnl > 0
+    win_sum = np.bincount(row, weights=np.where(win, ledger.pnl, 0.0), minlength=n_rows)
+    loss_sum = np.abs(np.bincount(row, weights=np.where(win, 0.0, ledger.pnl), minlength=n_rows))
+    held = np.bincount(row, weights=ledger.bars, minlength=n_rows)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {
+            "WinRate": np.bincount(row, weights=win, minlength=n_rows) / np.maximum(trades, 1),
+            "ProfitFactor": np.where(loss_sum > 0, win_sum / np.maximum(loss_sum, 1e-9), np.inf),
+            "Trades": trades,
+            "AvgHold": held / trades,
+            "Exposure": held / n_bars if n_bars else np.full(n_rows, np.nan),
+        }
+
+
+def compute_performance_stats(df, price_col, risk_free_rate=0.03):
+    # Validate required columns
+    required_cols = ["equity_curve", "date", "strategy_returns_net", "position"]
+    missing_cols = [col for col in required_cols if col not in df.columns]
+    if missing_cols:
+        raise KeyError(f"Missing required columns: {missing_cols}")
+
+    stats = batch_performance_stats(
+        df["strategy_returns_net"].to_numpy(dtype=np.float64),
+        df["equity_curve"].to_numpy(dtype=np.float64),
+        df["position"].to_numpy(),
+        df["date"].to_numpy(),
+        risk_free_rate=risk_free_rate,
+    )
+    stats = {k: v[()] for k, v in stats.items()}
+    stats["Trades"] = int(stats["Trades"])
+    return stats
@@ -0,0 +1,136 @@
+# model_export.py
+"""
+CPU inference export for `PriceTransformer`.
+
+`export_model` writes a trained model as a TorchScript file (traced and
+frozen, optionally with int8 dynamically quantized linear layers) or as an
+ONNX graph for ONNX Runtime (optional dependency, also with optional int8
+dynamic quantization). `load_predictor` loads either artifact behind one
+interface: a callable from a float32 `(batch, seq_len, 1)` array to a
+`(batch,)` array of predicted next-bar returns. `eager_predictor` wraps an
+in-memory model the same way, so callers can prefer the exported artifact
+and fall back to eager mode.
+"""
+import os
+import threading
+import warnings
+from contextlib import contextmanager
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+try:  # optional: ONNX export / inference
+    import onnxruntime
+except ImportError:
+    onnxruntime = None
+
+EXTENSIONS = {"torchscript": ".ts", "onnx": ".onnx"}
+
+_loaded = {}  # path -> (mtime, predictor)
+_lock = threading.Lock()
+
+
+@contextmanager
+def _quiet_jit():
+    # Recent torch releases flag torch.jit as deprecated on every call
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", FutureWarning)
+        yield
+
+
+def _example_input(seq_len: int) -> torch.Tensor:
+    return torch.zeros(2, seq_len, 1)
+
+
+def _export_torchscript(model, path, seq_len, quantize):
+    if quantize:
+        model = torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+    # The fused encoder fast path rejects quantized linear layers; tracing
+    # with it disabled records the unfused ops, so the artifact runs as is.
+    fastpath = torch.backends.mha.get_fastpath_enabled()
+    torch.backends.mha.set_fastpath_enabled(not quantize and fastpath)
+    try:
+        with torch.no_grad(), _quiet_jit():
+            traced = torch.jit.trace(model, _example_input(seq_len))
+    finally:
+        torch.backends.mha.set_fastpath_enabled(fastpath)
+    with _quiet_jit():
+        torch.jit.save(torch.jit.freeze(traced), path)
+
+
+def _export_onnx(model, path, seq_len, quantize):
+    if onnxruntime is None:
+        raise ImportError("ONNX export requires the onnx and onnxruntime packages")
+    target = path + ".fp32" if quantize else path
+    torch.onnx.export(
+        model, (_example_input(seq_len),), target,
+        input_names=["returns"], output_names=["pred"],
+        dynamic_axes={"returns": {0: "batch"}, "pred": {0: "batch"}},
+        dynamo=False,
+    )
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(target, path, weight_type=QuantType.QInt8)
+        os.remove(target)
+
+
+def export_model(model, path: str, seq_len: int, fmt: str = "torchscript", quantize: bool = False) -> str:
+    """Write `model` to `path` as `fmt` ("torchscript" or "onnx"); returns `path`.
+
+    The file is written next to its final name and moved into place, so a
+    concurrent reader never sees a partial artifact.
+    """
+    if fmt not in EXTENSIONS:
+        raise ValueError(f"Unknown export format '{fmt}'. Choose from {sorted(EXTENSIONS)}")
+    model.eval()
+    tmp = f"{path}.{os.getpid()}.tmp"
+    if fmt == "torchscript":
+        _export_torchscript(model, tmp, seq_len, quantize)
+    else:
+        _export_onnx(model, tmp, seq_len, quantize)
+    os.replace(tmp, path)
+    return path
+
+
+def eager_predictor(model):
+    """Predictor interface around an in-memory `nn.Module`."""
+    model.eval()
+
+    def predict(x):
+        with torch.no_grad():
+            return model(torch.as_tensor(x, dtype=torch.float32)).reshape(-1).numpy()
+    return predict
+
+
+def _torchscript_predictor(path):
+    with _quiet_jit():
+        module = torch.jit.load(path, map_location="cpu")
+    module.eval()
+    return eager_predictor(module)
+
+
+def _onnx_predictor(path):
+    if onnxruntime is None:
+        raise ImportError("Loading ONNX models requires the onnxruntime package")
+    session = onnxruntime.InferenceSession(path, providers=["CPUExecutionProvider"])
+
+    def predict(x):
+        x = np.ascontiguousarray(x, dtype=np.float32)
+        return session.run(None, {"returns": x})[0].reshape(-1)
+    return predict
+
+
+def load_predictor(path: str):
+    """Load an exported artifact as a predictor; cached until the file changes."""
+    mtime = os.path.getmtime(path)
+    with _lock:
+        cached = _loaded.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    loader = _onnx_predictor if path.endswith(EXTENSIONS["onnx"]) else _torchscript_predictor
+    predictor = loader(path)
+    with _lock:
+        # Replaces the stale entry, so a re-exported file doesn't keep the old model alive
+        _loaded[path] = (mtime, predictor)
+    return predictor
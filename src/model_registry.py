@@ -0,0 +1,114 @@
+# model_registry.py
+"""
+On-disk registry of trained models.
+
+Each model is stored as a state dict next to a JSON metadata file (ticker,
+hash of the training window, the `ModelConfig` values, training end date,
+creation time). A model is reused while it is younger than the registry's
+max age and was trained with the same config; otherwise callers retrain.
+Loaded models are also kept in memory, so repeated inference skips disk.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import asdict
+
+import torch
+
+# ModelConfig fields that do not affect the trained weights
+RUNTIME_FIELDS = {
+    "registry_dir", "model_max_age_hours", "torch_threads", "inference_batch_size",
+    "export_format", "export_quantize",
+}
+
+
+def config_values(config) -> dict:
+    return {k: v for k, v in asdict(config).items() if k not in RUNTIME_FIELDS}
+
+
+def config_fingerprint(config) -> str:
+    payload = json.dumps(config_values(config), sort_keys=True, default=str)
+    return hashlib.blake2b(payload.encode(), digest_size=8).hexdigest()
+
+
+class ModelRegistry:
+    """Save / load trained models keyed by ticker and model config."""
+
+    def __init__(self, root_dir: str, max_age_seconds: float):
+        self.root_dir = root_dir
+        self.max_age_seconds = max_age_seconds
+        self._loaded = {}  # base path -> (meta, model)
+        self._lock = threading.Lock()
+
+    def _base_path(self, ticker: str, config) -> str:
+        safe = re.sub(r"[^A-Za-z0-9._-]", "_", ticker.upper())
+        return os.path.join(self.root_dir, f"{safe}_{config_fingerprint(config)}")
+
+    def artifact_path(self, ticker: str, config, suffix: str) -> str:
+        """Path of a file stored next to the model (e.g. an exported copy)."""
+        return self._base_path(ticker, config) + suffix
+
+    def is_fresh(self, meta: dict, now: float | None = None) -> bool:
+        now = time.time() if now is None else now
+        return now - meta.get("created_at", 0) < self.max_age_seconds
+
+    def load(self, ticker: str, config, factory):
+        """Return `(model, meta)` for a fresh model trained with `config`, else None.
+
+        `factory()` must build an untrained model of the right architecture.
+        """
+        base = self._base_path(ticker, config)
+        with self._lock:
+            cached = self._loaded.get(base)
+        if cached is not None and self.is_fresh(cached[0]):
+            return cached[1], cached[0]
+
+        try:
+            with open(base + ".json") as fh:
+                meta = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        if meta.get("config_hash") != config_fingerprint(config) or not self.is_fresh(meta):
+            return None
+
+        model = factory()
+        try:
+            model.load_state_dict(torch.load(base + ".pt", map_location="cpu", weights_only=True))
+        except (OSError, RuntimeError) as e:
+            print(f"Could not load model for {ticker}: {e}")
+            return None
+        model.eval()
+        with self._lock:
+            self._loaded[base] = (meta, model)
+        return model, meta
+
+    def save(self, ticker: str, config, model, data_hash: str, training_end: str) -> dict:
+        """Persist `model` weights and metadata; returns the metadata."""
+        os.makedirs(self.root_dir, exist_ok=True)
+        base = self._base_path(ticker, config)
+        meta = {
+            "ticker": ticker,
+            "data_hash": data_hash,
+            "config": config_values(config),
+            "config_hash": config_fingerprint(config),
+            "training_end": training_end,
+            "created_at": time.time(),
+        }
+
+        tmp_suffix = f".{os.getpid()}.tmp"
+        torch.save(model.state_dict(), base + ".pt" + tmp_suffix)
+        with open(base + ".json" + tmp_suffix, "w") as fh:
+            json.dump(meta, fh)
+        os.replace(base + ".pt" + tmp_suffix, base + ".pt")
+        os.replace(base + ".json" + tmp_suffix, base + ".json")
+
+        with self._lock:
+            self._loaded[base] = (meta, model)
+        return meta
+
+    def clear_memory(self):
+        with self._lock:
+            self._loaded.clear()
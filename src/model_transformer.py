@@ -1,74 +1,403 @@
 # model_transformer.py
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+
 import torch
 import torch.nn as nn
 import numpy as np
 import pandas as pd
 
+from src.config import model_config
+from src.indicators import fingerprint
+from src.model_export import EXTENSIONS, eager_predictor, export_model, load_predictor
+from src.model_registry import ModelRegistry
+from src.signals import Signal, SIGNAL_DTYPE
+
+model_registry = ModelRegistry(model_config.registry_dir, model_config.model_max_age_hours * 3600)
+
+
 class PriceTransformer(nn.Module):
-    def __init__(self, seq_len=30, d_model=32, nhead=2, num_layers=2):
+    def __init__(self, seq_len=30, d_model=32, nhead=2, num_layers=2, n_tickers=0):
         super().__init__()
         self.embed = nn.Linear(1, d_model)
+        # Optional learned per-ticker offset for models shared across tickers
+        self.ticker_embed = nn.Embedding(n_tickers, d_model) if n_tickers else None
         encoder_layer = nn.TransformerEncoderLayer(
             d_model=d_model, nhead=nhead, batch_first=True
         )
         self.encoder = nn.TransformerEncoder(encoder_layer, num_layers=num_layers)
         self.fc = nn.Linear(d_model, 1)
 
-    def forward(self, x):
+    def forward(self, x, ticker_ids=None):
         x = self.embed(x)
+        if self.ticker_embed is not None and ticker_ids is not None:
+            x = x + self.ticker_embed(ticker_ids).unsqueeze(1)
         encoded = self.encoder(x)
         return self.fc(encoded[:, -1, :])
 
 
-def add_transformer_prediction(df, price_col):
-    df = df.copy()
-    if len(df) < 90:
-        df["tf_signal"] = "HOLD"
-        df["tf_prob"] = 0.5
-        return df
-    
-    if price_col not in df.columns:
-        raise KeyError(f"Price column '{price_col}' not found in DataFrame")
-    
-    try:
-        prices = df[price_col].values
-        returns = np.diff(prices) / prices[:-1]
-        returns = np.concatenate([[0], returns])
+def build_model(config=model_config, n_tickers=0) -> PriceTransformer:
+    return PriceTransformer(
+        seq_len=config.transformer_seq_len,
+        d_model=config.transformer_d_model,
+        nhead=config.transformer_nhead,
+        num_layers=config.transformer_layers,
+        n_tickers=n_tickers,
+    )
+
+
+def to_prob(pred):
+    """Map predicted next-bar returns to a pseudo-probability of an up move."""
+    return 1 / (1 + np.exp(-np.asarray(pred) * 8))
+
+
+def to_signal(prob):
+    return np.where(np.asarray(prob) >= 0.55, Signal.BUY, Signal.SELL).astype(SIGNAL_DTYPE)
+
+
+def price_returns(prices) -> np.ndarray:
+    """Simple returns with a leading 0, aligned to `prices`."""
+    prices = np.asarray(prices, dtype=np.float64)
+    returns = np.zeros(len(prices))
+    returns[1:] = np.diff(prices) / prices[:-1]
+    return returns
+
+
+def make_windows(returns, seq_len):
+    """Training windows over `returns` without copying them.
+
+    Returns `(X, y)` tensors where X[i] = returns[i:i+seq_len] and
+    y[i] = returns[i+seq_len]; X is a strided view (`unfold`) sharing the
+    float32 return buffer.
+    """
+    series = torch.from_numpy(np.ascontiguousarray(returns, dtype=np.float32))
+    n = len(series) - seq_len - 1
+    if n <= 0:
+        return series.new_empty((0, seq_len)), series.new_empty((0,))
+    X = series.unfold(0, seq_len, 1)[:n]
+    y = series[seq_len:seq_len + n]
+    return X, y
+
+
+def _iter_batches(n, batch_size, shuffle, generator=None):
+    order = torch.randperm(n, generator=generator) if shuffle else torch.arange(n)
+    for start in range(0, n, batch_size):
+        yield order[start:start + batch_size]
 
-        seq_len = 30
-        X, y = [], []
 
-        for i in range(len(returns) - seq_len - 1):
-            X.append(returns[i:i+seq_len])
-            y.append(returns[i+seq_len])
+def _evaluate(model, loss_fn, data, batch_size):
+    model.eval()
+    X, y, ids = data
+    total = 0.0
+    with torch.no_grad():
+        for idx in _iter_batches(len(X), batch_size, shuffle=False):
+            pred = model(X[idx].unsqueeze(-1), None if ids is None else ids[idx])
+            total += loss_fn(pred, y[idx].unsqueeze(-1)).item() * len(idx)
+    return total / len(X)
 
-        X = torch.tensor(X, dtype=torch.float32).unsqueeze(-1)
-        y = torch.tensor(y, dtype=torch.float32).unsqueeze(-1)
 
-        model = PriceTransformer()
-        optim = torch.optim.Adam(model.parameters(), lr=0.005)
-        loss_fn = nn.MSELoss()
+def _n_train(n_windows, validation_split):
+    """Number of leading windows used for training; the rest validate."""
+    n_val = int(n_windows * validation_split)
+    return n_windows if n_val < 1 or n_windows - n_val < 1 else n_windows - n_val
 
+
+def _fit(model, train, val, config):
+    """Shared mini-batch loop over `(X, y, ticker_ids)` tensors."""
+    if config.torch_threads:
+        torch.set_num_threads(config.torch_threads)
+
+    X_train, y_train, ids_train = train
+    optim = torch.optim.Adam(model.parameters(), lr=config.learning_rate)
+    loss_fn = nn.MSELoss()
+    generator = torch.Generator().manual_seed(0)
+
+    best_loss, best_state, stale_epochs = float("inf"), None, 0
+    for _ in range(config.training_epochs):
         model.train()
-        for _ in range(40):
+        for idx in _iter_batches(len(X_train), config.batch_size, shuffle=True, generator=generator):
             optim.zero_grad()
-            pred = model(X)
-            loss = loss_fn(pred, y)
+            pred = model(X_train[idx].unsqueeze(-1), None if ids_train is None else ids_train[idx])
+            loss = loss_fn(pred, y_train[idx].unsqueeze(-1))
             loss.backward()
             optim.step()
 
-        model.eval()
-        test_input = torch.tensor([returns[-seq_len:]], dtype=torch.float32).unsqueeze(-1)
-        pred = model(test_input).item()
-        prob = 1 / (1 + np.exp(-pred * 8))
+        if not len(val[0]):
+            continue
+        val_loss = _evaluate(model, loss_fn, val, config.batch_size)
+        if val_loss < best_loss:
+            best_loss, stale_epochs = val_loss, 0
+            best_state = {k: v.detach().clone() for k, v in model.state_dict().items()}
+        else:
+            stale_epochs += 1
+            if stale_epochs >= config.early_stopping_patience:
+                break
+
+    if best_state is not None:
+        model.load_state_dict(best_state)
+    model.eval()
+    return model
+
+
+def train_model(returns, config=model_config, model=None) -> PriceTransformer:
+    """Mini-batch training with early stopping on a chronological validation split.
+
+    The last `validation_split` of the windows is held out; training stops
+    after `early_stopping_patience` epochs without validation improvement
+    and the best weights are restored. Pass `model` to fine-tune existing
+    weights instead of starting from scratch.
+    """
+    X, y = make_windows(returns, config.transformer_seq_len)
+    n_train = _n_train(len(X), config.validation_split)
+    model = model if model is not None else build_model(config)
+    return _fit(model, (X[:n_train], y[:n_train], None), (X[n_train:], y[n_train:], None), config)
+
+
+def train_shared_model(returns_by_ticker, config=model_config, use_ticker_embedding=False) -> PriceTransformer:
+    """Train one model on the stacked windows of several tickers.
+
+    `returns_by_ticker` maps ticker -> return array; ticker ids follow its
+    order. Each ticker holds out its own most recent windows for validation.
+    """
+    train_parts, val_parts = [], []
+    for ticker_id, returns in enumerate(returns_by_ticker.values()):
+        X, y = make_windows(returns, config.transformer_seq_len)
+        ids = torch.full((len(X),), ticker_id, dtype=torch.long)
+        n_train = _n_train(len(X), config.validation_split)
+        train_parts.append((X[:n_train], y[:n_train], ids[:n_train]))
+        val_parts.append((X[n_train:], y[n_train:], ids[n_train:]))
+
+    def stack(parts):
+        return tuple(torch.cat(cols) for cols in zip(*parts))
+
+    model = build_model(config, n_tickers=len(returns_by_ticker) if use_ticker_embedding else 0)
+    return _fit(model, stack(train_parts), stack(val_parts), config)
+
+
+def predict_per_bar(model, returns_by_ticker, config=model_config, ticker_ids=True):
+    """Predicted next-bar return for every bar of every ticker in one batched pass.
+
+    Row t uses the `seq_len` returns ending at t; the first `seq_len - 1`
+    rows of each ticker have no full window and are NaN. Windows of all
+    tickers are stacked and fed through the model in chunks of
+    `inference_batch_size` (0 = a single forward pass).
+    """
+    seq_len = config.transformer_seq_len
+    windows, ids, bounds = [], [], []
+    for ticker_id, returns in enumerate(returns_by_ticker.values()):
+        series = torch.from_numpy(np.ascontiguousarray(returns, dtype=np.float32))
+        X = series.unfold(0, seq_len, 1) if len(series) >= seq_len else series.new_empty((0, seq_len))
+        windows.append(X)
+        ids.append(torch.full((len(X),), ticker_id, dtype=torch.long))
+        bounds.append((len(series), len(X)))
+
+    X, ids = torch.cat(windows), torch.cat(ids)
+    chunk = config.inference_batch_size or max(len(X), 1)
+    use_ids = ticker_ids and model.ticker_embed is not None
+    preds = []
+    with torch.no_grad():
+        for start in range(0, len(X), chunk):
+            batch = X[start:start + chunk].unsqueeze(-1)
+            preds.append(model(batch, ids[start:start + chunk] if use_ids else None).squeeze(-1))
+    flat = torch.cat(preds).numpy() if preds else np.empty(0, dtype=np.float32)
+
+    out, offset = {}, 0
+    for ticker, (n_bars, n_windows) in zip(returns_by_ticker, bounds):
+        pred = np.full(n_bars, np.nan)
+        pred[n_bars - n_windows:] = flat[offset:offset + n_windows]
+        out[ticker] = pred
+        offset += n_windows
+    return out
+
+
+def get_model(ticker, returns, training_end, config=model_config, registry=None):
+    """Reuse the registry's model for `ticker` while fresh, else train and save one."""
+    registry = registry or model_registry
+    loaded = registry.load(ticker, config, lambda: build_model(config))
+    if loaded is not None:
+        return loaded[0]
+
+    model = train_model(returns, config)
+    registry.save(ticker, config, model, data_hash=fingerprint(returns), training_end=str(training_end))
+    return model
+
+
+def get_predictor(ticker, returns, training_end, config=model_config, registry=None):
+    """Inference callable for `ticker`, preferring the exported artifact.
+
+    The model comes from `get_model`; with `config.export_format` set it is
+    exported next to the registry weights (re-exported when the weights are
+    newer) and served from that file. Falls back to eager mode if export or
+    loading fails.
+    """
+    registry = registry or model_registry
+    model = get_model(ticker, returns, training_end, config, registry)
+    if not config.export_format:
+        return eager_predictor(model)
+
+    suffix = (".int8" if config.export_quantize else "") + EXTENSIONS.get(config.export_format, "")
+    path = registry.artifact_path(ticker, config, suffix)
+    weights = registry.artifact_path(ticker, config, ".pt")
+    try:
+        if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(weights):
+            export_model(model, path, config.transformer_seq_len, config.export_format, config.export_quantize)
+        return load_predictor(path)
+    except Exception as e:
+        print(f"⚠️ Model export for {ticker} unavailable, using eager inference: {e}")
+        return eager_predictor(model)
+
+
+def add_transformer_prediction(df, price_col, ticker=None, config=None, registry=None):
+    """Add `tf_prob` / `tf_signal` for the next bar.
+
+    With a `ticker`, the trained model is cached in the model registry and
+    reused until it expires or `config` changes.
+    """
+    config = config or model_config
+    df = df.copy()
+    if len(df) < 90:
+        df["tf_signal"] = SIGNAL_DTYPE(Signal.HOLD)
+        df["tf_prob"] = 0.5
+        return df
+
+    if price_col not in df.columns:
+        raise KeyError(f"Price column '{price_col}' not found in DataFrame")
+
+    try:
+        returns = price_returns(df[price_col].values)
+        seq_len = config.transformer_seq_len
+
+        if ticker is None:
+            predict = eager_predictor(train_model(returns, config))
+        else:
+            training_end = df["date"].iloc[-1] if "date" in df.columns else len(df)
+            predict = get_predictor(ticker, returns, training_end, config, registry)
+
+        pred = predict(returns[-seq_len:].astype(np.float32).reshape(1, seq_len, 1))[0]
+        prob = float(to_prob(pred))
 
         df["tf_prob"] = prob
-        df["tf_signal"] = "BUY" if prob >= 0.55 else "SELL"
+        df["tf_signal"] = to_signal(prob)[()]
         return df
-    
+
     except Exception as e:
         # Fallback to neutral prediction if transformer fails
         print(f"Transformer prediction failed: {e}")
-        df["tf_signal"] = "HOLD"
+        df["tf_signal"] = SIGNAL_DTYPE(Signal.HOLD)
         df["tf_prob"] = 0.5
         return df
+
+
+def add_transformer_predictions(frames, price_col, config=None, registry=None, use_ticker_embedding=False):
+    """Per-bar `tf_prob` / `tf_signal` for several tickers with one shared model.
+
+    `frames` maps ticker -> DataFrame. The shared model is trained once on
+    all tickers (and cached in the registry under the ticker list) and every
+    bar of every frame is scored in a single batched inference. Rows without
+    a full input window get a neutral 0.5 / HOLD.
+    """
+    config = config or model_config
+    registry = registry or model_registry
+    returns = {ticker: price_returns(df[price_col].to_numpy()) for ticker, df in frames.items()}
+    n_tickers = len(returns) if use_ticker_embedding else 0
+
+    # Ticker ids follow dict order, so the registry key is order-sensitive
+    key = "SHARED-" + fingerprint(np.array(list(returns), dtype=object)) + ("-EMB" if n_tickers else "")
+    loaded = registry.load(key, config, lambda: build_model(config, n_tickers))
+    if loaded is not None:
+        model = loaded[0]
+    else:
+        model = train_shared_model(returns, config, use_ticker_embedding)
+        ends = [str(df["date"].iloc[-1]) for df in frames.values() if "date" in df.columns and len(df)]
+        data_hash = fingerprint(np.concatenate(list(returns.values())))
+        registry.save(key, config, model, data_hash=data_hash, training_end=max(ends, default=""))
+
+    preds = predict_per_bar(model, returns, config)
+    return {ticker: _assign_predictions(df, preds[ticker]) for ticker, df in frames.items()}
+
+
+def _assign_predictions(df, pred):
+    """Per-bar tf_prob / tf_signal from predicted returns; NaN rows are neutral."""
+    missing = np.isnan(pred)
+    prob = np.where(missing, 0.5, to_prob(pred))
+    signal = np.where(missing, SIGNAL_DTYPE(Signal.HOLD), to_signal(prob)).astype(SIGNAL_DTYPE)
+    return df.assign(tf_prob=prob, tf_signal=signal)
+
+
+def _fold_bounds(n_bars, step, min_train_bars):
+    return [(start, min(start + step, n_bars)) for start in range(min_train_bars, n_bars, step)]
+
+
+def _run_fold(returns, start, end, window, config, state):
+    """Train on bars before `start` (warm-started from `state`) and predict rows [start, end).
+
+    Seeded by `start`, so a fold's result does not depend on the process it runs in.
+    """
+    seq_len = config.transformer_seq_len
+    train_from = 0 if window is None else max(0, start - window)
+    with torch.random.fork_rng(devices=[]):
+        torch.manual_seed(start)
+        model = build_model(config)
+        if state is not None:
+            model.load_state_dict(state)
+            config = replace(config, training_epochs=config.finetune_epochs)
+        model = train_model(returns[train_from:start], config, model=model)
+
+    segment = returns[max(0, start - seq_len + 1):end]
+    pred = predict_per_bar(model, {"": segment}, config)[""][-(end - start):]
+    return pred, model.state_dict()
+
+
+def walk_forward_predictions(returns, step=20, window=None, min_train_bars=90,
+                             config=model_config, processes=None):
+    """Out-of-sample next-bar return predictions for every bar.
+
+    Every `step` bars the model is retrained on the bars before the fold
+    (all of them, or the last `window`) and predicts the following `step`
+    bars, so no row is scored by a model that saw it. Folds run in waves of
+    `processes` in a process pool; each wave warm-starts from the weights of
+    the previous wave's last fold and fine-tunes for `finetune_epochs`.
+    Rows before `min_train_bars` are NaN. `processes=1` runs in-process.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    pred = np.full(len(returns), np.nan)
+    folds = _fold_bounds(len(returns), step, max(min_train_bars, config.transformer_seq_len + 2))
+    if not folds:
+        return pred
+
+    processes = processes or os.cpu_count() or 1
+    state = None
+    if processes == 1 or len(folds) == 1:
+        for start, end in folds:
+            pred[start:end], state = _run_fold(returns, start, end, window, config, state)
+        return pred
+
+    # One torch thread per worker so the pool does not oversubscribe cores
+    worker_config = replace(config, torch_threads=1)
+    # spawn: torch's intra-op thread pool is already running here, and forking it can deadlock
+    with ProcessPoolExecutor(max_workers=min(processes, len(folds)),
+                             mp_context=multiprocessing.get_context("spawn")) as pool:
+        for i in range(0, len(folds), processes):
+            wave = folds[i:i + processes]
+            futures = [pool.submit(_run_fold, returns, start, end, window, worker_config, state)
+                       for start, end in wave]
+            for (start, end), future in zip(wave, futures):
+                pred[start:end], state = future.result()
+    return pred
+
+
+def add_walk_forward_prediction(df, price_col, step=20, window=None, min_train_bars=90,
+                                config=None, processes=None):
+    """Backtestable per-bar `tf_prob` / `tf_signal` from walk-forward folds.
+
+    See `walk_forward_predictions`; rows without an out-of-sample
+    prediction get a neutral 0.5 / HOLD.
+    """
+    config = config or model_config
+    if price_col not in df.columns:
+        raise KeyError(f"Price column '{price_col}' not found in DataFrame")
+    returns = price_returns(df[price_col].to_numpy())
+    pred = walk_forward_predictions(returns, step, window, min_train_bars, config, processes)
+    return _assign_predictions(df, pred)
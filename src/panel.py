@@ -0,0 +1,104 @@
+# panel.py
+"""
+Aligned date × ticker panels.
+
+`build_panel` aligns the per-ticker result frames on the union of their
+dates in one pass and stores each requested column as a 2-D float array of
+shape (n_dates, n_tickers), NaN where a ticker has no bar. Portfolio
+aggregates are then plain reductions along the ticker axis instead of
+chained outer merges.
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class Panel:
+    """Date × ticker arrays for several fields sharing one date index."""
+    dates: np.ndarray
+    tickers: list
+    fields: dict = field(default_factory=dict)  # name -> (n_dates, n_tickers) float64
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.fields[name]
+
+    @property
+    def shape(self) -> tuple:
+        return len(self.dates), len(self.tickers)
+
+    def to_frame(self, name: str) -> pd.DataFrame:
+        return pd.DataFrame(self.fields[name], index=pd.Index(self.dates, name="date"), columns=self.tickers)
+
+    def last_valid(self, name: str) -> np.ndarray:
+        """Each ticker's last non-NaN value (NaN if it has none)."""
+        values = self.fields[name]
+        valid = ~np.isnan(values)
+        rows = len(values) - 1 - np.argmax(valid[::-1], axis=0)
+        out = values[rows, np.arange(values.shape[1])]
+        return np.where(valid.any(axis=0), out, np.nan)
+
+
+def ffill(values: np.ndarray) -> np.ndarray:
+    """Forward-fill NaNs down each column (leading NaNs stay NaN)."""
+    valid = ~np.isnan(values)
+    rows = np.where(valid, np.arange(len(values))[:, None], 0)
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    filled = values[rows, np.arange(values.shape[1])]
+    # Rows before a column's first value point at row 0, which may be NaN or
+    # a value from the future; put the NaNs back.
+    filled[~np.maximum.accumulate(valid, axis=0)] = np.nan
+    return filled
+
+
+def align_dates(all_dates: np.ndarray, lengths) -> tuple:
+    """Union date index of concatenated per-ticker dates, in one pass.
+
+    `all_dates` holds every ticker's dates back to back, `lengths[i]` bars
+    for ticker i. Returns `(dates, rows, cols)`: the sorted union and each
+    bar's (row, ticker column) position in a (n_dates, n_tickers) array.
+    """
+    dates, rows = np.unique(all_dates, return_inverse=True)
+    cols = np.repeat(np.arange(len(lengths)), lengths)
+    return dates, rows, cols
+
+
+def build_panel(frames: dict, columns: dict, date_col: str = "date", fill: bool = True) -> Panel:
+    """Align `frames` (ticker -> DataFrame) on the union of their dates.
+
+    `columns` maps panel field -> frame column, or field -> {ticker: column}
+    when the column differs per ticker (e.g. the price column). With `fill`
+    each field is forward-filled, so a ticker keeps its last value on dates
+    where only other tickers traded.
+    """
+    tickers = list(frames)
+    date_arrays = [frames[t][date_col].to_numpy(dtype="datetime64[ns]") for t in tickers]
+    dates, rows, cols = align_dates(
+        np.concatenate(date_arrays) if date_arrays else np.array([], dtype="datetime64[ns]"),
+        [len(d) for d in date_arrays],
+    )
+
+    panel = Panel(dates=dates, tickers=tickers)
+    for name, column in columns.items():
+        values = np.concatenate([
+            frames[t][column[t] if isinstance(column, dict) else column].to_numpy(dtype=np.float64)
+            for t in tickers
+        ]) if tickers else np.array([])
+        arr = np.full((len(dates), len(tickers)), np.nan)
+        arr[rows, cols] = values
+        panel.fields[name] = ffill(arr) if fill else arr
+    return panel
+
+
+def equal_weight_portfolio(panel: Panel, capital: float, equity: str = "equity", bh_equity: str = "bh_equity"):
+    """Split `capital` equally and grow each slice with its equity multiplier.
+
+    Returns `(ticker_equity, total_equity, total_bh_equity)`: the per-ticker
+    dollar equity array and the two portfolio totals per date. Before a
+    ticker's first bar (or first strategy return) its slice is held as cash.
+    """
+    alloc = capital / max(len(panel.tickers), 1)
+    ticker_equity = alloc * np.nan_to_num(panel[equity], nan=1.0)
+    ticker_bh = alloc * np.nan_to_num(panel[bh_equity], nan=1.0)
+    return ticker_equity, ticker_equity.sum(axis=1), ticker_bh.sum(axis=1)
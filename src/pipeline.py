@@ -0,0 +1,105 @@
+# pipeline.py
+"""
+Per-ticker analysis pipeline: preprocess → strategy → AI → buy & hold.
+
+Lives in an importable module (rather than the Streamlit script) so the
+app can run it in worker processes; `analyze_ticker` takes and returns only
+picklable values.
+"""
+import numpy as np
+import pandas as pd
+
+from src.backtest import EXIT_SIGNAL, EXIT_SL, EXIT_TP, extract_trades
+from src.signals import Signal, SIGNAL_DTYPE
+from src.strategy import apply_sma_crossover
+
+EXIT_LABELS = {EXIT_SIGNAL: "Signal", EXIT_SL: "Stop-loss", EXIT_TP: "Take-profit"}
+
+# AI model name -> (signal column, probability column)
+AI_COLUMNS = {
+    "Heuristic": ("pred_signal", "pred_up_prob"),
+    "Transformer": ("tf_signal", "tf_prob"),
+}
+
+
+def preprocess_ohlc(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+
+    # Column normalization BEFORE indexing
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = ["_".join([str(c).lower() for c in col if c]) for col in df.columns]
+    else:
+        df.columns = [str(c).lower() for c in df.columns]
+
+    # Detect correct date column (Yahoo = 'date' after lowering)
+    date_cols = [c for c in df.columns if c.startswith("date")]
+    if not date_cols:
+        raise KeyError("No date column found in DataFrame")
+
+    df.rename(columns={date_cols[0]: "date"}, inplace=True)
+
+    # Proper datetime conversion — FIXES 1970 issue permanently
+    df["date"] = pd.to_datetime(df["date"], errors="coerce", utc=True).dt.tz_localize(None)
+
+    df = df.dropna(subset=["date"])
+    df = df.sort_values("date").reset_index(drop=True)
+
+    # Detect close column
+    close_cols = [c for c in df.columns if "close" in c]
+    if not close_cols:
+        raise KeyError("No close price column")
+    df["close"] = df[close_cols[0]].astype(float)
+
+    return df
+
+
+def add_ai_prediction(df: pd.DataFrame, price_col: str, model: str, ticker: str | None = None) -> pd.DataFrame:
+    """Apply the named AI model; its module (and torch) is imported on first use."""
+    if model == "Transformer":
+        from src.model_transformer import add_transformer_prediction
+        return add_transformer_prediction(df, price_col, ticker=ticker)
+    from src.ai_models import add_direction_prediction
+    return add_direction_prediction(df, price_col)
+
+
+def analyze_ticker(raw_df: pd.DataFrame, strategy_params: dict, ai_model: str | None = None,
+                   ticker: str | None = None):
+    """Run the full per-ticker pipeline on fetched bars.
+
+    Returns `(df, price_col)`. Raises KeyError when required columns are
+    missing.
+    """
+    df = preprocess_ohlc(raw_df)
+    try:
+        df, price_col = apply_sma_crossover(df, **strategy_params)
+    except KeyError as e:
+        raise KeyError(f"Missing needed columns: {e}") from e
+
+    if ai_model:
+        df = add_ai_prediction(df, price_col, ai_model, ticker)
+
+    # Baseline buy & hold equity curve
+    df["bh_equity"] = (df[price_col] / df[price_col].iloc[0]).fillna(1.0)
+    return df, price_col
+
+
+def trade_ledger(df: pd.DataFrame, price_col: str) -> pd.DataFrame:
+    """Round-trip trades of an analyzed frame, one row per trade.
+
+    Exit reasons are recovered from the SL / TP codes the backtest writes
+    into the signal column.
+    """
+    signal = df["signal"].to_numpy(dtype=SIGNAL_DTYPE)
+    exit_reason = np.select([signal == Signal.SL, signal == Signal.TP], [EXIT_SL, EXIT_TP], EXIT_SIGNAL)
+    trades = extract_trades(df["position"].to_numpy(), df["strategy_returns_net"].to_numpy(),
+                            df[price_col].to_numpy(), exit_reason)
+    dates = df["date"].to_numpy()
+    return pd.DataFrame({
+        "entry_date": dates[trades.entry_index],
+        "exit_date": dates[trades.exit_index],
+        "entry_price": trades.entry_price,
+        "exit_price": trades.exit_price,
+        "exit_reason": [EXIT_LABELS.get(r, "Open") for r in trades.exit_reason.tolist()],
+        "pnl": trades.pnl,
+        "bars": trades.bars,
+    })
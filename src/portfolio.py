@@ -0,0 +1,128 @@
+# portfolio.py
+"""
+Multi-asset portfolio backtest with capital allocation.
+
+`backtest_portfolio` walks the bars of a date × ticker panel once; each
+step works on whole ticker vectors. Every ticker whose strategy is long gets
+an equal share of equity, capped at `max_position_size`, with the rest held
+as cash. Entries and exits trade immediately. Positions that drift from
+target are rebalanced on a schedule ("periodic", every `rebalance_every`
+bars), when they drift by more than `threshold` of equity ("threshold"), or
+never ("none"). Costs are `trade_cost_bps` of traded notional. Buys are
+scaled down when cash (after sells and costs) would go negative.
+
+Trades execute at bar t's close on bar t's targets and earn returns from
+t onwards, so unlike the single-ticker backtest the position is not
+credited with the return of the bar that produced its signal.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.config import trading_config
+
+REBALANCE_MODES = ("none", "periodic", "threshold")
+
+
+@dataclass
+class PortfolioResult:
+    """Per-bar portfolio state; 2-D arrays are (n_dates, n_tickers)."""
+    equity: np.ndarray
+    cash: np.ndarray
+    holdings: np.ndarray  # market value per ticker after trading
+    weights: np.ndarray  # holdings / equity
+    traded: np.ndarray  # absolute traded notional per bar
+    costs: np.ndarray
+
+    @property
+    def returns(self) -> np.ndarray:
+        out = np.empty_like(self.equity)
+        out[0] = 0.0
+        out[1:] = self.equity[1:] / self.equity[:-1] - 1.0
+        return out
+
+
+def target_weights(active: np.ndarray, max_position_size: float) -> np.ndarray:
+    """Equal weight across `active` tickers, capped at `max_position_size`."""
+    n_active = active.sum()
+    if not n_active:
+        return np.zeros(active.shape)
+    return np.where(active, min(max_position_size, 1.0 / n_active), 0.0)
+
+
+def backtest_portfolio(
+    close: np.ndarray,
+    position: np.ndarray,
+    capital: float = trading_config.default_capital,
+    max_position_size: float = trading_config.max_position_size,
+    trade_cost_bps: float = trading_config.trade_cost_bps,
+    rebalance: str = "none",
+    rebalance_every: int = 21,
+    threshold: float = 0.02,
+) -> PortfolioResult:
+    """Simulate a long-only portfolio from per-ticker positions.
+
+    `close` and `position` are (n_dates, n_tickers) arrays, e.g. the
+    "close" and "position" fields of a `panel.Panel`; a ticker is wanted
+    long where its position is > 0. NaN prices (no bar yet) are never
+    traded.
+    """
+    if rebalance not in REBALANCE_MODES:
+        raise ValueError(f"Unknown rebalance mode '{rebalance}'. Choose from {REBALANCE_MODES}")
+    close = np.asarray(close, dtype=np.float64)
+    want = np.nan_to_num(np.asarray(position, dtype=np.float64)) > 0
+    n_dates, n_tickers = close.shape
+    rate = trade_cost_bps / 10000
+
+    equity = np.empty(n_dates)
+    cash_hist = np.empty(n_dates)
+    holdings = np.zeros((n_dates, n_tickers))
+    traded = np.zeros(n_dates)
+    costs = np.zeros(n_dates)
+
+    shares = np.zeros(n_tickers)
+    cash = float(capital)
+    for t in range(n_dates):
+        price = close[t]
+        tradable = ~np.isnan(price)
+        px = np.where(tradable, price, 0.0)
+        value = shares * px
+        total = cash + value.sum()
+
+        active = want[t] & tradable
+        target_value = target_weights(active, max_position_size) * total
+
+        # Entries / exits always trade; held names only on rebalance
+        trade_mask = active != (shares > 0)
+        if rebalance == "periodic" and t % rebalance_every == 0:
+            trade_mask |= active
+        elif rebalance == "threshold" and total > 0:
+            trade_mask |= active & (np.abs(value - target_value) > threshold * total)
+        trade_mask &= tradable
+
+        delta = np.where(trade_mask, target_value - value, 0.0)
+        # Exits sell the whole position, not just down to a zero target value
+        delta = np.where(trade_mask & ~active, -value, delta)
+
+        sells = -delta[delta < 0].sum()
+        buys = delta[delta > 0].sum()
+        budget = cash + sells * (1 - rate)
+        if buys > 0 and buys * (1 + rate) > budget:
+            # Not enough cash: scale every buy down by the same factor
+            delta = np.where(delta > 0, delta * max(budget, 0.0) / (buys * (1 + rate)), delta)
+
+        notional = np.abs(delta).sum()
+        fee = notional * rate
+        shares = shares + delta / np.where(tradable, price, 1.0)  # delta is 0 where untradable
+        shares[trade_mask & ~active] = 0.0
+        cash -= delta.sum() + fee
+
+        holdings[t] = shares * px
+        equity[t] = cash + holdings[t].sum()
+        cash_hist[t] = cash
+        traded[t] = notional
+        costs[t] = fee
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        weights = np.where(equity[:, None] > 0, holdings / equity[:, None], 0.0)
+    return PortfolioResult(equity=equity, cash=cash_hist, holdings=holdings, weights=weights, traded=traded, costs=costs)
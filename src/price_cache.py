@@ -0,0 +1,88 @@
+# price_cache.py
+"""
+Persistent on-disk OHLCV cache.
+
+Bars are stored as one Parquet file per (ticker, interval), next to a small
+JSON sidecar recording when the file was last refreshed and from which
+timestamp the stored history is known to be complete, and up to when.
+"""
+import json
+import os
+import re
+import time
+
+import pandas as pd
+
+OHLCV_COLUMNS = ["date", "open", "high", "low", "close", "volume"]
+
+
+class PriceCache:
+    """Parquet-backed bar store with a TTL on the most recent bar."""
+
+    def __init__(self, cache_dir: str, ttl_seconds: float = 900):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+
+    def _base_path(self, ticker: str, interval: str) -> str:
+        safe = re.sub(r"[^A-Za-z0-9._-]", "_", ticker.upper())
+        return os.path.join(self.cache_dir, f"{safe}_{interval}")
+
+    def load(self, ticker: str, interval: str):
+        """Return `(bars, meta)` for a cached series, or `(None, None)`."""
+        base = self._base_path(ticker, interval)
+        try:
+            with open(base + ".json") as fh:
+                meta = json.load(fh)
+            bars = pd.read_parquet(base + ".parquet")
+        except (OSError, ValueError):
+            return None, None
+        # Parquet stores at ms resolution; match the downloader's epoch-second dates
+        bars["date"] = bars["date"].astype("datetime64[s]")
+        return bars, meta
+
+    def needs_refresh(self, meta, end: float) -> bool:
+        """True when bars up to `end` were last fetched more than the TTL ago."""
+        return meta is None or end - meta.get("fetched_to", 0) >= self.ttl_seconds
+
+    def store(self, ticker: str, interval: str, bars: pd.DataFrame, covered_from: int,
+              fetched_to: float | None = None) -> pd.DataFrame:
+        """Write `bars` and its metadata atomically; returns the stored frame.
+
+        History is complete from `covered_from` up to `fetched_to` (the end of
+        the last downloaded range, defaulting to now).
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        base = self._base_path(ticker, interval)
+        bars = bars[OHLCV_COLUMNS].reset_index(drop=True)
+
+        # Write to temp files and rename so concurrent readers never see partial files
+        tmp_suffix = f".{os.getpid()}.tmp"
+        bars.to_parquet(base + ".parquet" + tmp_suffix, index=False)
+        with open(base + ".json" + tmp_suffix, "w") as fh:
+            json.dump({
+                "covered_from": int(covered_from),
+                "fetched_to": time.time() if fetched_to is None else fetched_to,
+                "fetched_at": time.time(),
+            }, fh)
+        os.replace(base + ".parquet" + tmp_suffix, base + ".parquet")
+        os.replace(base + ".json" + tmp_suffix, base + ".json")
+        return bars
+
+    def clear(self, ticker: str, interval: str):
+        base = self._base_path(ticker, interval)
+        for ext in (".parquet", ".json"):
+            try:
+                os.remove(base + ext)
+            except FileNotFoundError:
+                pass
+
+
+def merge_bars(cached: pd.DataFrame | None, new: pd.DataFrame) -> pd.DataFrame:
+    """Append `new` bars to `cached`, letting newer downloads win on duplicate dates."""
+    if cached is None or cached.empty:
+        return new
+    if new.empty:
+        return cached
+    merged = pd.concat([cached, new.astype(cached.dtypes.to_dict())], ignore_index=True)
+    merged = merged.drop_duplicates("date", keep="last").sort_values("date")
+    return merged.reset_index(drop=True)
@@ -0,0 +1,143 @@
+# resilience.py
+"""
+Retry, rate limiting and circuit breaking for outbound data requests.
+"""
+import random
+import threading
+import time
+from dataclasses import dataclass
+
+
+@dataclass
+class RetryPolicy:
+    """Jittered exponential backoff.
+
+    `retries` is the total number of attempts. The delay before attempt
+    n + 1 is drawn uniformly from [(1 - jitter) * d, d] where
+    d = min(max_delay, base_delay * 2 ** (n - 1)).
+    """
+    retries: int = 3
+    base_delay: float = 0.25
+    max_delay: float = 4.0
+    jitter: float = 1.0
+    retry_statuses: tuple = (429, 500, 502, 503, 504)
+
+    def delay(self, attempt: int) -> float:
+        ceiling = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return random.uniform(ceiling * (1 - self.jitter), ceiling)
+
+    def is_retryable(self, status_code: int) -> bool:
+        return status_code in self.retry_statuses
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at `rate` tokens per second."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """Take `tokens` if available; otherwise return seconds until they are."""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1.0, timeout: float | None = None) -> bool:
+        """Wait (without holding the lock) until `tokens` are available."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait == 0.0:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """Per-key circuit breaker (keys are tickers or hosts).
+
+    After `failure_threshold` consecutive failures the circuit for a key
+    opens and requests fail fast for `reset_timeout` seconds. After that,
+    requests are let through as trials: a success closes the circuit, a
+    failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._circuits = {}
+        self._lock = threading.Lock()
+
+    def _circuit(self, key):
+        circuit = self._circuits.get(key)
+        if circuit is None:
+            circuit = self._circuits[key] = {
+                "state": self.CLOSED,
+                "consecutive_failures": 0,
+                "failures": 0,
+                "successes": 0,
+                "rejected": 0,
+                "opened_at": None,
+            }
+        return circuit
+
+    def allow(self, key) -> bool:
+        with self._lock:
+            circuit = self._circuit(key)
+            if circuit["state"] == self.OPEN:
+                if time.monotonic() - circuit["opened_at"] >= self.reset_timeout:
+                    circuit["state"] = self.HALF_OPEN
+                    return True
+                circuit["rejected"] += 1
+                return False
+            return True
+
+    def record_success(self, key):
+        with self._lock:
+            circuit = self._circuit(key)
+            circuit["successes"] += 1
+            circuit["consecutive_failures"] = 0
+            circuit["state"] = self.CLOSED
+            circuit["opened_at"] = None
+
+    def record_failure(self, key):
+        with self._lock:
+            circuit = self._circuit(key)
+            circuit["failures"] += 1
+            circuit["consecutive_failures"] += 1
+            if (circuit["state"] == self.HALF_OPEN
+                    or circuit["consecutive_failures"] >= self.failure_threshold):
+                circuit["state"] = self.OPEN
+                circuit["opened_at"] = time.monotonic()
+
+    def state(self, key) -> str:
+        with self._lock:
+            return self._circuit(key)["state"]
+
+    def stats(self) -> dict:
+        """Snapshot of the counters of every key seen so far."""
+        with self._lock:
+            return {key: dict(circuit) for key, circuit in self._circuits.items()}
+
+    def reset(self, key=None):
+        with self._lock:
+            if key is None:
+                self._circuits.clear()
+            else:
+                self._circuits.pop(key, None)
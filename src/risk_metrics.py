@@ -0,0 +1,281 @@
+# risk_metrics.py
+"""
+Rolling and streaming risk metrics.
+
+`StreamingRiskMetrics.update` consumes one strategy return per bar in O(1)
+(amortized): window mean / variance are Welford accumulators that also
+remove the value leaving the window, the window's max drawdown comes from a
+two-stack sliding aggregate, and drawdown from the running peak is plain
+state. `rolling_risk_metrics` computes the same values for whole histories
+— or (strategies x bars) arrays — at once, for charts.
+
+Conventions follow `metrics.compute_performance_stats`: NaN returns are
+skipped (equity carries over), volatility is the per-bar sample std, and
+Sharpe is annualized with `periods_per_year`. Window metrics are NaN until
+`window` bars have been seen. A flat window (volatility below
+`VOL_FLOOR`, e.g. out of the market) reports zero volatility and a NaN
+Sharpe rather than a ratio of rounding noise. Hit rate is the share of positive returns
+among bars with a non-zero return (i.e. bars in the market).
+"""
+import math
+from collections import deque
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from src.config import trading_config
+
+VOL_FLOOR = 1e-9
+
+
+@dataclass
+class RiskUpdate:
+    """Risk state emitted after each bar."""
+    equity: float
+    sharpe: float
+    volatility: float
+    max_drawdown: float  # worst peak-to-trough move within the window
+    drawdown: float  # from the running (all-time) peak
+    drawdown_duration: int  # bars since that peak
+    hit_rate: float
+
+
+class _RollingWelford:
+    """Count, mean and M2 of the non-NaN values among the last `window` pushed.
+
+    Removing values makes Welford's update drift, so the state is recomputed
+    exactly from the window once every `window` pushes (still O(1) amortized).
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque()
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self._since_reset = 0
+
+    def push(self, x: float):
+        self.values.append(x)
+        self._since_reset += 1
+        if self._since_reset >= self.window:
+            if len(self.values) > self.window:
+                self.values.popleft()
+            self._reset()
+            return
+        if not math.isnan(x):
+            self.n += 1
+            delta = x - self.mean
+            self.mean += delta / self.n
+            self.m2 += delta * (x - self.mean)
+        if len(self.values) > self.window:
+            self._remove(self.values.popleft())
+
+    def _remove(self, x: float):
+        if math.isnan(x):
+            return
+        self.n -= 1
+        if self.n == 0:
+            self.mean = self.m2 = 0.0
+            return
+        delta = x - self.mean
+        self.mean -= delta / self.n
+        self.m2 = max(self.m2 - delta * (x - self.mean), 0.0)
+
+    def _reset(self):
+        valid = [v for v in self.values if not math.isnan(v)]
+        self.n = len(valid)
+        self.mean = math.fsum(valid) / self.n if valid else 0.0
+        self.m2 = math.fsum((v - self.mean) ** 2 for v in valid)
+        self._since_reset = 0
+
+    @property
+    def full(self) -> bool:
+        return len(self.values) == self.window
+
+    def std(self) -> float:
+        """Sample standard deviation (ddof=1)."""
+        return math.sqrt(self.m2 / (self.n - 1)) if self.full and self.n > 1 else math.nan
+
+
+def _combine(a: tuple, b: tuple) -> tuple:
+    """Merge (peak, trough, max drawdown) of two consecutive equity segments."""
+    return max(a[0], b[0]), min(a[1], b[1]), min(a[2], b[2], b[1] / a[0] - 1)
+
+
+class _RollingDrawdown:
+    """Max drawdown of the last `window` equity values.
+
+    Drawdown summaries combine associatively, so a queue built from two
+    stacks keeps the window aggregate with O(1) amortized pushes.
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self.front = []  # (value summary, summary of it and everything after it in front)
+        self.back = []
+        self.back_agg = None
+
+    def push(self, equity: float):
+        item = (equity, equity, 0.0)
+        self.back.append(item)
+        self.back_agg = item if self.back_agg is None else _combine(self.back_agg, item)
+        if len(self.front) + len(self.back) > self.window:
+            if not self.front:
+                agg = None
+                while self.back:
+                    item = self.back.pop()
+                    agg = item if agg is None else _combine(item, agg)
+                    self.front.append(agg)
+                self.back_agg = None
+            self.front.pop()
+
+    def max_drawdown(self) -> float:
+        if len(self.front) + len(self.back) < self.window:
+            return math.nan
+        if not self.front:
+            return self.back_agg[2]
+        if self.back_agg is None:
+            return self.front[-1][2]
+        return _combine(self.front[-1], self.back_agg)[2]
+
+
+class StreamingRiskMetrics:
+    """Rolling Sharpe, volatility, max drawdown and hit rate with O(1) updates."""
+
+    def __init__(self, window: int = trading_config.risk_window, risk_free_rate: float = 0.03,
+                 periods_per_year: int = 252):
+        self.window = window
+        self.risk_free = risk_free_rate / periods_per_year
+        self.annualize = math.sqrt(periods_per_year)
+        self._moments = _RollingWelford(window)
+        self._drawdown = _RollingDrawdown(window)
+        self._signs = deque()  # +1 win, 0 loss, None flat / NaN
+        self._wins = 0
+        self._active = 0
+        self.equity = 1.0
+        self.peak = None
+        self.peak_bar = 0
+        self.bars = 0
+
+    def update(self, strategy_return: float) -> RiskUpdate:
+        """Consume one bar's net strategy return."""
+        r = float(strategy_return)
+        if not math.isnan(r):
+            self.equity *= 1.0 + r
+        self._moments.push(r)
+        self._drawdown.push(self.equity)
+        self._push_sign(None if math.isnan(r) or r == 0 else int(r > 0))
+
+        if self.peak is None or self.equity >= self.peak:
+            self.peak, self.peak_bar = self.equity, self.bars
+        self.bars += 1
+
+        vol = self._moments.std()
+        if vol < VOL_FLOOR:
+            vol, sharpe = 0.0, math.nan
+        else:
+            sharpe = (self._moments.mean - self.risk_free) / vol * self.annualize
+        full = self._moments.full
+        return RiskUpdate(
+            equity=self.equity,
+            sharpe=sharpe,
+            volatility=vol,
+            max_drawdown=self._drawdown.max_drawdown(),
+            drawdown=self.equity / self.peak - 1,
+            drawdown_duration=self.bars - 1 - self.peak_bar,
+            hit_rate=self._wins / self._active if full and self._active else math.nan,
+        )
+
+    def _push_sign(self, sign):
+        self._signs.append(sign)
+        if sign is not None:
+            self._active += 1
+            self._wins += sign
+        if len(self._signs) > self.window:
+            old = self._signs.popleft()
+            if old is not None:
+                self._active -= 1
+                self._wins -= old
+
+    def run(self, returns) -> pd.DataFrame:
+        """Feed a sequence of returns and collect every update as a frame."""
+        rows = [self.update(r) for r in returns]
+        return pd.DataFrame([vars(r) for r in rows])
+
+
+def _window_sum(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing `window` sums of counts along the last axis (partial windows included)."""
+    csum = np.cumsum(values, axis=-1, dtype=np.float64)
+    out = csum.copy()
+    out[..., window:] -= csum[..., :-window]
+    return out
+
+
+def _offsets(values: np.ndarray, window: int, m: int):
+    """For k in 0..window-1, the k-th value of each of the `m` full windows."""
+    for k in range(window):
+        yield values[..., k : k + m]
+
+
+def rolling_risk_metrics(returns, window: int = trading_config.risk_window, risk_free_rate: float = 0.03,
+                         periods_per_year: int = 252) -> dict:
+    """Vectorized `StreamingRiskMetrics` over whole histories.
+
+    `returns` has shape (..., n_bars); every output (the `RiskUpdate`
+    fields) has the same shape, entry t being what the streaming version
+    emits after bar t.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    valid = ~np.isnan(returns)
+    clean = np.where(valid, returns, 0.0)
+    n_bars = returns.shape[-1]
+
+    # Equity (NaN returns carry it over) and drawdown from the running peak
+    equity = np.cumprod(1.0 + clean, axis=-1)
+    peak = np.maximum.accumulate(equity, axis=-1)
+    drawdown = equity / peak - 1
+    bars = np.broadcast_to(np.arange(n_bars), equity.shape)
+    peak_bar = np.maximum.accumulate(np.where(equity >= peak, bars, 0), axis=-1)
+
+    # Window moments, two-pass per window so a flat window is exactly flat
+    m = max(n_bars - window + 1, 0)  # number of full windows
+    count = _window_sum(valid, window)[..., window - 1 :]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = sum(_offsets(clean, window, m)) / count
+        sq = np.zeros(mean.shape)
+        for x in _offsets(returns, window, m):
+            sq += np.nan_to_num((x - mean) ** 2)
+        vol = np.where(count > 1, np.sqrt(sq / (count - 1)), np.nan)
+        flat = vol < VOL_FLOOR
+        vol[flat] = 0.0
+        sharpe = (mean - risk_free_rate / periods_per_year) / vol * math.sqrt(periods_per_year)
+        sharpe[flat] = np.nan
+
+        active = _window_sum(valid & (clean != 0), window)[..., window - 1 :]
+        wins = _window_sum(clean > 0, window)[..., window - 1 :]
+        hit_rate = np.where(active > 0, wins / active, np.nan)
+
+    # Window max drawdown: walk each window forward one offset at a time,
+    # so the cost is O(n_bars * window) without an (n_bars x window) copy
+    run_peak = equity[..., :m].copy()
+    max_dd = np.zeros(run_peak.shape)
+    for e in _offsets(equity, window, m):
+        np.maximum(run_peak, e, out=run_peak)
+        np.minimum(max_dd, e / run_peak - 1, out=max_dd)
+
+    def padded(values):
+        out = np.full(equity.shape, np.nan)
+        out[..., window - 1 :] = values
+        return out
+
+    return {
+        "equity": equity,
+        "sharpe": padded(sharpe),
+        "volatility": padded(vol),
+        "max_drawdown": padded(max_dd),
+        "drawdown": drawdown,
+        "drawdown_duration": bars - peak_bar,
+        "hit_rate": padded(hit_rate),
+    }
@@ -0,0 +1,37 @@
+# signals.py
+"""
+Compact signal encoding shared by the strategy, backtest and AI models.
+
+Signals are stored as int8 codes throughout the pipeline; string labels are
+only produced at display time via `signal_labels`.
+"""
+from enum import IntEnum
+
+import numpy as np
+import pandas as pd
+
+
+class Signal(IntEnum):
+    """Trading signal codes."""
+    HOLD = 0
+    BUY = 1
+    SELL = 2
+    SL = 3  # stop-loss exit
+    TP = 4  # take-profit exit
+
+
+SIGNAL_DTYPE = np.int8
+
+_LABELS = np.array([s.name for s in Signal], dtype=object)
+
+
+def signal_labels(codes):
+    """Map signal codes to their string labels.
+
+    A Series is returned as a Categorical Series on the same index;
+    anything else is returned as an object array.
+    """
+    if isinstance(codes, pd.Series):
+        labels = pd.Categorical.from_codes(codes.to_numpy(dtype=np.int64), categories=list(_LABELS))
+        return pd.Series(labels, index=codes.index, name=codes.name)
+    return _LABELS[np.asarray(codes, dtype=np.int64)]
@@ -1,6 +1,10 @@
 import pandas as pd
 import numpy as np
 
+from src.backtest import run_backtest
+from src.indicators import cached_indicator, sma, volatility
+from src.signals import Signal, SIGNAL_DTYPE
+
 def _normalize_and_find_price_col(df: pd.DataFrame):
     df = df.copy()
 
@@ -23,6 +27,7 @@ def _normalize_and_find_price_col(df: pd.DataFrame):
     return df, price_col
 
 
+@cached_indicator("rsi_strict")
 def compute_rsi(series: pd.Series, window: int = 14) -> pd.Series:
     delta = series.diff()
     gain = delta.where(delta > 0, 0.0)
@@ -36,6 +41,7 @@ def compute_rsi(series: pd.Series, window: int = 14) -> pd.Series:
     return rsi
 
 
+@cached_indicator("macd")
 def compute_macd(series: pd.Series, fast: int = 12, slow: int = 26, signal: int = 9):
     ema_fast = series.ewm(span=fast, adjust=False).mean()
     ema_slow = series.ewm(span=slow, adjust=False).mean()
@@ -60,7 +66,8 @@ def apply_sma_crossover(
     use_risk: bool = False,
     **kwargs
 ) -> tuple[pd.DataFrame, str]:
-    df = df.copy()
+    # Shallow copy: only new columns are added, existing data is never written
+    df = df.copy(deep=False)
 
     # ---- 1) Normalize columns, find close ----
     if isinstance(df.columns, pd.MultiIndex):
@@ -77,12 +84,15 @@ def apply_sma_crossover(
         raise KeyError(f"No close column found. Columns: {df.columns.tolist()}")
 
     # ---- 2) Basic SMAs ----
-    df["sma_short"] = df[price_col].rolling(short_window).mean()
-    df["sma_long"] = df[price_col].rolling(long_window).mean()
+    df["sma_short"] = sma(df[price_col], short_window)
+    df["sma_long"] = sma(df[price_col], long_window)
 
-    df["signal"] = "HOLD"
-    df.loc[df["sma_short"] > df["sma_long"], "signal"] = "BUY"
-    df.loc[df["sma_short"] < df["sma_long"], "signal"] = "SELL"
+    sma_short = df["sma_short"].to_numpy()
+    sma_long = df["sma_long"].to_numpy()
+    signal = np.full(len(df), Signal.HOLD, dtype=SIGNAL_DTYPE)
+    signal[sma_short > sma_long] = Signal.BUY
+    signal[sma_short < sma_long] = Signal.SELL
+    df["signal"] = signal
 
     # ---- 3) Optional RSI + MACD ----
     if use_rsi_macd:
@@ -92,12 +102,14 @@ def apply_sma_crossover(
         df["macd_signal"] = macd_signal
 
         # require confirmation: only BUY if RSI low + MACD cross up, etc. (simple demo rule)
-        buy_mask = (df["signal"] == "BUY") & (df["rsi"] < 60) & (df["macd"] > df["macd_signal"])
-        sell_mask = (df["signal"] == "SELL") & (df["rsi"] > 40) & (df["macd"] < df["macd_signal"])
-
-        df["signal"] = "HOLD"
-        df.loc[buy_mask, "signal"] = "BUY"
-        df.loc[sell_mask, "signal"] = "SELL"
+        rsi = df["rsi"].to_numpy(dtype=float)
+        macd, macd_signal = macd.to_numpy(), macd_signal.to_numpy()
+        buy_mask = (signal == Signal.BUY) & (rsi < 60) & (macd > macd_signal)
+        sell_mask = (signal == Signal.SELL) & (rsi > 40) & (macd < macd_signal)
+
+        signal[:] = Signal.HOLD
+        signal[buy_mask] = Signal.BUY
+        signal[sell_mask] = Signal.SELL
     else:
         # Initialize columns with NaN when not in use
         df["rsi"] = np.nan
@@ -107,84 +119,28 @@ def apply_sma_crossover(
     # ---- 4) Optional volatility filter ----
     if use_vol_filter and max_vol_pct is not None:
         df["returns_raw"] = df[price_col].pct_change()
-        df["volatility"] = df["returns_raw"].rolling(vol_window).std()
-        high_vol = df["volatility"] * 100 > max_vol_pct
-        df.loc[high_vol, "signal"] = "HOLD"
+        df["volatility"] = volatility(df[price_col], vol_window)
+        high_vol = df["volatility"].to_numpy() * 100 > max_vol_pct
+        signal[high_vol] = Signal.HOLD
     else:
         df["volatility"] = np.nan
 
     # ---- 5) Risk-controlled backtest: SL/TP + costs ----
-    df["returns"] = df[price_col].pct_change().fillna(0.0)
-
-    position = 0   # 1 = long, 0 = flat, -1 = short (we’ll keep it long/flat only for now)
-    entry_price = None
-    equity_curve = [1.0]
-    positions = [0]
-    strat_returns = []
-
-    cost = trade_cost_bps / 10000.0  # e.g. 10 bps -> 0.001
-
-    for i in range(1, len(df)):
-        price_prev = df.iloc[i - 1][price_col]
-        price_now = df.iloc[i][price_col]
-        sig = df.iloc[i]["signal"]
-
-        daily_ret = (price_now / price_prev) - 1.0 if price_prev else 0.0
-
-        # default: carry current position
-        new_position = position
-
-        # entry logic (simple: act on BUY/SELL)
-        if sig == "BUY" and position == 0:
-            new_position = 1
-            entry_price = price_now
-            daily_ret -= cost  # pay entry cost
-        elif sig == "SELL" and position == 1:
-            new_position = 0
-            entry_price = None
-            daily_ret -= cost  # pay exit cost
-
-        # risk controls: evaluate only if in position and risk management enabled
-        if position == 1 and entry_price is not None and use_risk:
-            move_from_entry = (price_now / entry_price) - 1.0
-
-            hit_sl = (stop_loss_pct is not None) and (move_from_entry <= -stop_loss_pct / 100.0)
-            hit_tp = (take_profit_pct is not None) and (move_from_entry >= take_profit_pct / 100.0)
-
-            if hit_sl:
-                new_position = 0
-                entry_price = None
-                daily_ret -= cost  # exit cost on forced close
-                # Update signal to indicate stop loss
-                df.at[df.index[i], "signal"] = "SL"
-            elif hit_tp:
-                new_position = 0
-                entry_price = None
-                daily_ret -= cost  # exit cost on forced close
-                # Update signal to indicate take profit
-                df.at[df.index[i], "signal"] = "TP"
-
-        strat_ret = daily_ret * position  # use *previous* position
-        last_equity = equity_curve[-1]
-        new_equity = last_equity * (1.0 + strat_ret)
-
-        equity_curve.append(new_equity)
-        positions.append(new_position)
-        strat_returns.append(strat_ret)
-
-        position = new_position
-
-    df["position"] = pd.Series(positions, index=df.index)
-    
-    # Calculate returns and strategy performance using vectorized approach
     df["returns"] = df[price_col].pct_change()
-    df["strategy_returns"] = df["returns"] * df["position"]
 
-    # Apply trade cost at transitions
-    cost_factor = 1 - (trade_cost_bps / 10000)
-    df.loc[df["position"].diff() != 0, "strategy_returns"] *= cost_factor
+    result = run_backtest(
+        df[price_col].to_numpy(dtype=float),
+        signal,
+        trade_cost_bps=trade_cost_bps,
+        stop_loss_pct=stop_loss_pct,
+        take_profit_pct=take_profit_pct,
+        use_risk=use_risk,
+    )
 
-    df["equity_curve"] = (1 + df["strategy_returns"]).cumprod()
+    df["signal"] = result.signal
+    df["position"] = result.position
+    df["strategy_returns"] = result.strategy_returns
+    df["equity_curve"] = result.equity_curve
 
     # Net of costs already baked in
     df["strategy_returns_net"] = df["strategy_returns"]
@@ -195,6 +151,7 @@ def apply_sma_crossover(
 # ----- helpers -----
 
 
+@cached_indicator("rsi")
 def _compute_rsi(series: pd.Series, window: int = 14) -> pd.Series:
     delta = series.diff()
     gain = (delta.where(delta > 0, 0.0)).rolling(window).mean()
@@ -204,6 +161,7 @@ def _compute_rsi(series: pd.Series, window: int = 14) -> pd.Series:
     return rsi
 
 
+@cached_indicator("macd")
 def _compute_macd(series: pd.Series, fast: int = 12, slow: int = 26, signal: int = 9):
     ema_fast = series.ewm(span=fast, adjust=False).mean()
     ema_slow = series.ewm(span=slow, adjust=False).mean()
@@ -220,7 +178,7 @@ def calculate_sma(df: pd.DataFrame, price_col: str, window: int) -> pd.DataFrame
     The function preserves the input index and uses `min_periods=window`
     so the SMA is NaN until enough observations are available (matching tests).
     """
-    df = df.copy()
+    df = df.copy(deep=False)
 
     # Ensure we have the requested column (case-insensitive)
     cols = {c.lower(): c for c in df.columns}
@@ -230,5 +188,5 @@ def calculate_sma(df: pd.DataFrame, price_col: str, window: int) -> pd.DataFrame
 
     col_name = cols[key]
     sma_col = f"sma_{window}"
-    df[sma_col] = df[col_name].rolling(window=window, min_periods=window).mean()
+    df[sma_col] = sma(df[col_name], window)
     return df
\ No newline at end of file
@@ -0,0 +1,236 @@
+# streaming.py
+"""
+Incremental (streaming) version of `strategy.apply_sma_crossover`.
+
+`StreamingSMACrossover.update` consumes one bar at a time in O(1): SMAs and
+RSI averages are kept as running window sums, MACD as EMA state, volatility
+as running sums of returns and squared returns, plus the position and entry
+price of the backtest. Fed the same bars, it reproduces the batch function's
+signal, position, strategy return and equity columns.
+"""
+import math
+import numbers
+from collections import deque
+from dataclasses import dataclass
+
+import pandas as pd
+
+from src.signals import Signal
+
+
+@dataclass
+class BarUpdate:
+    """Strategy state emitted after each bar."""
+    signal: Signal
+    position: int
+    strategy_return: float
+    equity: float
+    sma_short: float
+    sma_long: float
+    rsi: float
+    macd: float
+    macd_signal: float
+    volatility: float
+
+
+class _RollingSum:
+    """Sum and sum of squares over the last `window` values.
+
+    Subtracting values that leave the window accumulates rounding error, so
+    the sums are recomputed exactly from the window once every `window`
+    pushes (still O(1) amortized).
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque()
+        self.total = 0.0
+        self.total_sq = 0.0
+        self._since_reset = 0
+
+    def push(self, x: float):
+        self.values.append(x)
+        self._since_reset += 1
+        if self._since_reset >= self.window:
+            if len(self.values) > self.window:
+                self.values.popleft()
+            self._reset()
+            return
+        self.total += x
+        self.total_sq += x * x
+        if len(self.values) > self.window:
+            old = self.values.popleft()
+            self.total -= old
+            self.total_sq -= old * old
+
+    def _reset(self):
+        self.total = math.fsum(self.values)
+        self.total_sq = math.fsum(v * v for v in self.values)
+        self._since_reset = 0
+
+    @property
+    def full(self) -> bool:
+        return len(self.values) == self.window
+
+    def mean(self) -> float:
+        return self.total / self.window if self.full else math.nan
+
+    def std(self) -> float:
+        """Sample standard deviation (ddof=1), as pandas' rolling std."""
+        if not self.full or self.window < 2:
+            return math.nan
+        var = (self.total_sq - self.total * self.total / self.window) / (self.window - 1)
+        return math.sqrt(max(var, 0.0))
+
+
+class _EMA:
+    """`Series.ewm(span=span, adjust=False).mean()` one value at a time."""
+
+    def __init__(self, span: int):
+        self.alpha = 2.0 / (span + 1.0)
+        self.value = None
+
+    def push(self, x: float) -> float:
+        if self.value is None:
+            self.value = x
+        else:
+            self.value = self.alpha * x + (1.0 - self.alpha) * self.value
+        return self.value
+
+
+class StreamingSMACrossover:
+    """Stateful SMA crossover strategy with O(1) per-bar updates.
+
+    Takes the same parameters as `apply_sma_crossover`.
+    """
+
+    def __init__(
+        self,
+        short_window: int = 10,
+        long_window: int = 30,
+        use_rsi_macd: bool = False,
+        rsi_window: int = 14,
+        use_vol_filter: bool = False,
+        vol_window: int = 20,
+        max_vol_pct: float | None = None,
+        trade_cost_bps: int = 0,
+        stop_loss_pct: float | None = None,
+        take_profit_pct: float | None = None,
+        use_risk: bool = False,
+    ):
+        self.use_rsi_macd = use_rsi_macd
+        self.use_vol_filter = use_vol_filter and max_vol_pct is not None
+        self.max_vol_pct = max_vol_pct
+        self.cost_factor = 1 - trade_cost_bps / 10000
+        check_risk = use_risk and (stop_loss_pct is not None or take_profit_pct is not None)
+        self.sl_level = -stop_loss_pct / 100.0 if check_risk and stop_loss_pct is not None else None
+        self.tp_level = take_profit_pct / 100.0 if check_risk and take_profit_pct is not None else None
+
+        self._short = _RollingSum(short_window)
+        self._long = _RollingSum(long_window)
+        self._gains = _RollingSum(rsi_window)
+        self._losses = _RollingSum(rsi_window)
+        self._ema_fast = _EMA(12)
+        self._ema_slow = _EMA(26)
+        self._ema_signal = _EMA(9)
+        self._returns = _RollingSum(vol_window)
+
+        self.bars = 0
+        self.prev_price = None
+        self.position = 0
+        self.entry_price = None
+        self._growth = 1.0  # equity, skipping NaN returns like cumprod
+
+    def update(self, bar) -> BarUpdate:
+        """Consume one bar (a close price, or a mapping with a "close" key)."""
+        price = float(bar if isinstance(bar, numbers.Real) else bar["close"])
+
+        # ---- indicators ----
+        self._short.push(price)
+        self._long.push(price)
+        sma_short, sma_long = self._short.mean(), self._long.mean()
+
+        signal = Signal.HOLD
+        if sma_short > sma_long:
+            signal = Signal.BUY
+        elif sma_short < sma_long:
+            signal = Signal.SELL
+
+        rsi = macd = macd_signal = vol = math.nan
+        delta = price - self.prev_price if self.prev_price is not None else math.nan
+        if self.use_rsi_macd:
+            self._gains.push(delta if delta > 0 else 0.0)
+            self._losses.push(-delta if delta < 0 else 0.0)
+            if self._gains.full:
+                loss = self._losses.mean()
+                rs = self._gains.mean() / (loss if loss != 0 else 1e-9)
+                rsi = 100 - (100 / (1 + rs))
+            macd = self._ema_fast.push(price) - self._ema_slow.push(price)
+            macd_signal = self._ema_signal.push(macd)
+
+            buy = signal == Signal.BUY and rsi < 60 and macd > macd_signal
+            sell = signal == Signal.SELL and rsi > 40 and macd < macd_signal
+            signal = Signal.BUY if buy else Signal.SELL if sell else Signal.HOLD
+
+        ret = math.nan
+        if self.prev_price is not None:
+            ret = price / self.prev_price - 1.0 if self.prev_price else math.nan
+        if self.use_vol_filter:
+            if not math.isnan(ret):
+                self._returns.push(ret)
+            vol = self._returns.std()
+            if vol * 100 > self.max_vol_pct:
+                signal = Signal.HOLD
+
+        # ---- position / risk state machine ----
+        prev_position = self.position
+        if self.bars > 0:
+            new_position = self.position
+            if signal == Signal.BUY and self.position == 0:
+                new_position = 1
+                self.entry_price = price
+            elif signal == Signal.SELL and self.position == 1:
+                new_position = 0
+                self.entry_price = None
+
+            if self.position == 1 and self.entry_price is not None:
+                move_from_entry = (price / self.entry_price) - 1.0
+                if self.sl_level is not None and move_from_entry <= self.sl_level:
+                    new_position = 0
+                    self.entry_price = None
+                    signal = Signal.SL
+                elif self.tp_level is not None and move_from_entry >= self.tp_level:
+                    new_position = 0
+                    self.entry_price = None
+                    signal = Signal.TP
+            self.position = new_position
+
+        # ---- returns / equity (same convention as the batch backtest) ----
+        strategy_return = ret * self.position
+        if self.bars == 0 or self.position != prev_position:
+            strategy_return *= self.cost_factor
+        if math.isnan(strategy_return):
+            equity = math.nan
+        else:
+            self._growth *= 1.0 + strategy_return
+            equity = self._growth
+
+        self.prev_price = price
+        self.bars += 1
+        return BarUpdate(
+            signal=signal,
+            position=self.position,
+            strategy_return=strategy_return,
+            equity=equity,
+            sma_short=sma_short,
+            sma_long=sma_long,
+            rsi=rsi,
+            macd=macd,
+            macd_signal=macd_signal,
+            volatility=vol,
+        )
+
+    def run(self, prices) -> pd.DataFrame:
+        """Feed a sequence of close prices and collect every update as a frame."""
+        rows = [self.update(float(p)) for p in prices]
+        return pd.DataFrame([vars(r) for r in rows])
@@ -0,0 +1,191 @@
+# sweep.py
+"""
+Vectorized parameter sweep (grid search) for the SMA crossover strategy.
+
+Every distinct rolling window in the grid is computed once, signals and
+positions for a batch of combinations are evaluated as one 2-D
+(combinations x bars) array, and batches are spread over a process pool.
+"""
+import itertools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src.backtest import _run_risk_loop, signal_positions, strategy_equity
+from src.metrics import STAT_NAMES, batch_performance_stats
+from src.signals import Signal, SIGNAL_DTYPE
+from src.indicators import sma, volatility
+from src.strategy import _normalize_and_find_price_col, _compute_rsi, _compute_macd
+
+# Sweepable parameters and their `apply_sma_crossover` defaults
+SWEEP_DEFAULTS = {
+    "short_window": 10,
+    "long_window": 30,
+    "use_rsi_macd": False,
+    "rsi_window": 14,
+    "use_vol_filter": False,
+    "vol_window": 20,
+    "max_vol_pct": None,
+    "trade_cost_bps": 0,
+    "stop_loss_pct": None,
+    "take_profit_pct": None,
+    "use_risk": False,
+}
+
+
+def expand_grid(param_grid: dict) -> list[dict]:
+    """Cartesian product of `param_grid`, filled in with strategy defaults."""
+    unknown = set(param_grid) - set(SWEEP_DEFAULTS)
+    if unknown:
+        raise KeyError(f"Unknown sweep parameters: {sorted(unknown)}")
+
+    keys = list(param_grid)
+    combos = []
+    for values in itertools.product(*(param_grid[k] for k in keys)):
+        combo = dict(SWEEP_DEFAULTS)
+        combo.update(zip(keys, values))
+        combos.append(combo)
+    return combos
+
+
+def sweep_sma_crossover(
+    df: pd.DataFrame,
+    param_grid: dict,
+    processes: int | None = None,
+    batch_size: int = 64,
+    risk_free_rate: float = 0.03,
+    sort_by: str = "Sharpe",
+    ascending: bool = False,
+) -> pd.DataFrame:
+    """Evaluate every combination of `param_grid` on one price series.
+
+    Returns one row per combination (its parameters followed by the
+    `metrics.compute_performance_stats` fields, computed for a whole batch at
+    once by `metrics.batch_performance_stats`), ranked by `sort_by`.
+    Results match calling `apply_sma_crossover` once per combination.
+    `processes=1` runs in-process.
+    """
+    df, price_col = _normalize_and_find_price_col(df)
+    if "date" not in df.columns:
+        raise KeyError("Missing required columns: ['date']")
+
+    combos = expand_grid(param_grid)
+    if not combos:
+        return pd.DataFrame()
+
+    prices = df[price_col].to_numpy(dtype=np.float64)
+    dates = df["date"].to_numpy()
+    indicators = _compute_indicators(df[price_col], combos)
+
+    batches = [combos[i:i + batch_size] for i in range(0, len(combos), batch_size)]
+    tasks = [
+        (prices, dates, _indicators_for(indicators, batch), batch, risk_free_rate)
+        for batch in batches
+    ]
+
+    processes = processes or os.cpu_count() or 1
+    if processes == 1 or len(tasks) == 1:
+        results = map(_run_batch, tasks)
+        rows = [row for batch_rows in results for row in batch_rows]
+    else:
+        # spawn, as the engine's pool: callers may be multi-threaded, which fork does not handle safely
+        with ProcessPoolExecutor(max_workers=min(processes, len(tasks)),
+                                 mp_context=multiprocessing.get_context("spawn")) as pool:
+            rows = [row for batch_rows in pool.map(_run_batch, tasks) for row in batch_rows]
+
+    table = pd.DataFrame(rows)
+    if sort_by:
+        table = table.sort_values(sort_by, ascending=ascending, kind="stable", na_position="last")
+    return table.reset_index(drop=True)
+
+
+# ----- helpers -----
+
+
+def _needs_vol(combo):
+    return combo["use_vol_filter"] and combo["max_vol_pct"] is not None
+
+
+def _needs_risk(combo):
+    return combo["use_risk"] and (combo["stop_loss_pct"] is not None or combo["take_profit_pct"] is not None)
+
+
+def _compute_indicators(close: pd.Series, combos: list[dict]) -> dict:
+    """Each distinct indicator (kind, window) used by the grid, computed once."""
+    indicators = {}
+    for w in {c["short_window"] for c in combos} | {c["long_window"] for c in combos}:
+        indicators[("sma", w)] = sma(close, w).to_numpy()
+
+    if any(c["use_rsi_macd"] for c in combos):
+        for w in {c["rsi_window"] for c in combos if c["use_rsi_macd"]}:
+            indicators[("rsi", w)] = _compute_rsi(close, w).to_numpy(dtype=np.float64)
+        macd, macd_signal, _ = _compute_macd(close)
+        indicators[("macd",)] = macd.to_numpy()
+        indicators[("macd_signal",)] = macd_signal.to_numpy()
+
+    vol_windows = {c["vol_window"] for c in combos if _needs_vol(c)}
+    if vol_windows:
+        for w in vol_windows:
+            indicators[("vol", w)] = volatility(close, w).to_numpy()
+    return indicators
+
+
+def _indicators_for(indicators: dict, combos: list[dict]) -> dict:
+    """Subset of `indicators` a batch needs, so workers only receive those arrays."""
+    keys = set()
+    for c in combos:
+        keys.update({("sma", c["short_window"]), ("sma", c["long_window"])})
+        if c["use_rsi_macd"]:
+            keys.update({("rsi", c["rsi_window"]), ("macd",), ("macd_signal",)})
+        if _needs_vol(c):
+            keys.add(("vol", c["vol_window"]))
+    return {k: indicators[k] for k in keys}
+
+
+def _batch_signals(indicators: dict, combos: list[dict]) -> np.ndarray:
+    """Encoded signals for every combination as a (combinations x bars) array."""
+    short = np.stack([indicators[("sma", c["short_window"])] for c in combos])
+    long = np.stack([indicators[("sma", c["long_window"])] for c in combos])
+    signal = np.full(short.shape, Signal.HOLD, dtype=SIGNAL_DTYPE)
+    signal[short > long] = Signal.BUY
+    signal[short < long] = Signal.SELL
+
+    rows = [i for i, c in enumerate(combos) if c["use_rsi_macd"]]
+    if rows:
+        rsi = np.stack([indicators[("rsi", combos[i]["rsi_window"])] for i in rows])
+        macd, macd_signal = indicators[("macd",)], indicators[("macd_signal",)]
+        sub = signal[rows]
+        buy = (sub == Signal.BUY) & (rsi < 60) & (macd > macd_signal)
+        sell = (sub == Signal.SELL) & (rsi > 40) & (macd < macd_signal)
+        signal[rows] = np.where(buy, Signal.BUY, np.where(sell, Signal.SELL, Signal.HOLD))
+
+    rows = [i for i, c in enumerate(combos) if _needs_vol(c)]
+    if rows:
+        vol = np.stack([indicators[("vol", combos[i]["vol_window"])] for i in rows])
+        max_vol = np.array([combos[i]["max_vol_pct"] for i in rows], dtype=np.float64)[:, None]
+        sub = signal[rows]
+        sub[vol * 100 > max_vol] = Signal.HOLD
+        signal[rows] = sub
+    return signal
+
+
+def _run_batch(task) -> list[dict]:
+    prices, dates, indicators, combos, risk_free_rate = task
+    signal = _batch_signals(indicators, combos)
+
+    position, _ = signal_positions(signal)
+    for i, c in enumerate(combos):
+        if _needs_risk(c):
+            # Only the positions are needed; equity and trades are batched below
+            # (the loop marks SL / TP exits in this row of `signal`, which is not reused)
+            position[i], _ = _run_risk_loop(prices, signal[i], c["stop_loss_pct"], c["take_profit_pct"])
+
+    costs = np.array([c["trade_cost_bps"] for c in combos], dtype=np.float64)
+    strategy_returns, equity = strategy_equity(prices, position, costs)
+
+    stats = batch_performance_stats(strategy_returns, equity, position, dates, risk_free_rate=risk_free_rate)
+    columns = {k: v.tolist() for k, v in stats.items()}
+    return [{**c, **{k: columns[k][i] for k in STAT_NAMES}} for i, c in enumerate(combos)]
@@ -1,13 +1,27 @@
 # trader_app.py
 
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-from functools import reduce
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from src.app_cache import cached_stage, clear_stages, stage_stats
+from src.config import data_config, trading_config
+from src.data_provider import get_price_histories
+from src.indicators import indicator_cache
+from src.engine import (
+    analysis_error, analysis_workers, analyze_in, new_analysis_pool, run_portfolio, ticker_summary,
+)
+from src.pipeline import AI_COLUMNS, trade_ledger
+from src.portfolio import REBALANCE_MODES
+from src.risk_metrics import rolling_risk_metrics
+from src.signals import Signal, signal_labels
 
-from src.data_provider import get_price_history
-from src.strategy import apply_sma_crossover
-from src.ai_models import add_direction_prediction
+# matplotlib and the AI model modules (torch) are imported where they are
+# first needed, so page loads that never run a strategy stay light.
 
 # Must be first Streamlit command
 st.set_page_config(page_title="Auto-Trading AI (Paper)", page_icon="📈")
@@ -41,7 +55,14 @@ if custom_ticker_input:
 seen = set()
 tickers = [x for x in tickers if not (x in seen or seen.add(x))]
 
-period = st.selectbox("Data period", ["3mo", "6mo", "1y", "2y"], index=1)
+col_period, col_interval = st.columns(2)
+with col_period:
+    period = st.selectbox("Data period", ["5d", "1mo", "3mo", "6mo", "1y", "2y", "5y"], index=3)
+with col_interval:
+    interval = st.selectbox(
+        "Bar interval", ["1d", "1h", "15m", "5m", "1m"], index=0,
+        help="Intraday bars are limited by the data source (1m: last 30 days, 5m/15m: 60 days, 1h: 2 years)"
+    )
 short_window = st.slider("Short SMA window", 5, 30, value=10)
 long_window = st.slider("Long SMA window", 20, 100, value=30)
 
@@ -66,6 +87,14 @@ with col2:
     )
 
 use_ai = st.checkbox("Enable AI direction prediction", value=False)
+ai_model = (
+    st.selectbox(
+        "AI model", ["Heuristic", "Transformer"], index=0,
+        help="The transformer trains per ticker on first use and is cached afterwards"
+    )
+    if use_ai
+    else None
+)
 
 st.subheader("🔐 Risk Management")
 
@@ -93,59 +122,243 @@ with col4:
         "Per-trade cost (bps)", min_value=0, max_value=50, value=10, step=1
     )
 
+col5, col6 = st.columns(2)
+
+with col5:
+    max_position_pct = st.slider(
+        "Max position size (% of equity)", min_value=1, max_value=100,
+        value=int(trading_config.max_position_size * 100), step=1,
+        help="Long tickers share equity equally up to this cap; the rest stays in cash"
+    )
+
+with col6:
+    rebalance = st.selectbox(
+        "Rebalancing", REBALANCE_MODES, index=0,
+        help="none: trade only on entries/exits · periodic: every 21 bars · threshold: when a weight drifts > 2%"
+    )
+
 # -------------------------------------------------
 # HELPERS
 # -------------------------------------------------
 
 
-def preprocess_ohlc(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
+# Derived stages are keyed on their inputs' content, so the TTL only bounds memory
+STAGE_TTL = 3600
+STAGE_MAX_ENTRIES = 256
 
-    # Column normalization BEFORE indexing
-    if isinstance(df.columns, pd.MultiIndex):
-        df.columns = ["_".join([str(c).lower() for c in col if c]) for col in df.columns]
-    else:
-        df.columns = [str(c).lower() for c in df.columns]
 
-    # Detect correct date column (Yahoo = 'date' after lowering)
-    date_cols = [c for c in df.columns if c.startswith("date")]
-    if not date_cols:
-        raise KeyError("No date column found in DataFrame")
+@cached_stage("fetch", ttl=data_config.cache_ttl_seconds)
+def load_price_histories(tickers: tuple, period: str, interval: str):
+    return get_price_histories(list(tickers), period, interval=interval)
 
-    df.rename(columns={date_cols[0]: "date"}, inplace=True)
 
-    # Proper datetime conversion — FIXES 1970 issue permanently
-    df["date"] = pd.to_datetime(df["date"], errors="coerce", utc=True).dt.tz_localize(None)
+def add_display_enhancements(df: pd.DataFrame, intraday: bool = False) -> pd.DataFrame:
+    df = df.copy()
+    emoji = {"BUY": "🟢 BUY", "SELL": "🔴 SELL", "HOLD": "🟡 HOLD", "SL": "🛑 STOP-LOSS", "TP": "🎯 TAKE-PROFIT"}
+    df["signal_display"] = signal_labels(df["signal"]).cat.rename_categories(emoji)
+    df["date_display"] = df["date"].dt.strftime("%m-%d-%Y %H:%M" if intraday else "%m-%d-%Y")
+    return df
 
-    df = df.dropna(subset=["date"])
-    df = df.sort_values("date").reset_index(drop=True)
 
-    # Detect close column
-    close_cols = [c for c in df.columns if "close" in c]
-    if not close_cols:
-        raise KeyError("No close price column")
-    df["close"] = df[close_cols[0]].astype(float)
+@st.cache_resource
+def analysis_pool():
+    """Worker processes shared by all sessions; None runs analysis in-process."""
+    return new_analysis_pool(analysis_workers())
+
+
+@cached_stage("analysis", ttl=STAGE_TTL, max_entries=STAGE_MAX_ENTRIES)
+def analyze(raw_df: pd.DataFrame, strategy_params: dict, ai_model: str | None, ticker: str):
+    return analyze_in(analysis_pool(), raw_df, strategy_params, ai_model, ticker)
+
+
+def figure_png(fig) -> bytes:
+    """Render a figure as st.pyplot would, so the PNG itself can be cached."""
+    import matplotlib.pyplot as plt
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", bbox_inches="tight", dpi=200)
+    plt.close(fig)
+    return buf.getvalue()
+
+
+@cached_stage("charts", ttl=STAGE_TTL, max_entries=STAGE_MAX_ENTRIES)
+def price_chart(df: pd.DataFrame, price_col: str, ticker: str, short_window: int, long_window: int) -> bytes:
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=(12, 5))
+    ax.plot(df["date"], df[price_col], label="Close", linewidth=1.5, color="#2E86AB")
+    ax.plot(df["date"], df["sma_short"], linestyle="--", label=f"SMA {short_window}", linewidth=1.2, color="#A23B72")
+    ax.plot(df["date"], df["sma_long"], linestyle="--", label=f"SMA {long_window}", linewidth=1.2, color="#F18F01")
+
+    # Plot signal markers
+    buy = df[df["signal"] == Signal.BUY]
+    sell = df[df["signal"] == Signal.SELL]
+    ax.scatter(buy["date"], buy[price_col], marker="^", color="green", s=100, label="BUY", zorder=5)
+    ax.scatter(sell["date"], sell[price_col], marker="v", color="red", s=100, label="SELL", zorder=5)
+
+    ax.set_title(f"{ticker} Strategy Chart", fontsize=14, fontweight="bold")
+    ax.set_xlabel("Date", fontsize=11)
+    ax.set_ylabel("Price (USD)", fontsize=11)
+    ax.legend(loc="best", fontsize=9)
+    ax.grid(alpha=0.3, linestyle=":")
+    fig.autofmt_xdate()
+    return figure_png(fig)
+
+
+@cached_stage("charts", ttl=STAGE_TTL, max_entries=STAGE_MAX_ENTRIES)
+def equity_chart(df: pd.DataFrame) -> bytes:
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=(12, 4))
+    ax.plot(df["date"], df["equity_curve"], label="Strategy", linewidth=1.5, color="#06A77D")
+    ax.plot(df["date"], df["bh_equity"], label="Buy & Hold", linewidth=1.5, linestyle="--", color="#D62246")
+    ax.set_title("Strategy vs Buy & Hold", fontsize=12, fontweight="bold")
+    ax.set_xlabel("Date", fontsize=10)
+    ax.set_ylabel("Equity Multiplier", fontsize=10)
+    ax.legend(loc="best")
+    ax.grid(alpha=0.3, linestyle=":")
+    fig.autofmt_xdate()
+    return figure_png(fig)
+
+
+@cached_stage("charts", ttl=STAGE_TTL, max_entries=STAGE_MAX_ENTRIES)
+def risk_chart(df: pd.DataFrame, window: int) -> bytes:
+    import matplotlib.pyplot as plt
+    risk = rolling_risk_metrics(df["strategy_returns_net"].to_numpy(), window)
+    fig, (ax_sharpe, ax_dd) = plt.subplots(2, 1, figsize=(12, 5), sharex=True)
+    ax_sharpe.plot(df["date"], risk["sharpe"], linewidth=1.2, color="#2E86AB")
+    ax_sharpe.axhline(0, color="grey", linewidth=0.8)
+    ax_sharpe.set_ylabel("Sharpe", fontsize=10)
+    ax_sharpe.set_title(f"Rolling Risk ({window} bars)", fontsize=12, fontweight="bold")
+    ax_dd.fill_between(df["date"], risk["drawdown"] * 100, 0, color="#D62246", alpha=0.3, label="Drawdown")
+    ax_dd.plot(df["date"], risk["max_drawdown"] * 100, linewidth=1.2, color="#D62246", label="Rolling Max DD")
+    ax_dd.set_ylabel("Drawdown (%)", fontsize=10)
+    ax_dd.set_xlabel("Date", fontsize=10)
+    ax_dd.legend(loc="best")
+    for ax in (ax_sharpe, ax_dd):
+        ax.grid(alpha=0.3, linestyle=":")
+    fig.autofmt_xdate()
+    return figure_png(fig)
+
+
+@cached_stage("charts", ttl=STAGE_TTL, max_entries=STAGE_MAX_ENTRIES)
+def portfolio_chart(dates, total_equity, total_bh_equity, ticker_equity) -> bytes:
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=(12, 5))
+    ax.plot(dates, total_equity, linewidth=2, label="Strategy Portfolio", color="#06A77D")
+    ax.plot(dates, total_bh_equity, linewidth=2, linestyle="--", label="Buy & Hold Portfolio", color="#D62246")
+
+    # Add individual ticker equity curves (lighter), one column per ticker
+    ax.plot(dates, ticker_equity, linewidth=0.8, alpha=0.4, linestyle=":")
+
+    ax.set_title("Portfolio Performance Comparison", fontsize=14, fontweight="bold")
+    ax.set_xlabel("Date", fontsize=11)
+    ax.set_ylabel("Portfolio Value (USD)", fontsize=11)
+    ax.legend(loc="best")
+    ax.grid(alpha=0.3, linestyle=":")
+    fig.autofmt_xdate()
+    return figure_png(fig)
+
+
+def render_ticker(ticker: str, df: pd.DataFrame, price_col: str) -> pd.DataFrame:
+    """Draw one ticker's AI message and tabs; returns the frame with display columns."""
+    if use_ai:
+        signal_col, prob_col = AI_COLUMNS[ai_model]
+        last = df.iloc[-1]
+        st.info(
+            f"🤖 AI prediction: **{Signal(last[signal_col]).name}** "
+            f"(P(up)={last[prob_col]:.2f}) for next bar."
+        )
+
+    # Add emoji display + formatted date
+    df = add_display_enhancements(df, intraday=interval not in ("1d", "1wk", "1mo"))
+
+    # -------------------------------------------------
+    # 🔹 TABS UI
+    # -------------------------------------------------
+    chart_tab, perf_tab, indicator_tab, signals_tab = st.tabs(
+        ["📈 Chart", "📊 Performance", "📐 Indicators", "📅 Signals"]
+    )
 
-    return df
+    # 📈 Chart Tab
+    with chart_tab:
+        st.image(price_chart(df, price_col, ticker, short_window, long_window), width="stretch")
+
+    # 📊 Performance Tab
+    with perf_tab:
+        stats = ticker_summary(df, price_col)
+
+        col_a, col_b, col_c, col_d = st.columns(4)
+        with col_a:
+            st.metric("📈 Strategy Return", f"{stats['total_return']*100:.2f}%")
+        with col_b:
+            st.metric("💼 Buy & Hold Return", f"{stats['bh_return']*100:.2f}%")
+        with col_c:
+            st.metric("🎯 Win Rate", f"{stats['WinRate']*100:.1f}%")
+        with col_d:
+            st.metric("🔄 Trades Executed", stats["Trades"])
+        if stats["Trades"]:
+            st.caption(
+                f"Average hold: {stats['AvgHold']:.1f} bars · Time in market: {stats['Exposure']*100:.1f}%"
+            )
 
+        # Equity curve comparison
+        st.subheader("Equity Curve Comparison")
+        st.image(equity_chart(df), width="stretch")
 
-def add_display_enhancements(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    emoji = {"BUY": "🟢 BUY", "SELL": "🔴 SELL", "HOLD": "🟡 HOLD", "SL": "🛑 STOP-LOSS", "TP": "🎯 TAKE-PROFIT"}
-    df["signal_display"] = df["signal"].map(emoji).fillna("⚪")
-    df["date_display"] = df["date"].dt.strftime("%m-%d-%Y")
-    return df
+        st.subheader("Rolling Risk")
+        st.image(risk_chart(df, trading_config.risk_window), width="stretch")
+
+    # 📐 Indicators Tab
+    with indicator_tab:
+        last = df.iloc[-1]
 
+        st.subheader("📐 Latest Indicator Snapshot")
 
-def calculate_metrics(df: pd.DataFrame, price_col: str):
-    total_return_strategy = df["equity_curve"].iloc[-1] - 1
-    total_return_bh = df[price_col].iloc[-1] / df[price_col].iloc[0] - 1
+        # Display RSI and MACD only if they were computed
+        if use_rsi_macd:
+            st.write(
+                f"**RSI ({rsi_window}):** {last['rsi']:.1f} | "
+                f"**MACD:** {last['macd']:.4f} | **Signal:** {last['macd_signal']:.4f}"
+            )
+        else:
+            st.info("RSI and MACD indicators are disabled. Enable 'Require RSI + MACD confirmation' to see them.")
+
+        # Display volatility if enabled
+        if use_vol_filter and max_vol_pct is not None:
+            vol = last.get("volatility", None)
 
-    trades = df[df["position"].diff() != 0]
-    wins = trades[trades["strategy_returns_net"] > 0]
-    win_rate = (len(wins) / len(trades) * 100) if len(trades) > 0 else 0.0
+            if vol is not None and pd.notna(vol):
+                st.write(
+                    f"**Rolling volatility ({vol_window}d):** "
+                    f"{vol*100:.2f}% (max allowed {max_vol_pct:.1f}%)"
+                )
+            else:
+                st.write(
+                    f"**Rolling volatility ({vol_window}d):** "
+                    f"N/A (not enough data yet for the {vol_window}-day window)"
+                )
+        else:
+            st.info("Volatility filter is disabled.")
+
+        # Current position
+        st.write(f"**Current Position:** {'LONG' if last['position'] == 1 else 'FLAT'}")
+        st.write(f"**Latest Signal:** {last['signal_display']}")
+
+    # 📅 Signals Tab
+    with signals_tab:
+        st.subheader("Recent Trading Signals")
+        signal_df = df[["date_display", price_col, "signal_display", "position"]].tail(20).reset_index(drop=True)
+        signal_df.columns = ["Date", "Price (USD)", "Signal", "Position"]
+        st.dataframe(signal_df, width=800)
+
+        st.subheader("Trade Ledger")
+        trades = trade_ledger(df, price_col).tail(20).reset_index(drop=True)
+        if trades.empty:
+            st.info("No trades in this period.")
+        else:
+            trades["pnl"] *= 100
+            trades.columns = ["Entry", "Exit", "Entry Price", "Exit Price", "Exit Reason", "P&L (%)", "Bars Held"]
+            st.dataframe(trades, width=800)
 
-    return total_return_strategy, total_return_bh, win_rate, len(trades)
+    return df
 
 
 # -------------------------------------------------
@@ -158,194 +371,91 @@ if st.button("Run Strategy"):
     if not tickers:
         st.warning("Please select at least one ticker.")
     else:
+        # Fetch all tickers concurrently (a thread pool inside get_price_histories)
+        with st.spinner(f"Fetching {len(tickers)} ticker(s)..."):
+            price_frames, fetch_errors = load_price_histories(tuple(tickers), period, interval)
+        if fetch_errors:
+            # Don't keep a partial result around for the whole TTL
+            load_price_histories.clear(tuple(tickers), period, interval)
+
+        strategy_params = dict(
+            short_window=short_window,
+            long_window=long_window,
+            use_rsi_macd=use_rsi_macd,
+            rsi_window=rsi_window,
+            use_vol_filter=use_vol_filter,
+            vol_window=vol_window,
+            max_vol_pct=max_vol_pct,
+            trade_cost_bps=trade_cost_bps,
+            stop_loss_pct=stop_loss_pct,
+            take_profit_pct=take_profit_pct,
+            use_risk=use_risk,
+        )
+
+        # One slot per ticker keeps the page in selection order while
+        # results are drawn in the order they finish.
+        slots = {}
         for ticker in tickers:
-            st.header(f"📌 {ticker}")
+            slots[ticker] = st.container()
+            slots[ticker].header(f"📌 {ticker}")
 
-            raw_df = get_price_history(ticker, period)
+        jobs = {}
+        for ticker in tickers:
+            raw_df = price_frames.get(ticker)
             if raw_df is None or raw_df.empty:
-                st.error(f"No data returned for {ticker}")
-                continue
-
-            # Normalize OHLC and get clean 'date' + 'close'
-            try:
-                df = preprocess_ohlc(raw_df)
-            except KeyError as e:
-                st.error(f"{ticker}: {e}")
-                continue
-
-            # Apply strategy with indicators & trade costs
-            try:
-                df, price_col = apply_sma_crossover(
-                    df,
-                    short_window=short_window,
-                    long_window=long_window,
-                    use_rsi_macd=use_rsi_macd,
-                    rsi_window=rsi_window,
-                    use_vol_filter=use_vol_filter,
-                    vol_window=vol_window,
-                    max_vol_pct=max_vol_pct,
-                    trade_cost_bps=trade_cost_bps,
-                    stop_loss_pct=stop_loss_pct,
-                    take_profit_pct=take_profit_pct,
-                    use_risk=use_risk,
-                )
-            except KeyError as e:
-                st.error(f"{ticker}: Missing needed columns: {e}")
-                continue
-            
-            # Apply AI model for direction prediction
-            if use_ai:
-                df = add_direction_prediction(df, price_col)
-                # Display AI prediction
-                last = df.iloc[-1]
-                st.info(
-                    f"🤖 AI prediction: **{last['pred_signal']}** "
-                    f"(P(up)={last['pred_up_prob']:.2f}) for next bar."
-                )
-
-            # Baseline buy & hold equity curve
-            df["bh_equity"] = (df[price_col] / df[price_col].iloc[0]).fillna(1.0)
-
-            # Add emoji display + formatted date
-            df = add_display_enhancements(df)
-
-            # Store for portfolio aggregation later
-            results[ticker] = (df, price_col)
-
-            # -------------------------------------------------
-            # 🔹 TABS UI
-            # -------------------------------------------------
-            chart_tab, perf_tab, indicator_tab, signals_tab = st.tabs(
-                ["📈 Chart", "📊 Performance", "📐 Indicators", "📅 Signals"]
-            )
-
-            # 📈 Chart Tab
-            with chart_tab:
-                fig, ax = plt.subplots(figsize=(12, 5))
-                ax.plot(df["date"], df[price_col], label="Close", linewidth=1.5, color="#2E86AB")
-                ax.plot(df["date"], df["sma_short"], linestyle="--", label=f"SMA {short_window}", linewidth=1.2, color="#A23B72")
-                ax.plot(df["date"], df["sma_long"], linestyle="--", label=f"SMA {long_window}", linewidth=1.2, color="#F18F01")
-
-                # Plot signal markers
-                buy = df[df["signal"] == "BUY"]
-                sell = df[df["signal"] == "SELL"]
-                ax.scatter(buy["date"], buy[price_col], marker="^", color="green", s=100, label="BUY", zorder=5)
-                ax.scatter(sell["date"], sell[price_col], marker="v", color="red", s=100, label="SELL", zorder=5)
-
-                ax.set_title(f"{ticker} Strategy Chart", fontsize=14, fontweight="bold")
-                ax.set_xlabel("Date", fontsize=11)
-                ax.set_ylabel("Price (USD)", fontsize=11)
-                ax.legend(loc="best", fontsize=9)
-                ax.grid(alpha=0.3, linestyle=":")
-                fig.autofmt_xdate()
-                st.pyplot(fig)
-
-            # 📊 Performance Tab
-            with perf_tab:
-                total_ret, bh_ret, win_rate, n_trades = calculate_metrics(df, price_col)
-                
-                col_a, col_b, col_c, col_d = st.columns(4)
-                with col_a:
-                    st.metric("📈 Strategy Return", f"{total_ret*100:.2f}%")
-                with col_b:
-                    st.metric("💼 Buy & Hold Return", f"{bh_ret*100:.2f}%")
-                with col_c:
-                    st.metric("🎯 Win Rate", f"{win_rate:.1f}%")
-                with col_d:
-                    st.metric("🔄 Trades Executed", n_trades)
-
-                # Equity curve comparison
-                st.subheader("Equity Curve Comparison")
-                fig2, ax2 = plt.subplots(figsize=(12, 4))
-                ax2.plot(df["date"], df["equity_curve"], label="Strategy", linewidth=1.5, color="#06A77D")
-                ax2.plot(df["date"], df["bh_equity"], label="Buy & Hold", linewidth=1.5, linestyle="--", color="#D62246")
-                ax2.set_title("Strategy vs Buy & Hold", fontsize=12, fontweight="bold")
-                ax2.set_xlabel("Date", fontsize=10)
-                ax2.set_ylabel("Equity Multiplier", fontsize=10)
-                ax2.legend(loc="best")
-                ax2.grid(alpha=0.3, linestyle=":")
-                fig2.autofmt_xdate()
-                st.pyplot(fig2)
-
-            # 📐 Indicators Tab
-            with indicator_tab:
-                last = df.iloc[-1]
-
-                st.subheader("📐 Latest Indicator Snapshot")
-                
-                # Display RSI and MACD only if they were computed
-                if use_rsi_macd:
-                    st.write(
-                        f"**RSI ({rsi_window}):** {last['rsi']:.1f} | "
-                        f"**MACD:** {last['macd']:.4f} | **Signal:** {last['macd_signal']:.4f}"
-                    )
-                else:
-                    st.info("RSI and MACD indicators are disabled. Enable 'Require RSI + MACD confirmation' to see them.")
-
-                # Display volatility if enabled
-                if use_vol_filter and max_vol_pct is not None:
-                    vol = last.get("volatility", None)
-
-                    if vol is not None and pd.notna(vol):
-                        st.write(
-                            f"**Rolling volatility ({vol_window}d):** "
-                            f"{vol*100:.2f}% (max allowed {max_vol_pct:.1f}%)"
-                        )
-                    else:
-                        st.write(
-                            f"**Rolling volatility ({vol_window}d):** "
-                            f"N/A (not enough data yet for the {vol_window}-day window)"
-                        )
-                else:
-                    st.info("Volatility filter is disabled.")
-
-                # Current position
-                st.write(f"**Current Position:** {'LONG' if last['position'] == 1 else 'FLAT'}")
-                st.write(f"**Latest Signal:** {last['signal_display']}")
-
-            # 📅 Signals Tab
-            with signals_tab:
-                st.subheader("Recent Trading Signals")
-                signal_df = df[["date_display", price_col, "signal_display", "position"]].tail(20).reset_index(drop=True)
-                signal_df.columns = ["Date", "Price (USD)", "Signal", "Position"]
-                st.dataframe(signal_df, width=800)
+                slots[ticker].error(f"No data returned for {ticker}: {fetch_errors.get(ticker, 'unknown error')}")
+            else:
+                jobs[ticker] = raw_df
+
+        if jobs:
+            ctx = get_script_run_ctx()
+            with ThreadPoolExecutor(
+                max_workers=min(len(jobs), 32),
+                initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx),
+            ) as pool:
+                futures = {
+                    pool.submit(analyze, raw_df, strategy_params, ai_model if use_ai else None, ticker): ticker
+                    for ticker, raw_df in jobs.items()
+                }
+                with st.spinner(f"Analyzing {len(jobs)} ticker(s)..."):
+                    for future in as_completed(futures):
+                        ticker = futures[future]
+                        with slots[ticker]:
+                            try:
+                                df, price_col = future.result()
+                            except Exception as e:
+                                # Bad data or a crashed worker only costs this ticker
+                                st.error(f"{ticker}: {analysis_error(e)}")
+                                continue
+                            # Store for portfolio aggregation later
+                            results[ticker] = (render_ticker(ticker, df, price_col), price_col)
+
+        results = {t: results[t] for t in tickers if t in results}
 
         st.markdown("---")
 
         # -------------------------------------------------
-        # PORTFOLIO AGGREGATION (EQUAL WEIGHTED)
+        # PORTFOLIO BACKTEST
         # -------------------------------------------------
         if len(results) > 1:
             st.header("📦 Portfolio Analysis")
-            st.write(f"**Equal-weighted portfolio** of {len(results)} tickers with ${portfolio_capital:,.0f} total capital")
-            
-            # Calculate portfolio metrics
-            frames = []
-            for t, (df, _) in results.items():
-                tmp = df[["date", "equity_curve", "bh_equity"]].copy()
-                tmp[f"{t}_equity"] = (portfolio_capital / len(results)) * tmp["equity_curve"]
-                tmp[f"{t}_bh_equity"] = (portfolio_capital / len(results)) * tmp["bh_equity"]
-                frames.append(tmp[["date", f"{t}_equity", f"{t}_bh_equity"]])
-
-            portfolio_df = reduce(
-                lambda left, right: pd.merge(left, right, on="date", how="outer"),
-                frames
-            ).sort_values("date")
-
-            equity_cols = [c for c in portfolio_df.columns if c.endswith("_equity") and not "bh" in c]
-            bh_cols = [c for c in portfolio_df.columns if c.endswith("_bh_equity")]
-            
-            portfolio_df[equity_cols] = portfolio_df[equity_cols].ffill()
-            portfolio_df[bh_cols] = portfolio_df[bh_cols].ffill()
-            
-            portfolio_df["total_equity"] = portfolio_df[equity_cols].sum(axis=1)
-            portfolio_df["total_bh_equity"] = portfolio_df[bh_cols].sum(axis=1)
+            st.write(
+                f"**Allocated portfolio** of {len(results)} tickers with ${portfolio_capital:,.0f} total capital: "
+                f"long signals share equity equally, at most {max_position_pct}% each "
+                f"(rebalancing: {rebalance}). Buy & hold is equal-weighted."
+            )
+
+            summary = run_portfolio(
+                results, capital=portfolio_capital, max_position_size=max_position_pct / 100,
+                trade_cost_bps=trade_cost_bps, rebalance=rebalance,
+            )
+            panel, portfolio = summary.panel, summary.result
 
             # Portfolio metrics
-            portfolio_return = (portfolio_df["total_equity"].iloc[-1] / portfolio_capital - 1) * 100
-            portfolio_bh_return = (portfolio_df["total_bh_equity"].iloc[-1] / portfolio_capital - 1) * 100
-            
-            col_p1, col_p2, col_p3 = st.columns(3)
+            portfolio_return = summary.total_return * 100
+            portfolio_bh_return = summary.bh_return * 100
+
+            col_p1, col_p2, col_p3, col_p4 = st.columns(4)
             with col_p1:
                 st.metric("📊 Portfolio Return", f"{portfolio_return:.2f}%")
             with col_p2:
@@ -354,43 +464,51 @@ if st.button("Run Strategy"):
                 outperformance = portfolio_return - portfolio_bh_return
                 st.metric("🎯 Outperformance", f"{outperformance:.2f}%", 
                          delta=f"{outperformance:.2f}%")
+            with col_p4:
+                st.metric("💸 Trading Costs", f"${portfolio.costs.sum():,.2f}")
 
             # Portfolio equity curve
             st.subheader("Portfolio Equity Curves")
-            fig, ax = plt.subplots(figsize=(12, 5))
-            ax.plot(portfolio_df["date"], portfolio_df["total_equity"], 
-                   linewidth=2, label="Strategy Portfolio", color="#06A77D")
-            ax.plot(portfolio_df["date"], portfolio_df["total_bh_equity"], 
-                   linewidth=2, linestyle="--", label="Buy & Hold Portfolio", color="#D62246")
-            
-            # Add individual ticker equity curves (lighter)
-            for col in equity_cols:
-                ticker_name = col.replace("_equity", "")
-                ax.plot(portfolio_df["date"], portfolio_df[col], 
-                       linewidth=0.8, alpha=0.4, linestyle=":")
-            
-            ax.set_title("Portfolio Performance Comparison", fontsize=14, fontweight="bold")
-            ax.set_xlabel("Date", fontsize=11)
-            ax.set_ylabel("Portfolio Value (USD)", fontsize=11)
-            ax.legend(loc="best")
-            ax.grid(alpha=0.3, linestyle=":")
-            fig.autofmt_xdate()
-            st.pyplot(fig)
+            st.image(portfolio_chart(panel.dates, portfolio.equity, summary.bh_equity, portfolio.holdings), width="stretch")
 
             # Individual ticker contributions
             with st.expander("📊 Individual Ticker Contributions"):
-                contrib_data = []
-                for t, (df, price_col) in results.items():
-                    ticker_return = (df["equity_curve"].iloc[-1] - 1) * 100
-                    ticker_bh_return = (df["bh_equity"].iloc[-1] - 1) * 100
-                    contrib_data.append({
-                        "Ticker": t,
-                        "Strategy Return": f"{ticker_return:.2f}%",
-                        "B&H Return": f"{ticker_bh_return:.2f}%",
-                        "Outperformance": f"{ticker_return - ticker_bh_return:.2f}%",
-                        "Allocation": f"${portfolio_capital / len(results):,.0f}"
-                    })
-                
-                contrib_df = pd.DataFrame(contrib_data)
+                ticker_returns = (panel.last_valid("equity") - 1) * 100
+                ticker_bh_returns = (panel.last_valid("bh_equity") - 1) * 100
+                contrib_df = pd.DataFrame({
+                    "Ticker": panel.tickers,
+                    "Strategy Return": [f"{r:.2f}%" for r in ticker_returns],
+                    "B&H Return": [f"{r:.2f}%" for r in ticker_bh_returns],
+                    "Outperformance": [f"{r:.2f}%" for r in ticker_returns - ticker_bh_returns],
+                    "Avg Weight": [f"{w * 100:.1f}%" for w in portfolio.weights.mean(axis=0)],
+                })
                 st.dataframe(contrib_df, width=800)
 
+# -------------------------------------------------
+# CACHE DEBUG PANEL
+# -------------------------------------------------
+with st.expander("🛠️ Cache statistics"):
+    stats = stage_stats().snapshot()
+    if stats:
+        st.dataframe(pd.DataFrame(stats).set_index("stage"), width=800)
+    else:
+        st.write("No cached stage has run yet.")
+    ind = indicator_cache.stats()
+    st.write(
+        f"**Indicator cache (app process):** {ind['entries']} entries, {ind['bytes'] / 2**20:.1f} MB, "
+        f"{ind['hits']} hits / {ind['misses']} misses"
+    )
+    pool = analysis_pool()
+    if pool is not None:
+        st.caption(
+            "Analysis runs in worker processes, each with its own indicator cache; "
+            "clearing restarts the workers."
+        )
+    if st.button("Clear caches"):
+        clear_stages()
+        indicator_cache.clear()
+        if pool is not None:
+            # Swap in a fresh pool rather than shutting the shared one down: other
+            # sessions may still be submitting to it, and it exits once unreferenced
+            analysis_pool.clear()
+        st.success("Caches cleared.")
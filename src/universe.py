@@ -0,0 +1,259 @@
+# universe.py
+"""
+Multi-core SMA crossover backtests for whole ticker universes.
+
+All close prices and dates are loaded once into shared memory as flat
+arrays (each ticker a contiguous slice), and workers attach to them by
+name: a task only carries a range of ticker indices, never a DataFrame.
+Each worker runs `apply_sma_crossover` + `compute_performance_stats` on
+its tickers, writes equity and position into shared output arrays, and
+sends back only the stats rows.
+
+Usage:
+    python -m src.universe AAPL MSFT ... [--tickers-file FILE] [--period 1y] [--interval 1d]
+        [--short 10] [--long 30] [--stop-loss PCT] [--take-profit PCT] [--processes N]
+        [--output stats.csv] [--equity equity.csv]
+"""
+import argparse
+import math
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from src.config import data_config, trading_config
+from src.metrics import compute_performance_stats
+from src.panel import Panel, align_dates, ffill
+from src.pipeline import preprocess_ohlc
+from src.strategy import apply_sma_crossover
+
+
+class SharedArray:
+    """NumPy array backed by a `multiprocessing.shared_memory` block.
+
+    The creating process owns the block and unlinks it on `close`; other
+    processes `attach` with `spec`, a small picklable tuple.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, shape: tuple, dtype, owner: bool):
+        self.shm = shm
+        self.owner = owner
+        self.array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+    @classmethod
+    def create(cls, shape: tuple, dtype) -> "SharedArray":
+        nbytes = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+        return cls(shared_memory.SharedMemory(create=True, size=nbytes), shape, dtype, owner=True)
+
+    @classmethod
+    def attach(cls, spec: tuple) -> "SharedArray":
+        name, shape, dtype = spec
+        return cls(shared_memory.SharedMemory(name=name), shape, dtype, owner=False)
+
+    @property
+    def spec(self) -> tuple:
+        return self.shm.name, self.array.shape, self.array.dtype.str
+
+    def close(self):
+        self.array = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+@dataclass
+class UniverseResult:
+    """Per-ticker stats plus aligned date × ticker close / equity / position."""
+    stats: pd.DataFrame
+    panel: Panel
+    errors: dict = field(default_factory=dict)
+
+
+# Arrays a worker attached to, keyed by role; set once per process
+_SHARED = {}
+
+
+def _init_worker(specs: dict, offsets: np.ndarray):
+    _SHARED.clear()
+    _SHARED.update({name: SharedArray.attach(spec) for name, spec in specs.items()})
+    _SHARED["offsets"] = offsets
+
+
+def _release_worker():
+    for name, shared in list(_SHARED.items()):
+        if isinstance(shared, SharedArray):
+            shared.close()
+    _SHARED.clear()
+
+
+def _run_chunk(task) -> list:
+    """Backtest tickers `first..last-1`; returns (index, stats, error) rows."""
+    first, last, strategy_params = task
+    offsets = _SHARED["offsets"]
+    prices = _SHARED["prices"].array
+    dates = _SHARED["dates"].array
+    equity = _SHARED["equity"].array
+    position = _SHARED["position"].array
+
+    rows = []
+    for i in range(first, last):
+        start, end = offsets[i], offsets[i + 1]
+        df = pd.DataFrame({"date": dates[start:end], "close": prices[start:end]})
+        try:
+            out, price_col = apply_sma_crossover(df, **strategy_params)
+            stats = compute_performance_stats(out, price_col)
+        except Exception as e:
+            rows.append((i, None, str(e)))
+            continue
+        equity[start:end] = out["equity_curve"].to_numpy()
+        position[start:end] = out["position"].to_numpy()
+        stats = {k: float(v) for k, v in stats.items()}
+        stats["Trades"] = int(stats["Trades"])
+        stats["bh_return"] = float(prices[end - 1] / prices[start] - 1)
+        rows.append((i, stats, None))
+    return rows
+
+
+def run_universe(frames: dict, strategy_params: dict | None = None, processes: int | None = None,
+                 chunk_size: int | None = None) -> UniverseResult:
+    """Backtest every ticker in `frames` (ticker -> fetched OHLC DataFrame).
+
+    `strategy_params` are `apply_sma_crossover` keyword arguments.
+    `processes` defaults to `DataConfig.analysis_workers` (0 = CPU count);
+    1 runs in-process. Tickers that cannot be backtested are reported in
+    `errors` instead of failing the run.
+    """
+    strategy_params = dict(strategy_params or {})
+    errors = {}
+    closes, date_arrays = {}, {}
+    for ticker, raw in frames.items():
+        try:
+            df = preprocess_ohlc(raw)
+        except KeyError as e:
+            errors[ticker] = str(e)
+            continue
+        if df.empty:
+            errors[ticker] = "No data returned"
+            continue
+        closes[ticker] = df["close"].to_numpy(dtype=np.float64)
+        date_arrays[ticker] = df["date"].to_numpy(dtype="datetime64[ns]")
+
+    tickers = list(closes)
+    lengths = [len(closes[t]) for t in tickers]
+    offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+    total = int(offsets[-1])
+
+    shared = {
+        "prices": SharedArray.create((total,), np.float64),
+        "dates": SharedArray.create((total,), "datetime64[ns]"),
+        "equity": SharedArray.create((total,), np.float64),
+        "position": SharedArray.create((total,), np.int8),
+    }
+    try:
+        for i, t in enumerate(tickers):
+            shared["prices"].array[offsets[i]:offsets[i + 1]] = closes[t]
+            shared["dates"].array[offsets[i]:offsets[i + 1]] = date_arrays[t]
+        del closes, date_arrays
+        shared["equity"].array[:] = np.nan
+        shared["position"].array[:] = 0
+
+        processes = processes or data_config.analysis_workers or os.cpu_count() or 1
+        chunk_size = chunk_size or max(1, math.ceil(len(tickers) / (processes * 4)))
+        tasks = [(i, min(i + chunk_size, len(tickers)), strategy_params)
+                 for i in range(0, len(tickers), chunk_size)]
+        specs = {name: array.spec for name, array in shared.items()}
+
+        if processes == 1 or len(tasks) <= 1:
+            _init_worker(specs, offsets)
+            try:
+                rows = [row for task in tasks for row in _run_chunk(task)]
+            finally:
+                _release_worker()
+        else:
+            # spawn, as the engine's pool: workers attach to the arrays by name, so nothing relies on fork
+            with ProcessPoolExecutor(max_workers=min(processes, len(tasks)), initializer=_init_worker,
+                                     initargs=(specs, offsets),
+                                     mp_context=multiprocessing.get_context("spawn")) as pool:
+                rows = [row for chunk in pool.map(_run_chunk, tasks) for row in chunk]
+
+        stats = {}
+        for i, row_stats, error in rows:
+            if error is None:
+                stats[tickers[i]] = row_stats
+            else:
+                errors[tickers[i]] = error
+
+        dates, date_rows, cols = align_dates(shared["dates"].array, lengths)
+        panel = Panel(dates=dates, tickers=tickers)
+        for name in ("prices", "equity", "position"):
+            values = np.full((len(dates), len(tickers)), np.nan)
+            values[date_rows, cols] = shared[name].array
+            panel.fields["close" if name == "prices" else name] = ffill(values)
+    finally:
+        for array in shared.values():
+            array.close()
+
+    table = pd.DataFrame.from_dict(stats, orient="index")
+    table.index.name = "ticker"
+    return UniverseResult(stats=table, panel=panel, errors=errors)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("tickers", nargs="*", help="ticker symbols")
+    parser.add_argument("--tickers-file", help="file with one ticker per line")
+    parser.add_argument("--period", default="1y")
+    parser.add_argument("--interval", default="1d")
+    parser.add_argument("--short", type=int, default=10, help="short SMA window")
+    parser.add_argument("--long", type=int, default=30, help="long SMA window")
+    parser.add_argument("--rsi-macd", action="store_true", help="require RSI + MACD confirmation")
+    parser.add_argument("--cost-bps", type=int, default=trading_config.trade_cost_bps)
+    parser.add_argument("--stop-loss", type=float, help="stop-loss percent")
+    parser.add_argument("--take-profit", type=float, help="take-profit percent")
+    parser.add_argument("--processes", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--output", help="write per-ticker stats to this CSV file")
+    parser.add_argument("--equity", help="write the date x ticker equity curves to this CSV file")
+    parser.add_argument("--top", type=int, default=20, help="rows to print, ranked by Sharpe")
+    args = parser.parse_args(argv)
+
+    from src.engine import read_tickers
+    tickers = read_tickers(args.tickers, args.tickers_file)
+    if not tickers:
+        parser.error("no tickers given")
+
+    from src.data_provider import get_price_histories
+    frames, errors = get_price_histories(tickers, args.period, interval=args.interval)
+    strategy_params = {
+        "short_window": args.short,
+        "long_window": args.long,
+        "use_rsi_macd": args.rsi_macd,
+        "trade_cost_bps": args.cost_bps,
+        "stop_loss_pct": args.stop_loss,
+        "take_profit_pct": args.take_profit,
+        "use_risk": args.stop_loss is not None or args.take_profit is not None,
+    }
+    result = run_universe(frames, strategy_params, processes=args.processes)
+    errors.update(result.errors)
+
+    for ticker, error in errors.items():
+        print(f"⚠️ {ticker}: {error}", file=sys.stderr)
+    if result.stats.empty:
+        return 1
+
+    if args.output:
+        result.stats.to_csv(args.output)
+    if args.equity:
+        result.panel.to_frame("equity").to_csv(args.equity)
+    ranked = result.stats.sort_values("Sharpe", ascending=False, na_position="last")
+    print(ranked.head(args.top).to_string(float_format=lambda v: f"{v:.4f}"))
+    print(f"\n{len(result.stats)} tickers backtested, {len(errors)} failed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
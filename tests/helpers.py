@@ -0,0 +1,19 @@
+# tests/helpers.py
+"""
+Shared test data builders.
+"""
+import numpy as np
+import pandas as pd
+
+
+def make_frames(n_tickers=6, seed=0):
+    """Random-walk Date/Close frames of uneven length and start, keyed T0, T1, ..."""
+    rng = np.random.default_rng(seed)
+    frames = {}
+    for i in range(n_tickers):
+        n = int(rng.integers(60, 200))
+        frames[f"T{i}"] = pd.DataFrame({
+            "Date": pd.bdate_range("2023-01-02", periods=n) + pd.Timedelta(days=int(rng.integers(0, 5))),
+            "Close": 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n))),
+        })
+    return frames
@@ -0,0 +1,159 @@
+# tests/test_app.py
+"""
+Tests for the Streamlit app and its cached pipeline stages.
+"""
+import multiprocessing
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from src import data_provider, engine
+from src.config import data_config
+from src.app_cache import cached_stage, clear_stages, stage_stats
+from src.pipeline import analyze_ticker
+from src.price_cache import PriceCache
+from tests.test_data_provider import StubChartServer
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src", "trader_app.py")
+
+
+class TestCachedStage(unittest.TestCase):
+    """Test hit / miss accounting of `cached_stage`."""
+
+    def setUp(self):
+        clear_stages()
+
+    def test_counts_hits_and_misses(self):
+        calls = []
+
+        @cached_stage("square")
+        def square(x):
+            calls.append(x)
+            return x * x
+
+        self.assertEqual([square(3), square(3), square(4)], [9, 9, 16])
+        self.assertEqual(calls, [3, 4])
+        row = next(r for r in stage_stats().snapshot() if r["stage"] == "square")
+        self.assertEqual((row["calls"], row["hits"], row["misses"]), (3, 1, 2))
+
+
+class TestApp(unittest.TestCase):
+    """Run the app script against the stub chart server."""
+
+    def setUp(self):
+        clear_stages()
+        self.stub = StubChartServer(n_bars=150)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.patches = [
+            patch.object(data_provider, "BASE_URL", self.stub.url),
+            patch.object(data_provider, "price_cache", PriceCache(self.tmp.name, ttl_seconds=900)),
+            # In-process analysis unless a test asks for the pool
+            patch.object(data_config, "analysis_workers", 1),
+        ]
+        for p in self.patches:
+            p.start()
+        st.cache_resource.clear()  # drop any analysis pool sized by another test
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        st.cache_resource.clear()
+        self.stub.close()
+        self.tmp.cleanup()
+
+    def run_app(self, tickers):
+        at = AppTest.from_file(APP, default_timeout=120)
+        at.run()
+        at.multiselect[0].set_value(tickers)
+        at.run()
+        at.button[0].click().run()
+        self.assertFalse(at.exception, [e.value for e in at.exception])
+        self.assertFalse(at.error, [e.value for e in at.error])
+        return at
+
+    def test_rerun_is_served_from_cache(self):
+        self.run_app(["AAPL", "MSFT"])
+        self.run_app(["AAPL", "MSFT"])
+
+        stats = {r["stage"]: r for r in stage_stats().snapshot()}
+        self.assertEqual(len(self.stub.requests), 2)
+        self.assertEqual(stats["fetch"]["misses"], 1)
+        self.assertEqual(stats["analysis"]["misses"], 2)
+        self.assertEqual(stats["analysis"]["hits"], 2)
+
+    def test_failed_ticker_does_not_block_others(self):
+        self.stub.missing.add("NOPE")
+        at = AppTest.from_file(APP, default_timeout=120)
+        at.run()
+        at.multiselect[0].set_value(["AAPL"])
+        at.text_input[0].set_value("NOPE, MSFT")
+        at.run()
+        at.button[0].click().run()
+
+        self.assertEqual([h.value for h in at.header][:3], ["📌 AAPL", "📌 NOPE", "📌 MSFT"])
+        self.assertEqual(len(at.error), 1)
+        self.assertIn("NOPE", at.error[0].value)
+        self.assertIn("📦 Portfolio Analysis", [h.value for h in at.header])
+
+    def test_analysis_error_is_shown_in_ticker_slot(self):
+        real = engine.analyze_ticker
+
+        def analyze_ticker(raw_df, strategy_params, ai_model, ticker):
+            if ticker == "MSFT":
+                raise ValueError("bad bars")
+            return real(raw_df, strategy_params, ai_model, ticker)
+
+        with patch.object(engine, "analyze_ticker", analyze_ticker):
+            at = AppTest.from_file(APP, default_timeout=120)
+            at.run()
+            at.multiselect[0].set_value(["AAPL", "MSFT"])
+            at.run()
+            at.button[0].click().run()
+
+        self.assertFalse(at.exception, [e.value for e in at.exception])
+        self.assertEqual([e.value for e in at.error], ["MSFT: ValueError: bad bars"])
+        self.assertIn("📌 AAPL", [h.value for h in at.header])
+
+    def test_analysis_runs_in_worker_pool(self):
+        serial = self.run_app(["AAPL", "MSFT"])
+        clear_stages()
+        st.cache_resource.clear()  # the in-process run cached a None pool
+        with patch.object(data_config, "analysis_workers", 2):
+            pooled = self.run_app(["AAPL", "MSFT"])
+
+        captions = [c.value for c in pooled.caption]
+        self.assertTrue(any("worker processes" in c for c in captions), captions)
+        self.assertIn("📦 Portfolio Analysis", [h.value for h in pooled.header])
+        self.assertEqual([m.value for m in pooled.metric], [m.value for m in serial.metric])
+
+
+class TestAnalyzeTicker(unittest.TestCase):
+    """The per-ticker pipeline must run in a spawned worker process."""
+
+    def test_matches_in_process_result(self):
+        raw = pd.DataFrame({
+            "Date": pd.date_range("2024-01-01", periods=80, freq="D"),
+            "Close": 100 * np.exp(np.cumsum(np.random.default_rng(0).normal(0, 0.01, 80))),
+        })
+        params = dict(short_window=5, long_window=20, use_rsi_macd=True)
+        expected, price_col = analyze_ticker(raw, params, "Heuristic", "AAPL")
+        with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            df, col = pool.submit(analyze_ticker, raw, params, "Heuristic", "AAPL").result()
+
+        self.assertEqual(col, price_col)
+        pd.testing.assert_frame_equal(df, expected)
+        self.assertIn("pred_signal", df.columns)
+
+
+if __name__ == '__main__':
+    unittest.main()
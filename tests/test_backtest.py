@@ -0,0 +1,213 @@
+# tests/test_backtest.py
+"""
+Tests for the array-based backtest engine.
+"""
+import itertools
+import unittest
+import numpy as np
+import pandas as pd
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.backtest import (
+    run_backtest, extract_trades, HOLD, BUY, SELL, SL, TP, EXIT_NONE, EXIT_SIGNAL, EXIT_SL, EXIT_TP,
+)
+from src.pipeline import trade_ledger
+from src.strategy import apply_sma_crossover
+from src.signals import Signal, signal_labels
+
+
+class TestRunBacktest(unittest.TestCase):
+    """Test the SL/TP state machine on hand-made series."""
+
+    def test_signal_entries_and_exits(self):
+        prices = [100, 101, 102, 103, 104, 105]
+        signals = [BUY, BUY, HOLD, SELL, BUY, HOLD]
+        result = run_backtest(prices, signals)
+
+        # First bar is always flat
+        np.testing.assert_array_equal(result.position, [0, 1, 1, 0, 1, 1])
+        self.assertEqual(result.exit_reason[3], EXIT_SIGNAL)
+        self.assertTrue(np.isnan(result.equity_curve[0]))
+
+    def test_stop_loss_and_take_profit(self):
+        prices = [100, 100, 94, 94, 100, 111]
+        signals = [HOLD, BUY, HOLD, BUY, HOLD, HOLD]
+        result = run_backtest(prices, signals, stop_loss_pct=5.0, take_profit_pct=10.0, use_risk=True)
+
+        np.testing.assert_array_equal(result.position, [0, 1, 0, 1, 1, 0])
+        self.assertEqual(result.signal[2], SL)
+        self.assertEqual(result.exit_reason[2], EXIT_SL)
+        self.assertEqual(result.signal[5], TP)
+        self.assertEqual(result.exit_reason[5], EXIT_TP)
+
+    def test_risk_ignored_when_disabled(self):
+        prices = [100, 100, 80, 80]
+        signals = [HOLD, BUY, HOLD, HOLD]
+        result = run_backtest(prices, signals, stop_loss_pct=5.0, use_risk=False)
+        np.testing.assert_array_equal(result.position, [0, 1, 1, 1])
+
+    def test_trade_costs_applied_on_transitions(self):
+        prices = [100, 110, 121, 121]
+        signals = [HOLD, BUY, HOLD, SELL]
+        result = run_backtest(prices, signals, trade_cost_bps=100)
+        # entry bar is scaled by (1 - 1%), the carried bar is not
+        self.assertAlmostEqual(result.strategy_returns[1], 0.1 * 0.99)
+        self.assertAlmostEqual(result.strategy_returns[2], 0.1)
+        self.assertAlmostEqual(result.equity_curve[-1], (1 + 0.099) * 1.1)
+
+
+class TestTradeLedger(unittest.TestCase):
+    """Test round-trip extraction."""
+
+    def test_ledger_from_risk_backtest(self):
+        prices = [100, 100, 94, 94, 100, 111, 112, 113]
+        signals = [HOLD, BUY, HOLD, BUY, HOLD, HOLD, BUY, HOLD]
+        result = run_backtest(prices, signals, stop_loss_pct=5.0, take_profit_pct=10.0, use_risk=True)
+        trades = result.trades
+
+        self.assertEqual(len(trades), 3)
+        np.testing.assert_array_equal(trades.entry_index, [1, 3, 6])
+        np.testing.assert_array_equal(trades.exit_index, [2, 5, 7])
+        np.testing.assert_array_equal(trades.exit_reason, [EXIT_SL, EXIT_TP, EXIT_NONE])
+        np.testing.assert_array_equal(trades.bars, [1, 2, 2])
+        np.testing.assert_array_equal(trades.exit_price, [94, 111, 113])
+        # P&L compounds to the equity curve
+        self.assertAlmostEqual(np.prod(1 + trades.pnl), result.equity_curve[-1])
+
+    def test_rows_are_separate(self):
+        position = np.array([[0, 1, 1, 1], [1, 1, 0, 1]])
+        returns = np.array([[np.nan, 0.1, 0.1, -0.5], [np.nan, 0.2, 0.0, 0.1]])
+        trades = extract_trades(position, returns)
+        np.testing.assert_array_equal(trades.row, [0, 1, 1])
+        np.testing.assert_array_equal(trades.entry_index, [1, 0, 3])
+        np.testing.assert_array_equal(trades.exit_reason, [EXIT_NONE, EXIT_SIGNAL, EXIT_NONE])
+        np.testing.assert_allclose(trades.pnl, [1.1 * 1.1 * 0.5 - 1, 0.2, 0.1])
+        self.assertTrue(np.isnan(trades.entry_price).all())
+
+
+def reference_sma_crossover(df, short_window=10, long_window=30, use_rsi_macd=False, rsi_window=14,
+                            use_vol_filter=False, vol_window=20, max_vol_pct=None, trade_cost_bps=0,
+                            stop_loss_pct=None, take_profit_pct=None, use_risk=False):
+    """The original row-by-row `apply_sma_crossover`, kept as a reference."""
+    df = df.copy()
+    close = df["close"]
+    df["sma_short"] = close.rolling(short_window).mean()
+    df["sma_long"] = close.rolling(long_window).mean()
+    df["signal"] = "HOLD"
+    df.loc[df["sma_short"] > df["sma_long"], "signal"] = "BUY"
+    df.loc[df["sma_short"] < df["sma_long"], "signal"] = "SELL"
+
+    if use_rsi_macd:
+        delta = close.diff()
+        gain = delta.where(delta > 0, 0.0).rolling(rsi_window).mean()
+        loss = (-delta.where(delta < 0, 0.0)).rolling(rsi_window).mean()
+        rsi = 100 - (100 / (1 + gain / loss.replace(0, 1e-9)))
+        macd = close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+        macd_signal = macd.ewm(span=9, adjust=False).mean()
+        buy_mask = (df["signal"] == "BUY") & (rsi < 60) & (macd > macd_signal)
+        sell_mask = (df["signal"] == "SELL") & (rsi > 40) & (macd < macd_signal)
+        df["signal"] = "HOLD"
+        df.loc[buy_mask, "signal"] = "BUY"
+        df.loc[sell_mask, "signal"] = "SELL"
+
+    if use_vol_filter and max_vol_pct is not None:
+        vol = close.pct_change().rolling(vol_window).std()
+        df.loc[vol * 100 > max_vol_pct, "signal"] = "HOLD"
+
+    position = 0
+    entry_price = None
+    positions = [0]
+    for i in range(1, len(df)):
+        price_now = df.iloc[i]["close"]
+        sig = df.iloc[i]["signal"]
+        new_position = position
+        if sig == "BUY" and position == 0:
+            new_position = 1
+            entry_price = price_now
+        elif sig == "SELL" and position == 1:
+            new_position = 0
+            entry_price = None
+
+        if position == 1 and entry_price is not None and use_risk:
+            move_from_entry = (price_now / entry_price) - 1.0
+            if stop_loss_pct is not None and move_from_entry <= -stop_loss_pct / 100.0:
+                new_position = 0
+                entry_price = None
+                df.at[df.index[i], "signal"] = "SL"
+            elif take_profit_pct is not None and move_from_entry >= take_profit_pct / 100.0:
+                new_position = 0
+                entry_price = None
+                df.at[df.index[i], "signal"] = "TP"
+        positions.append(new_position)
+        position = new_position
+
+    df["position"] = positions
+    df["strategy_returns"] = close.pct_change() * df["position"]
+    df.loc[df["position"].diff() != 0, "strategy_returns"] *= 1 - trade_cost_bps / 10000
+    df["equity_curve"] = (1 + df["strategy_returns"]).cumprod()
+    return df
+
+
+class TestApplySmaCrossover(unittest.TestCase):
+    """Test that the strategy frame is consistent with the engine."""
+
+    def test_matches_row_by_row_reference(self):
+        rng = np.random.default_rng(3)
+        df = pd.DataFrame({"close": 100 * np.exp(np.cumsum(rng.normal(0, 0.02, 250)))})
+        for use_rsi_macd, use_vol_filter, use_risk, cost in itertools.product([False, True], [False, True],
+                                                                               [False, True], [0, 25]):
+            params = {
+                "short_window": 5, "long_window": 20, "use_rsi_macd": use_rsi_macd,
+                "use_vol_filter": use_vol_filter, "max_vol_pct": 2.0, "trade_cost_bps": cost,
+                "use_risk": use_risk, "stop_loss_pct": 3.0, "take_profit_pct": 6.0,
+            }
+            with self.subTest(**params):
+                out, _ = apply_sma_crossover(df, **params)
+                expected = reference_sma_crossover(df, **params)
+                self.assertEqual(signal_labels(out["signal"]).tolist(), expected["signal"].tolist())
+                np.testing.assert_array_equal(out["position"], expected["position"])
+                for col in ("strategy_returns", "equity_curve"):
+                    np.testing.assert_allclose(out[col], expected[col], rtol=1e-12, err_msg=col)
+
+    def test_equity_matches_strategy_returns(self):
+        rng = np.random.default_rng(7)
+        df = pd.DataFrame({"close": 100 * np.exp(np.cumsum(rng.normal(0, 0.02, 300)))})
+        out, price_col = apply_sma_crossover(
+            df, use_risk=True, stop_loss_pct=3.0, take_profit_pct=6.0, trade_cost_bps=10
+        )
+
+        self.assertEqual(price_col, "close")
+        expected = (1 + out["strategy_returns"]).cumprod()
+        np.testing.assert_allclose(out["equity_curve"].iloc[1:], expected.iloc[1:])
+        self.assertTrue(set(out["position"].unique()) <= {0, 1})
+        self.assertEqual(out["signal"].dtype, np.int8)
+
+    def test_frame_ledger_matches_engine(self):
+        prices = [100, 100, 94, 94, 100, 111, 112, 113]
+        signals = [HOLD, BUY, HOLD, BUY, HOLD, HOLD, BUY, HOLD]
+        result = run_backtest(prices, signals, stop_loss_pct=5.0, take_profit_pct=10.0, use_risk=True)
+        df = pd.DataFrame({
+            "date": pd.date_range("2024-01-01", periods=8), "close": prices, "signal": result.signal,
+            "position": result.position, "strategy_returns_net": result.strategy_returns,
+        })
+        ledger = trade_ledger(df, "close")
+        self.assertEqual(ledger["exit_reason"].tolist(), ["Stop-loss", "Take-profit", "Open"])
+        np.testing.assert_allclose(ledger["pnl"], result.trades.pnl)
+
+
+class TestSignals(unittest.TestCase):
+    """Test signal code to label mapping."""
+
+    def test_signal_labels(self):
+        codes = pd.Series([Signal.HOLD, Signal.BUY, Signal.SELL, Signal.SL, Signal.TP], dtype=np.int8)
+        labels = signal_labels(codes)
+        self.assertEqual(labels.tolist(), ["HOLD", "BUY", "SELL", "SL", "TP"])
+        self.assertEqual(labels.dtype, "category")
+        self.assertEqual(list(signal_labels(np.array([1, 2]))), ["BUY", "SELL"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -12,7 +12,7 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.metrics import compute_performance_stats
+from src.metrics import batch_performance_stats, compute_performance_stats
 from src.strategy import calculate_sma
 
 class TestMetrics(unittest.TestCase):
@@ -42,6 +42,60 @@ class TestMetrics(unittest.TestCase):
         self.assertIsInstance(stats['WinRate'], (int, float))
         self.assertTrue(0 <= stats['WinRate'] <= 1)
 
+class TestBatchMetrics(unittest.TestCase):
+    """Test the batched stats engine against per-frame pandas definitions."""
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.dates = pd.date_range('2023-01-01', periods=120, freq='D')
+        self.returns = rng.normal(0.0005, 0.01, (5, 120))
+        self.returns[:, 0] = np.nan
+        self.equity = np.nancumprod(1 + self.returns, axis=1)
+        self.position = rng.choice([0, 1], (5, 120)).astype(np.int8)
+
+    def test_matches_pandas_definitions(self):
+        stats = batch_performance_stats(self.returns, self.equity, self.position, self.dates)
+        for i in range(5):
+            ret = pd.Series(self.returns[i])
+            equity = pd.Series(self.equity[i])
+            daily = ret.dropna()
+            sharpe = (daily.mean() - 0.03 / 252) / (daily.std() + 1e-9) * np.sqrt(252)
+            self.assertAlmostEqual(stats['Sharpe'][i], sharpe)
+            self.assertAlmostEqual(stats['MaxDD'][i], (equity / equity.cummax() - 1).min())
+
+            # Round trips: runs of held bars, P&L compounded over each run
+            runs = (pd.Series(self.position[i]).diff() != 0).cumsum()[self.position[i] == 1]
+            pnl = (1 + ret.fillna(0)).groupby(runs).prod() - 1
+            self.assertEqual(stats['Trades'][i], len(pnl))
+            self.assertAlmostEqual(stats['WinRate'][i], (pnl > 0).mean())
+            self.assertAlmostEqual(stats['AvgHold'][i], runs.value_counts().mean())
+            self.assertAlmostEqual(stats['Exposure'][i], self.position[i].mean())
+            self.assertAlmostEqual(stats['CAGR'][i], equity.iloc[-1] ** (365 / 119) - 1)
+
+    def test_rows_match_single_frame_stats(self):
+        stats = batch_performance_stats(self.returns, self.equity, self.position, self.dates)
+        frame = pd.DataFrame({
+            'date': self.dates,
+            'equity_curve': self.equity[2],
+            'strategy_returns_net': self.returns[2],
+            'position': self.position[2],
+        })
+        single = compute_performance_stats(frame, None)
+        for key, value in single.items():
+            self.assertAlmostEqual(stats[key][2], value)
+
+    def test_float32_input(self):
+        stats64 = batch_performance_stats(self.returns, self.equity, self.position, self.dates)
+        stats32 = batch_performance_stats(self.returns.astype(np.float32), self.equity.astype(np.float32),
+                                          self.position, self.dates)
+        for key in stats64:
+            np.testing.assert_allclose(stats32[key], stats64[key], rtol=1e-3)
+
+    def test_no_dates_gives_nan_cagr(self):
+        stats = batch_performance_stats(self.returns, self.equity, self.position)
+        self.assertTrue(np.isnan(stats['CAGR']).all())
+        self.assertEqual(stats['Trades'].shape, (5,))
+
 class TestStrategy(unittest.TestCase):
     """Test trading strategy functions."""
     
@@ -0,0 +1,308 @@
+# tests/test_data_provider.py
+"""
+Tests for the data provider against a local stub of the chart endpoint.
+"""
+import json
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from urllib.parse import urlparse, parse_qs
+import pandas as pd
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import data_provider
+from src.chart_parser import parse_chart
+from src.price_cache import PriceCache
+from src.resilience import RetryPolicy, TokenBucket, CircuitBreaker
+
+DAY = 86_400
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "chart_daily.json")
+
+
+class StubChartServer:
+    """Serves daily bars in the Yahoo chart format, honouring period1/period2."""
+
+    def __init__(self, n_bars=200, missing=(), step=DAY):
+        end = int(time.time()) // step * step
+        self.timestamps = [end - (n_bars - 1 - i) * step for i in range(n_bars)]
+        self.requests = []
+        self.missing = set(missing)
+        self.fail_from = None  # period1 from which requests get a 404
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                stub.requests.append(query)
+                failing = stub.fail_from is not None and int(query.get("period1", 0)) >= stub.fail_from
+                if url.path.rsplit("/", 1)[-1] in stub.missing or failing:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                body = json.dumps(stub.chart(query)).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/chart/{{}}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def chart(self, query):
+        lo = int(query.get("period1", 0))
+        hi = int(query.get("period2", 2**40))
+        ts = [t for t in self.timestamps if lo <= t <= hi]
+        closes = [100.0 + (t - self.timestamps[0]) / DAY for t in ts]
+        return {"chart": {"result": [{
+            "timestamp": ts,
+            "indicators": {"quote": [{
+                "open": closes, "high": closes, "low": closes, "close": closes,
+                "volume": [1000] * len(ts),
+            }]},
+        }]}}
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TestPriceCache(unittest.TestCase):
+    """Test the on-disk cache and incremental refresh."""
+
+    def setUp(self):
+        self.stub = StubChartServer()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = PriceCache(self.tmp.name, ttl_seconds=3600)
+        self.patches = [
+            patch.object(data_provider, "BASE_URL", self.stub.url),
+            patch.object(data_provider, "price_cache", self.cache),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        self.stub.close()
+        self.tmp.cleanup()
+
+    def test_fresh_cache_skips_download(self):
+        first = data_provider.get_price_history("AAPL", "1y", use_cache=True)
+        second = data_provider.get_price_history("AAPL", "1y", use_cache=True)
+
+        self.assertEqual(len(self.stub.requests), 1)
+        self.assertEqual(len(first), 200)
+        self.assertTrue(first.equals(second))
+
+    def test_narrower_period_served_from_cache(self):
+        data_provider.get_price_history("AAPL", "1y", use_cache=True)
+        df = data_provider.get_price_history("AAPL", "3mo", use_cache=True)
+
+        self.assertEqual(len(self.stub.requests), 1)
+        self.assertLess(len(df), 200)
+        self.assertGreater(len(df), 80)
+
+    def test_stale_cache_fetches_only_new_bars(self):
+        # Seed the cache with all but the last 5 bars
+        self.stub.timestamps, extra = self.stub.timestamps[:-5], self.stub.timestamps[-5:]
+        data_provider.get_price_history("AAPL", "1y", use_cache=True)
+        last_cached = self.stub.timestamps[-1]
+
+        self.stub.timestamps += extra
+        self.cache.ttl_seconds = 0
+        df = data_provider.get_price_history("AAPL", "1y", use_cache=True)
+
+        self.assertEqual(len(self.stub.requests), 2)
+        self.assertEqual(int(self.stub.requests[-1]["period1"]), last_cached)
+        self.assertEqual(len(df), 200)
+        self.assertTrue(df["date"].is_monotonic_increasing)
+        self.assertFalse(df["date"].duplicated().any())
+
+    def test_cache_disabled(self):
+        data_provider.get_price_history("AAPL", "1y", use_cache=False)
+        data_provider.get_price_history("AAPL", "1y", use_cache=False)
+        self.assertEqual(len(self.stub.requests), 2)
+
+
+class TestBatchFetch(unittest.TestCase):
+    """Test concurrent multi-ticker fetching."""
+
+    def setUp(self):
+        self.stub = StubChartServer(missing={"BAD"})
+        self.patch = patch.object(data_provider, "BASE_URL", self.stub.url)
+        self.patch.start()
+        data_provider.circuit_breaker.reset()
+
+    def tearDown(self):
+        self.patch.stop()
+        self.stub.close()
+
+    def test_frames_and_errors(self):
+        tickers = ["AAPL", "MSFT", "BAD", "AAPL"]
+        frames, errors = data_provider.get_price_histories(tickers, "1y", use_cache=False)
+
+        self.assertEqual(sorted(frames), ["AAPL", "MSFT"])
+        self.assertEqual(list(errors), ["BAD"])
+        self.assertEqual(len(frames["MSFT"]), 200)
+        # Duplicates are fetched once and a 404 is not retried
+        self.assertEqual(len(self.stub.requests), 3)
+
+    def test_circuit_opens_for_failing_ticker(self):
+        threshold = data_provider.circuit_breaker.failure_threshold
+        for _ in range(threshold + 2):
+            data_provider.get_price_history("BAD", "1y", use_cache=False)
+
+        self.assertEqual(len(self.stub.requests), threshold)
+        stats = data_provider.circuit_breaker.stats()["BAD"]
+        self.assertEqual(stats["state"], CircuitBreaker.OPEN)
+        self.assertEqual(stats["rejected"], 2)
+        # The host itself stays healthy
+        self.assertFalse(data_provider.get_price_history("AAPL", "1y", use_cache=False).empty)
+
+
+class TestRanges(unittest.TestCase):
+    """Test intervals, explicit ranges and chunked downloads."""
+
+    def setUp(self):
+        # 20 days of hourly-spaced bars, requested as "1m" to force 7-day chunks
+        self.stub = StubChartServer(n_bars=20 * 24, step=3600)
+        self.patch = patch.object(data_provider, "BASE_URL", self.stub.url)
+        self.patch.start()
+        data_provider.circuit_breaker.reset()
+
+    def tearDown(self):
+        self.patch.stop()
+        self.stub.close()
+
+    def test_long_intraday_range_is_chunked(self):
+        df = data_provider.get_price_history("AAPL", "1mo", interval="1m", use_cache=False)
+
+        # 30-day lookback limit split into 7-day chunks
+        self.assertEqual(len(self.stub.requests), 5)
+        self.assertTrue(all(r["interval"] == "1m" for r in self.stub.requests))
+        spans = [int(r["period2"]) - int(r["period1"]) for r in self.stub.requests]
+        self.assertLessEqual(max(spans), 7 * DAY)
+        self.assertEqual(len(df), len(self.stub.timestamps))
+        self.assertTrue(df["date"].is_monotonic_increasing)
+        self.assertFalse(df["date"].duplicated().any())
+
+    def test_empty_chunks_are_not_failures(self):
+        # The first chunks predate the stub's bars and come back empty
+        data_provider.get_price_history("AAPL", "1mo", interval="1m", use_cache=False)
+        stats = data_provider.circuit_breaker.stats()["AAPL"]
+        self.assertEqual(stats["failures"], 0)
+        self.assertEqual(stats["state"], CircuitBreaker.CLOSED)
+
+    def test_failed_chunk_is_not_cached(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cache = PriceCache(tmp.name, ttl_seconds=3600)
+        self.stub.fail_from = self.stub.timestamps[-3 * 24]  # only the last chunk
+        with patch.object(data_provider, "price_cache", cache):
+            df = data_provider.get_price_history("AAPL", "1mo", interval="1m", use_cache=True)
+            self.assertFalse(df.empty)
+            self.assertLess(len(df), len(self.stub.timestamps))
+            self.assertEqual(cache.load("AAPL", "1m"), (None, None))
+
+            self.stub.fail_from = None
+            df = data_provider.get_price_history("AAPL", "1mo", interval="1m", use_cache=True)
+            self.assertEqual(len(df), len(self.stub.timestamps))
+            self.assertIsNotNone(cache.load("AAPL", "1m")[0])
+
+    def test_explicit_start_end(self):
+        start = pd.Timestamp(self.stub.timestamps[24], unit="s")
+        end = pd.Timestamp(self.stub.timestamps[47], unit="s")
+        df = data_provider.get_price_history("AAPL", interval="1h", start=start, end=end, use_cache=False)
+
+        self.assertEqual(len(self.stub.requests), 1)
+        self.assertEqual(len(df), 24)
+        self.assertEqual(df["date"].iloc[0], start)
+        self.assertEqual(df["date"].iloc[-1], end)
+
+    def test_invalid_interval_and_period(self):
+        with self.assertRaises(ValueError):
+            data_provider.get_price_history("AAPL", interval="7m")
+        with self.assertRaises(ValueError):
+            data_provider.get_price_history("AAPL", period="3 months")
+
+
+class TestChartParser(unittest.TestCase):
+    """Test decoding chart payloads into typed frames."""
+
+    def setUp(self):
+        with open(FIXTURE) as fh:
+            self.data = json.load(fh)
+
+    def test_fixture_matches_list_based_frame(self):
+        res = self.data["chart"]["result"][0]
+        quote = res["indicators"]["quote"][0]
+        expected = pd.DataFrame({"date": pd.to_datetime(res["timestamp"], unit="s"), **quote}).dropna()
+
+        df = parse_chart(self.data)
+
+        self.assertEqual(len(df), len(expected))
+        self.assertEqual(df["volume"].dtype, "int64")
+        self.assertEqual(df["close"].dtype, "float64")
+        self.assertTrue((df["date"].to_numpy() == expected["date"].to_numpy()).all())
+        self.assertTrue((df["close"].to_numpy() == expected["close"].to_numpy()).all())
+
+    def test_unsorted_timestamps(self):
+        res = self.data["chart"]["result"][0]
+        res["timestamp"] = res["timestamp"][::-1]
+        quote = res["indicators"]["quote"][0]
+        res["indicators"]["quote"][0] = {k: v[::-1] for k, v in quote.items()}
+
+        df = parse_chart(self.data)
+        self.assertTrue(df["date"].is_monotonic_increasing)
+        self.assertFalse(df.isna().any().any())
+
+    def test_empty_payloads(self):
+        self.assertIsNone(parse_chart({"chart": {"result": None}}))
+        self.assertIsNone(parse_chart({"chart": {"result": [{"timestamp": []}]}}))
+
+
+class TestResilience(unittest.TestCase):
+    """Test retry policy, rate limiter and circuit breaker primitives."""
+
+    def test_backoff_is_bounded_and_jittered(self):
+        policy = RetryPolicy(base_delay=0.5, max_delay=2.0, jitter=0.5)
+        for attempt in range(1, 8):
+            delay = policy.delay(attempt)
+            ceiling = min(2.0, 0.5 * 2 ** (attempt - 1))
+            self.assertTrue(ceiling * 0.5 <= delay <= ceiling)
+        self.assertFalse(policy.is_retryable(404))
+        self.assertTrue(policy.is_retryable(503))
+
+    def test_token_bucket(self):
+        bucket = TokenBucket(rate=1000, capacity=2)
+        self.assertEqual(bucket.try_acquire(), 0.0)
+        self.assertEqual(bucket.try_acquire(), 0.0)
+        self.assertGreater(bucket.try_acquire(), 0.0)
+        self.assertTrue(bucket.acquire(timeout=1))
+        self.assertFalse(TokenBucket(rate=0.001, capacity=0).acquire(timeout=0.01))
+
+    def test_breaker_half_open_recovery(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.0)
+        breaker.record_failure("x")
+        self.assertEqual(breaker.state("x"), CircuitBreaker.CLOSED)
+        breaker.record_failure("x")
+        self.assertEqual(breaker.state("x"), CircuitBreaker.OPEN)
+        self.assertTrue(breaker.allow("x"))
+        self.assertEqual(breaker.state("x"), CircuitBreaker.HALF_OPEN)
+        breaker.record_success("x")
+        self.assertEqual(breaker.state("x"), CircuitBreaker.CLOSED)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+# tests/test_engine.py
+"""
+Tests for the headless engine and its CLI.
+"""
+import io
+import json
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import engine
+from src.pipeline import analyze_ticker
+from tests.helpers import make_frames
+
+PARAMS = {"short_window": 5, "long_window": 20, "trade_cost_bps": 10}
+
+
+class TestEngine(unittest.TestCase):
+    """Run the engine on canned price frames instead of the network."""
+
+    def setUp(self):
+        self.frames = make_frames(3)
+        fetch = patch("src.engine.get_price_histories", return_value=(self.frames, {"ZZZ": "No data returned"}))
+        fetch.start()
+        self.addCleanup(fetch.stop)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_run_matches_per_ticker_pipeline(self):
+        result = engine.run(["T0", "T1", "T2", "ZZZ"], PARAMS, ai_model="Heuristic", processes=1)
+        self.assertEqual(list(result.summary.index), ["T0", "T1", "T2"])
+        self.assertEqual(result.errors, {"ZZZ": "No data returned"})
+
+        df, price_col = analyze_ticker(self.frames["T1"], PARAMS, "Heuristic", "T1")
+        expected = engine.ticker_summary(df, price_col)
+        for key, value in expected.items():
+            self.assertAlmostEqual(result.summary.loc["T1", key], value, msg=key)
+        self.assertIn("pred_signal", result.frames["T1"][0])
+
+        # Portfolio over the three analyzed tickers
+        self.assertEqual(result.portfolio.panel.tickers, ["T0", "T1", "T2"])
+        self.assertAlmostEqual(result.portfolio.total_return,
+                               result.portfolio.result.equity[-1] / result.portfolio.capital - 1)
+
+    def test_process_pool_matches_in_process(self):
+        serial = engine.run(["T0", "T1", "T2"], PARAMS, processes=1)
+        parallel = engine.run(["T0", "T1", "T2"], PARAMS, processes=2)
+        pd.testing.assert_frame_equal(serial.summary, parallel.summary)
+        np.testing.assert_allclose(serial.portfolio.result.equity, parallel.portfolio.result.equity)
+
+    def test_analysis_errors_reported_per_ticker(self):
+        frames = dict(self.frames)
+        frames["BAD"] = pd.DataFrame({"Date": pd.date_range("2024-01-01", periods=30), "Close": ["x"] * 30})
+        for processes in (1, 2):
+            with self.subTest(processes=processes):
+                results = {t: (r, e) for t, r, e in engine.analyze_frames(frames, PARAMS, processes=processes)}
+                self.assertIsNone(results["BAD"][0])
+                self.assertIn("could not convert", results["BAD"][1])
+                self.assertTrue(all(results[t][1] is None for t in self.frames))
+
+    def test_write_formats(self):
+        result = engine.run(["T0", "T1", "T2", "ZZZ"], PARAMS, processes=1)
+        for fmt in engine.OUTPUT_FORMATS:
+            with self.subTest(fmt=fmt):
+                paths = result.write(os.path.join(self.tmp.name, fmt), fmt)
+                self.assertEqual(sorted(os.path.basename(p) for p in paths),
+                                 [f"{n}.{fmt}" for n in ("bars", "portfolio", "summary", "trades")])
+
+        bars = pd.read_parquet(os.path.join(self.tmp.name, "parquet", "bars.parquet"))
+        self.assertEqual(len(bars), sum(len(df) for df, _ in result.frames.values()))
+        with open(os.path.join(self.tmp.name, "json", "summary.json")) as f:
+            summary = json.load(f)
+        self.assertEqual(summary[-1]["ticker"], "ZZZ")
+        self.assertEqual(summary[-1]["error"], "No data returned")
+        with self.assertRaises(ValueError):
+            result.write(self.tmp.name, "xlsx")
+
+    def test_cli(self):
+        out_dir = os.path.join(self.tmp.name, "out")
+        with redirect_stdout(io.StringIO()) as stdout:
+            code = engine.main(["T0", "T1", "--short", "5", "--long", "20", "--processes", "1",
+                                "--out", out_dir, "--format", "csv"])
+        self.assertEqual(code, 0)
+        self.assertIn("Portfolio return", stdout.getvalue())
+        summary = pd.read_csv(os.path.join(out_dir, "summary.csv"))
+        self.assertEqual(summary["ticker"].tolist(), ["T0", "T1", "ZZZ"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+# tests/test_indicators.py
+"""
+Tests for the shared indicator cache.
+"""
+import unittest
+import numpy as np
+import pandas as pd
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.indicators import IndicatorCache, indicator_cache, fingerprint, sma
+from src.strategy import compute_macd, _compute_rsi
+
+
+class TestIndicatorCache(unittest.TestCase):
+    """Test memoization, index handling and eviction."""
+
+    def setUp(self):
+        indicator_cache.clear()
+        self.series = pd.Series(np.linspace(100, 120, 50), name="close")
+
+    def test_hit_returns_same_values_on_callers_index(self):
+        first = sma(self.series, 5)
+        misses = indicator_cache.misses
+
+        shifted = self.series.copy()
+        shifted.index = shifted.index + 1000
+        second = sma(shifted, 5)
+
+        self.assertEqual(indicator_cache.misses, misses)
+        np.testing.assert_array_equal(first.to_numpy(), second.to_numpy())
+        self.assertTrue(second.index.equals(shifted.index))
+        pd.testing.assert_series_equal(first, self.series.rolling(5).mean())
+
+    def test_params_and_values_are_part_of_key(self):
+        sma(self.series, 5)
+        sma(self.series, window=5)
+        sma(self.series, 6)
+        sma(self.series * 2, 5)
+        stats = indicator_cache.stats()
+        self.assertGreaterEqual(stats["hits"], 1)
+        self.assertEqual(stats["entries"], 3)
+        self.assertNotEqual(fingerprint(self.series), fingerprint(self.series * 2))
+
+    def test_tuple_results(self):
+        macd, signal, hist = compute_macd(self.series)
+        cached = compute_macd(self.series)
+        for a, b in zip((macd, signal, hist), cached):
+            pd.testing.assert_series_equal(a, b)
+        pd.testing.assert_series_equal(_compute_rsi(self.series, 7), _compute_rsi.uncached(self.series, 7))
+
+    def test_lru_eviction_under_memory_cap(self):
+        cache = IndicatorCache(max_bytes=3 * 800)
+        arrays = [np.zeros(100) for _ in range(4)]
+        for i, a in enumerate(arrays):
+            cache.put(("k", i), (a,), (None,))
+        self.assertIsNone(cache.get(("k", 0)))
+        self.assertIsNotNone(cache.get(("k", 3)))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,220 @@
+# tests/test_model_transformer.py
+"""
+Tests for the transformer model and its registry.
+"""
+import tempfile
+import unittest
+from dataclasses import replace
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+import torch
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import model_export, model_transformer
+from src.model_export import eager_predictor, export_model, load_predictor
+from src.config import ModelConfig
+from src.model_registry import ModelRegistry, config_fingerprint
+
+
+class TestModelRegistry(unittest.TestCase):
+    """Test train-once / reuse behaviour of the model registry."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.registry = ModelRegistry(self.tmp.name, max_age_seconds=3600)
+        self.config = ModelConfig(training_epochs=2)
+        rng = np.random.default_rng(0)
+        self.df = pd.DataFrame({
+            "date": pd.date_range("2023-01-01", periods=120, freq="D"),
+            "close": 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 120))),
+        })
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def predict(self, config=None):
+        return model_transformer.add_transformer_prediction(
+            self.df, "close", ticker="AAPL", config=config or self.config, registry=self.registry
+        )
+
+    def test_trains_once_and_reuses(self):
+        with patch.object(model_transformer, "train_model", wraps=model_transformer.train_model) as train:
+            first = self.predict()
+            second = self.predict()
+            # A fresh registry instance has to go through disk
+            self.registry = ModelRegistry(self.tmp.name, max_age_seconds=3600)
+            third = self.predict()
+
+        self.assertEqual(train.call_count, 1)
+        self.assertAlmostEqual(first["tf_prob"].iloc[-1], second["tf_prob"].iloc[-1], places=6)
+        self.assertAlmostEqual(first["tf_prob"].iloc[-1], third["tf_prob"].iloc[-1], places=6)
+
+    def test_retrains_on_config_change_or_expiry(self):
+        with patch.object(model_transformer, "train_model", wraps=model_transformer.train_model) as train:
+            self.predict()
+            self.predict(replace(self.config, learning_rate=0.001))
+            self.registry.max_age_seconds = 0
+            self.predict()
+
+        self.assertEqual(train.call_count, 3)
+
+    def test_config_fingerprint_ignores_runtime_fields(self):
+        self.assertEqual(
+            config_fingerprint(self.config),
+            config_fingerprint(replace(self.config, registry_dir="/elsewhere", model_max_age_hours=1, torch_threads=2)),
+        )
+        self.assertNotEqual(config_fingerprint(self.config), config_fingerprint(replace(self.config, training_epochs=3)))
+
+
+class TestTraining(unittest.TestCase):
+    """Test window construction and the mini-batch trainer."""
+
+    def test_make_windows_matches_loop(self):
+        returns = np.random.default_rng(1).normal(0, 0.01, 50)
+        X, y = model_transformer.make_windows(returns, 30)
+        n = len(returns) - 30 - 1
+        expected_X = np.array([returns[i:i + 30] for i in range(n)], dtype=np.float32)
+        expected_y = np.array([returns[i + 30] for i in range(n)], dtype=np.float32)
+        np.testing.assert_array_equal(X.numpy(), expected_X)
+        np.testing.assert_array_equal(y.numpy(), expected_y)
+
+        X, y = model_transformer.make_windows(returns[:31], 30)
+        self.assertEqual(tuple(X.shape), (0, 30))
+
+    def test_early_stopping_limits_epochs(self):
+        returns = np.random.default_rng(2).normal(0, 0.01, 200)
+        config = ModelConfig(training_epochs=50, early_stopping_patience=1, learning_rate=0.05)
+        with patch.object(model_transformer, "_evaluate", return_value=1.0) as evaluate:
+            model = model_transformer.train_model(returns, config)
+        # First epoch sets the best loss, the second fails to improve and stops
+        self.assertEqual(evaluate.call_count, 2)
+        self.assertFalse(model.training)
+
+
+class TestBatchedTickers(unittest.TestCase):
+    """Test the shared multi-ticker model and batched per-bar inference."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.registry = ModelRegistry(self.tmp.name, max_age_seconds=3600)
+        self.config = ModelConfig(training_epochs=2, inference_batch_size=50)
+        rng = np.random.default_rng(3)
+        self.frames = {
+            ticker: pd.DataFrame({"close": 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))})
+            for ticker, n in [("AAPL", 120), ("MSFT", 95), ("TINY", 20)]
+        }
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_per_bar_predictions_match_single_windows(self):
+        returns = {t: model_transformer.price_returns(df["close"]) for t, df in self.frames.items()}
+        model = model_transformer.train_shared_model(returns, self.config, use_ticker_embedding=True)
+        preds = model_transformer.predict_per_bar(model, returns, self.config)
+
+        seq_len = self.config.transformer_seq_len
+        self.assertEqual(len(preds["MSFT"]), 95)
+        self.assertTrue(np.isnan(preds["MSFT"][:seq_len - 1]).all())
+        self.assertTrue(np.isnan(preds["TINY"]).all())
+        with torch.no_grad():
+            window = torch.tensor(returns["MSFT"][-seq_len:], dtype=torch.float32).reshape(1, seq_len, 1)
+            expected = model(window, torch.tensor([1])).item()
+        self.assertAlmostEqual(preds["MSFT"][-1], expected, places=5)
+
+    def test_frames_scored_with_one_cached_model(self):
+        with patch.object(model_transformer, "train_shared_model",
+                          wraps=model_transformer.train_shared_model) as train:
+            first = model_transformer.add_transformer_predictions(self.frames, "close", self.config, self.registry)
+            second = model_transformer.add_transformer_predictions(self.frames, "close", self.config, self.registry)
+
+        self.assertEqual(train.call_count, 1)
+        aapl = first["AAPL"]
+        self.assertEqual(aapl["tf_signal"].dtype, np.int8)
+        self.assertGreater(aapl["tf_prob"].nunique(), 1)
+        self.assertTrue((first["TINY"]["tf_prob"] == 0.5).all())
+        np.testing.assert_allclose(aapl["tf_prob"], second["AAPL"]["tf_prob"], rtol=1e-6)
+
+
+class TestExport(unittest.TestCase):
+    """Test exported inference artifacts against eager mode."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.model = model_transformer.build_model(ModelConfig()).eval()
+        self.x = np.random.default_rng(5).normal(0, 0.01, (16, 30, 1)).astype(np.float32)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_torchscript_matches_eager(self):
+        expected = eager_predictor(self.model)(self.x)
+        path = export_model(self.model, os.path.join(self.tmp.name, "m.ts"), seq_len=30)
+        np.testing.assert_allclose(load_predictor(path)(self.x), expected, rtol=1e-5, atol=1e-6)
+
+        quantized = export_model(self.model, os.path.join(self.tmp.name, "m.int8.ts"), seq_len=30, quantize=True)
+        np.testing.assert_allclose(load_predictor(quantized)(self.x), expected, atol=0.1)
+
+    def test_reexport_replaces_cached_predictor(self):
+        path = export_model(self.model, os.path.join(self.tmp.name, "m.ts"), seq_len=30)
+        first = load_predictor(path)
+        self.assertIs(load_predictor(path), first)
+
+        os.utime(path, (0, os.path.getmtime(path) + 10))
+        second = load_predictor(path)
+        self.assertIsNot(second, first)
+        self.assertIs(model_export._loaded[path][1], second)
+
+    def test_predictor_prefers_exported_artifact(self):
+        registry = ModelRegistry(self.tmp.name, max_age_seconds=3600)
+        config = ModelConfig(training_epochs=1)
+        returns = np.random.default_rng(6).normal(0, 0.01, 120)
+        model_transformer.get_predictor("AAPL", returns, "2024-01-01", config, registry)
+        path = registry.artifact_path("AAPL", config, ".ts")
+        self.assertTrue(os.path.exists(path))
+
+        with patch.object(model_transformer, "export_model") as export:
+            model_transformer.get_predictor("AAPL", returns, "2024-01-01", config, registry)
+        export.assert_not_called()
+
+
+class TestWalkForward(unittest.TestCase):
+    """Test out-of-sample walk-forward predictions."""
+
+    def setUp(self):
+        self.config = ModelConfig(training_epochs=2, finetune_epochs=1)
+        self.returns = np.random.default_rng(4).normal(0, 0.01, 200)
+
+    def predict(self, returns, processes=1):
+        return model_transformer.walk_forward_predictions(
+            returns, step=40, min_train_bars=90, config=self.config, processes=processes
+        )
+
+    def test_predictions_do_not_see_future_bars(self):
+        shocked = self.returns.copy()
+        shocked[150:] += 0.05
+        for processes in (1, 2):
+            with self.subTest(processes=processes):
+                pred = self.predict(self.returns, processes)
+                self.assertEqual(pred.shape, self.returns.shape)
+                self.assertTrue(np.isnan(pred[:90]).all())
+                self.assertFalse(np.isnan(pred[90:]).any())
+
+                shocked_pred = self.predict(shocked, processes)
+                np.testing.assert_allclose(shocked_pred[:150], pred[:150])
+                self.assertFalse(np.allclose(shocked_pred[170:], pred[170:]))
+
+    def test_folds_warm_start_from_previous_weights(self):
+        with patch.object(model_transformer, "train_model", wraps=model_transformer.train_model) as train:
+            self.predict(self.returns)
+        # Folds start at bars 90, 130 and 170
+        self.assertEqual(train.call_count, 3)
+        epochs = [call.args[1].training_epochs for call in train.call_args_list]
+        self.assertEqual(epochs, [2, 1, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+# tests/test_panel.py
+"""
+Tests for date × ticker panels and portfolio aggregation.
+"""
+import unittest
+from functools import reduce
+import numpy as np
+import pandas as pd
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.panel import build_panel, equal_weight_portfolio, ffill
+
+
+class TestPanel(unittest.TestCase):
+    """Test alignment, forward fill and reductions."""
+
+    def setUp(self):
+        dates = pd.date_range("2024-01-01", periods=6, freq="D")
+        self.frames = {
+            "AAA": pd.DataFrame({"date": dates[:4], "close": [1.0, 2, 3, 4], "equity_curve": [np.nan, 1.0, 1.1, 1.2],
+                                 "bh_equity": [1.0, 2, 3, 4]}),
+            "BBB": pd.DataFrame({"date": dates[[1, 3, 5]], "adj_close": [10.0, 11, 12], "equity_curve": [np.nan, 0.9, 1.3],
+                                 "bh_equity": [1.0, 1.1, 1.2]}),
+        }
+
+    def test_alignment_and_ffill(self):
+        panel = build_panel(self.frames, {"close": {"AAA": "close", "BBB": "adj_close"}})
+        self.assertEqual(panel.shape, (5, 2))  # day 4 has no bars
+        np.testing.assert_array_equal(panel["close"][:, 0], [1, 2, 3, 4, 4])
+        np.testing.assert_array_equal(panel["close"][:, 1], [np.nan, 10, 10, 11, 12])
+
+        raw = build_panel(self.frames, {"close": {"AAA": "close", "BBB": "adj_close"}}, fill=False)
+        self.assertTrue(np.isnan(raw["close"][2, 1]))
+        np.testing.assert_array_equal(ffill(raw["close"]), panel["close"])
+        np.testing.assert_array_equal(panel.last_valid("close"), [4, 12])
+
+    def test_equal_weight_matches_merged_frames(self):
+        panel = build_panel(self.frames, {"equity": "equity_curve", "bh_equity": "bh_equity"})
+        ticker_equity, total, total_bh = equal_weight_portfolio(panel, 1000)
+
+        merged = reduce(
+            lambda left, right: pd.merge(left, right, on="date", how="outer"),
+            [df[["date", "equity_curve", "bh_equity"]].add_prefix(f"{t}_").rename(columns={f"{t}_date": "date"})
+             for t, df in self.frames.items()],
+        ).sort_values("date").ffill()
+        expected_total = 500 * merged[["AAA_equity_curve", "BBB_equity_curve"]].fillna(1.0).sum(axis=1)
+        np.testing.assert_allclose(total, expected_total)
+        self.assertAlmostEqual(total_bh[-1], 500 * 4 + 500 * 1.2)
+        # Before its first bar a ticker's slice is cash
+        self.assertEqual(ticker_equity[0, 1], 500)
+
+
+if __name__ == '__main__':
+    unittest.main()
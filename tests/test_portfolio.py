@@ -0,0 +1,72 @@
+# tests/test_portfolio.py
+"""
+Tests for the multi-asset portfolio backtester.
+"""
+import unittest
+import numpy as np
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.portfolio import backtest_portfolio
+
+
+class TestPortfolioBacktest(unittest.TestCase):
+    """Test sizing, costs, cash limits and rebalancing."""
+
+    def setUp(self):
+        self.close = np.array([
+            [100.0, 50.0],
+            [110.0, 50.0],
+            [121.0, 55.0],
+            [121.0, 60.0],
+        ])
+
+    def test_fully_invested_single_name_tracks_price(self):
+        result = backtest_portfolio(self.close[:, :1], np.ones((4, 1)), capital=1000, max_position_size=1.0,
+                                    trade_cost_bps=0)
+        np.testing.assert_allclose(result.equity, 1000 * self.close[:, 0] / 100)
+
+    def test_position_cap_leaves_cash(self):
+        result = backtest_portfolio(self.close, np.ones((4, 2)), capital=1000, max_position_size=0.1,
+                                    trade_cost_bps=0)
+        np.testing.assert_allclose(result.weights[0], [0.1, 0.1])
+        np.testing.assert_allclose(result.cash, 800)
+
+    def test_costs_charged_on_traded_notional(self):
+        position = np.array([[1.0], [1.0], [0.0], [0.0]])
+        result = backtest_portfolio(self.close[:, :1], position, capital=1000, max_position_size=1.0,
+                                    trade_cost_bps=10)
+        bought = 1000 / (1 + 0.001)  # buys are scaled so cash covers the fee
+        sold = bought * 1.21
+        np.testing.assert_allclose(result.traded[[0, 2]], [bought, sold])
+        np.testing.assert_allclose(result.costs.sum(), 0.001 * (bought + sold))
+        np.testing.assert_allclose(result.equity[-1], sold * (1 - 0.001))
+        self.assertGreaterEqual(result.cash.min(), -1e-9)
+
+    def test_rebalancing_restores_target_weights(self):
+        position = np.ones((4, 2))
+        drift = backtest_portfolio(self.close, position, capital=1000, max_position_size=0.5, trade_cost_bps=0)
+        periodic = backtest_portfolio(self.close, position, capital=1000, max_position_size=0.5, trade_cost_bps=0,
+                                      rebalance="periodic", rebalance_every=2)
+        threshold = backtest_portfolio(self.close, position, capital=1000, max_position_size=0.5, trade_cost_bps=0,
+                                       rebalance="threshold", threshold=0.02)
+
+        self.assertGreater(abs(drift.weights[2, 0] - 0.5), 0.02)
+        np.testing.assert_allclose(periodic.weights[2], [0.5, 0.5])
+        self.assertTrue((np.abs(threshold.weights - 0.5) <= 0.02 + 1e-12).all())
+        self.assertEqual(drift.traded[1:].sum(), 0)
+
+    def test_nan_prices_are_not_traded(self):
+        close = self.close.copy()
+        close[:2, 1] = np.nan
+        result = backtest_portfolio(close, np.ones((4, 2)), capital=1000, max_position_size=0.5, trade_cost_bps=0)
+        self.assertEqual(result.holdings[1, 1], 0)
+        self.assertGreater(result.holdings[2, 1], 0)
+        with self.assertRaises(ValueError):
+            backtest_portfolio(close, np.ones((4, 2)), rebalance="weekly")
+
+
+if __name__ == '__main__':
+    unittest.main()
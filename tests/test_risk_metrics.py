@@ -0,0 +1,67 @@
+# tests/test_risk_metrics.py
+"""
+Tests for the rolling and streaming risk metrics.
+"""
+import unittest
+import numpy as np
+import pandas as pd
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.risk_metrics import StreamingRiskMetrics, rolling_risk_metrics
+
+
+class TestRiskMetrics(unittest.TestCase):
+    """Compare streaming, vectorized and pandas versions."""
+
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        self.returns = rng.normal(0.0005, 0.01, 500)
+        self.returns[0] = np.nan
+        self.returns[rng.random(500) < 0.3] = 0.0  # flat bars
+        self.returns[100:103] = np.nan
+
+    def test_streaming_matches_vectorized(self):
+        for window in (1, 2, 20):
+            with self.subTest(window=window):
+                stream = StreamingRiskMetrics(window).run(self.returns)
+                batch = rolling_risk_metrics(self.returns, window)
+                for key, values in batch.items():
+                    np.testing.assert_allclose(stream[key].to_numpy(dtype=float), values,
+                                               rtol=1e-7, atol=1e-12, err_msg=key)
+
+    def test_matches_pandas_rolling(self):
+        window = 20
+        batch = rolling_risk_metrics(self.returns, window)
+        returns = pd.Series(self.returns)
+        vol = returns.rolling(window, min_periods=2).std()
+        vol[:window - 1] = np.nan
+        np.testing.assert_allclose(batch["volatility"], vol, rtol=1e-9)
+
+        equity = pd.Series(batch["equity"])
+        max_dd = [(equity[t - window + 1:t + 1] / equity[t - window + 1:t + 1].cummax() - 1).min()
+                  for t in range(window - 1, len(equity))]
+        np.testing.assert_allclose(batch["max_drawdown"][window - 1:], max_dd, atol=1e-12)
+        np.testing.assert_allclose(batch["drawdown"], equity / equity.cummax() - 1, atol=1e-12)
+
+    def test_flat_window_and_drawdown_duration(self):
+        returns = [0.1, -0.1, 0.0, 0.0, 0.2]
+        stream = StreamingRiskMetrics(window=2).run(returns)
+        self.assertEqual(stream["volatility"][3], 0.0)
+        self.assertTrue(np.isnan(stream["sharpe"][3]))
+        self.assertTrue(np.isnan(stream["hit_rate"][3]))
+        self.assertEqual(stream["drawdown_duration"].tolist(), [0, 1, 2, 3, 0])
+        self.assertAlmostEqual(stream["max_drawdown"][1], -0.1)
+
+    def test_batch_of_series(self):
+        returns = np.stack([self.returns, self.returns[::-1]])
+        batch = rolling_risk_metrics(returns, 20)
+        single = rolling_risk_metrics(returns[1], 20)
+        self.assertEqual(batch["sharpe"].shape, returns.shape)
+        np.testing.assert_allclose(batch["sharpe"][1], single["sharpe"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,26 @@
+# tests/test_startup.py
+"""
+Tests that the Streamlit app starts without importing heavy optional modules.
+"""
+import subprocess
+import unittest
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestLazyImports(unittest.TestCase):
+    """Importing the app script must not load torch or matplotlib."""
+
+    def test_app_import_is_light(self):
+        code = "import sys, src.trader_app; print(sorted(m for m in ('torch', 'matplotlib') if m in sys.modules))"
+        proc = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+        self.assertEqual(proc.stdout.strip().splitlines()[-1], "[]")
+
+
+if __name__ == '__main__':
+    unittest.main()
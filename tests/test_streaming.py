@@ -0,0 +1,69 @@
+# tests/test_streaming.py
+"""
+Tests that the streaming strategy matches the batch strategy.
+"""
+import itertools
+import unittest
+import numpy as np
+import pandas as pd
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.signals import Signal
+from src.strategy import apply_sma_crossover
+from src.streaming import StreamingSMACrossover, _RollingSum
+
+
+class TestStreamingStrategy(unittest.TestCase):
+    """Compare bar-by-bar updates with `apply_sma_crossover`."""
+
+    def setUp(self):
+        rng = np.random.default_rng(11)
+        self.df = pd.DataFrame({"close": 100 * np.exp(np.cumsum(rng.normal(0, 0.02, 600)))})
+
+    def assert_matches_batch(self, **params):
+        batch, _ = apply_sma_crossover(self.df, **params)
+        stream = StreamingSMACrossover(**params).run(self.df["close"])
+
+        np.testing.assert_array_equal(stream["signal"].to_numpy(), batch["signal"].to_numpy())
+        np.testing.assert_array_equal(stream["position"].to_numpy(), batch["position"].to_numpy())
+        for col, batch_col in [("equity", "equity_curve"), ("strategy_return", "strategy_returns"),
+                               ("sma_short", "sma_short"), ("sma_long", "sma_long"), ("rsi", "rsi"),
+                               ("macd", "macd"), ("volatility", "volatility")]:
+            np.testing.assert_allclose(stream[col], batch[batch_col], rtol=1e-9, atol=1e-9, err_msg=col)
+
+    def test_matches_batch_across_options(self):
+        for use_rsi_macd, use_vol_filter, use_risk in itertools.product([False, True], repeat=3):
+            with self.subTest(rsi_macd=use_rsi_macd, vol=use_vol_filter, risk=use_risk):
+                self.assert_matches_batch(
+                    use_rsi_macd=use_rsi_macd, use_vol_filter=use_vol_filter, max_vol_pct=2.0,
+                    use_risk=use_risk, stop_loss_pct=3.0, take_profit_pct=6.0, trade_cost_bps=10,
+                )
+
+    def test_update_accepts_bar_mappings(self):
+        strategy = StreamingSMACrossover(short_window=2, long_window=3)
+        updates = [strategy.update({"close": p}) for p in [10, 11, 12, 13]]
+        self.assertEqual(updates[-1].signal, Signal.BUY)
+        self.assertEqual(updates[-1].position, 1)
+        self.assertTrue(np.isnan(updates[0].equity))
+
+        numpy_bars = StreamingSMACrossover(short_window=2, long_window=3)
+        for p in [np.float32(10), np.int64(11), np.float64(12), 13]:
+            update = numpy_bars.update(p)
+        self.assertEqual((update.signal, update.position, update.sma_short),
+                         (updates[-1].signal, updates[-1].position, updates[-1].sma_short))
+
+    def test_rolling_sums_do_not_drift(self):
+        rng = np.random.default_rng(3)
+        prices = 1e4 * np.exp(np.cumsum(rng.normal(0, 0.05, 20000)))
+        rolling = _RollingSum(20)
+        for p in prices:
+            rolling.push(float(p))
+        np.testing.assert_allclose(rolling.std(), np.std(prices[-20:], ddof=1), rtol=1e-13)
+        np.testing.assert_allclose(rolling.mean(), np.mean(prices[-20:]), rtol=1e-15)
+
+
+if __name__ == '__main__':
+    unittest.main()
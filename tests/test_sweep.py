@@ -0,0 +1,66 @@
+# tests/test_sweep.py
+"""
+Tests for the vectorized parameter sweep.
+"""
+import unittest
+import numpy as np
+import pandas as pd
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.metrics import compute_performance_stats
+from src.strategy import apply_sma_crossover
+from src.sweep import expand_grid, sweep_sma_crossover
+
+
+class TestSweep(unittest.TestCase):
+    """Test that the sweep reproduces per-combination strategy runs."""
+
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        n = 400
+        self.df = pd.DataFrame({
+            "date": pd.date_range("2020-01-01", periods=n, freq="D"),
+            "close": 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n))),
+        })
+        self.grid = {
+            "short_window": [5, 10],
+            "long_window": [30],
+            "use_rsi_macd": [False, True],
+            "use_vol_filter": [True],
+            "max_vol_pct": [2.0],
+            "trade_cost_bps": [0, 10],
+            "use_risk": [False, True],
+            "stop_loss_pct": [3.0],
+            "take_profit_pct": [6.0],
+        }
+
+    def test_expand_grid(self):
+        combos = expand_grid({"short_window": [5, 10], "long_window": [20, 30, 40]})
+        self.assertEqual(len(combos), 6)
+        self.assertEqual(combos[0]["rsi_window"], 14)
+        with self.assertRaises(KeyError):
+            expand_grid({"nope": [1]})
+
+    def test_matches_apply_sma_crossover(self):
+        table = sweep_sma_crossover(self.df, self.grid, processes=1, batch_size=5)
+
+        self.assertEqual(len(table), 16)
+        self.assertTrue(table["Sharpe"].is_monotonic_decreasing)
+        for _, row in table.iterrows():
+            params = {k: row[k] for k in expand_grid({})[0]}
+            out, price_col = apply_sma_crossover(self.df, **params)
+            expected = compute_performance_stats(out, price_col)
+            for key, value in expected.items():
+                self.assertTrue(np.isclose(row[key], value, equal_nan=True), (key, params))
+
+    def test_process_pool_matches_in_process(self):
+        serial = sweep_sma_crossover(self.df, self.grid, processes=1, batch_size=4)
+        parallel = sweep_sma_crossover(self.df, self.grid, processes=2, batch_size=4)
+        pd.testing.assert_frame_equal(serial, parallel)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+# tests/test_universe.py
+"""
+Tests for the shared-memory universe runner.
+"""
+import io
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from multiprocessing import shared_memory
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.metrics import compute_performance_stats
+from src.pipeline import preprocess_ohlc
+from src.strategy import apply_sma_crossover
+from src.universe import SharedArray, main, run_universe
+from tests.helpers import make_frames
+
+
+class TestUniverse(unittest.TestCase):
+    """Compare the runner with per-ticker `apply_sma_crossover` calls."""
+
+    params = {"short_window": 5, "long_window": 20, "trade_cost_bps": 10,
+              "use_risk": True, "stop_loss_pct": 3.0, "take_profit_pct": 6.0}
+
+    def test_matches_single_ticker_backtests(self):
+        frames = make_frames()
+        result = run_universe(frames, self.params, processes=1)
+        for ticker, raw in frames.items():
+            out, price_col = apply_sma_crossover(preprocess_ohlc(raw), **self.params)
+            expected = compute_performance_stats(out, price_col)
+            for key, value in expected.items():
+                self.assertAlmostEqual(result.stats.loc[ticker, key], value, msg=key)
+
+            col = result.panel.tickers.index(ticker)
+            rows = np.searchsorted(result.panel.dates, out["date"].to_numpy())
+            np.testing.assert_array_equal(result.panel["equity"][rows, col], out["equity_curve"])
+
+    def test_process_pool_matches_in_process(self):
+        frames = make_frames()
+        serial = run_universe(frames, self.params, processes=1)
+        parallel = run_universe(frames, self.params, processes=2, chunk_size=2)
+        pd.testing.assert_frame_equal(serial.stats, parallel.stats)
+        np.testing.assert_array_equal(serial.panel["equity"], parallel.panel["equity"])
+
+    def test_bad_frames_reported_as_errors(self):
+        frames = make_frames(2)
+        frames["BAD"] = pd.DataFrame({"price": [1.0, 2.0]})
+        result = run_universe(frames, processes=1)
+        self.assertEqual(list(result.stats.index), ["T0", "T1"])
+        self.assertIn("BAD", result.errors)
+
+    def test_unexpected_errors_reported_per_ticker(self):
+        frames = make_frames(3)
+        real = compute_performance_stats
+
+        def stats(out, price_col):
+            if len(out) == len(frames["T1"]):
+                raise ZeroDivisionError("division by zero")
+            return real(out, price_col)
+
+        with patch("src.universe.compute_performance_stats", side_effect=stats):
+            result = run_universe(frames, self.params, processes=1)
+        self.assertEqual(list(result.stats.index), ["T0", "T2"])
+        self.assertEqual(result.errors, {"T1": "division by zero"})
+
+    def test_shared_memory_released(self):
+        array = SharedArray.create((4,), np.float64)
+        name = array.spec[0]
+        attached = SharedArray.attach(array.spec)
+        attached.array[:] = 1.0
+        np.testing.assert_array_equal(array.array, 1.0)
+        attached.close()
+        array.close()
+        with self.assertRaises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+
+    def test_cli_writes_stats(self):
+        frames = make_frames(3)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, "stats.csv")
+        with patch("src.data_provider.get_price_histories", return_value=(frames, {})), \
+                redirect_stdout(io.StringIO()):
+            code = main(["T0", "T1", "T2", "--processes", "1", "--output", path])
+        self.assertEqual(code, 0)
+        self.assertEqual(sorted(pd.read_csv(path)["ticker"]), ["T0", "T1", "T2"])
+
+
+if __name__ == '__main__':
+    unittest.main()